@@ -0,0 +1,241 @@
+import numpy as np
+import pandas as pd
+
+# --- CONFIGURATION ---
+INTERVALS_PER_DAY = 288
+HORIZON_DAYS = (1, 7, 30, 182, 365)
+BASE_INTERVAL_NS = 300 * 10**9
+DAY_NS = 86400 * 10**9
+
+
+# --- SERIES PREPARATION ---
+def prepare_series(prices):
+    """Split a price Series into (timestamps_ns or None, values, weights).
+
+    Weights are each interval's real duration in 5-minute units: the time to
+    the next timestamp, capped at the series' native (median) interval so
+    outages are not credited with energy. Duplicate timestamps weigh zero
+    except the last. Non-datetime input falls back to one 5-minute interval
+    per row.
+    """
+    if isinstance(prices, pd.Series) and isinstance(prices.index, pd.DatetimeIndex) and len(prices) > 0:
+        ts = prices.index.as_unit("ns").asi8
+        values = np.asarray(prices.to_numpy(), dtype=np.float64)
+        if len(ts) > 1 and np.any(ts[1:] < ts[:-1]):
+            order = np.argsort(ts, kind="stable")
+            ts, values = ts[order], values[order]
+        return ts, values, interval_weights(ts)
+    values = np.asarray(prices, dtype=np.float64)
+    return None, values, np.ones(len(values))
+
+
+def interval_weights(ts):
+    """Duration of each sorted interval in 5-minute units"""
+    if len(ts) < 2:
+        return np.ones(len(ts))
+    gaps = np.diff(ts)
+    positive = gaps[gaps > 0]
+    native = float(np.median(positive)) if len(positive) else BASE_INTERVAL_NS
+    durations = np.append(np.minimum(gaps, native), native)
+    return durations / BASE_INTERVAL_NS
+
+
+def _series_end(ts, weights):
+    """End of the last interval, in ns"""
+    return ts[-1] + int(weights[-1] * BASE_INTERVAL_NS)
+
+
+def window_slice(ts, weights, n, days=None, start=None, end=None):
+    """Row bounds [i0, i1) of a window found by binary search on the timestamps.
+
+    Either the trailing `days` ending at the last interval, or explicit
+    start/end (anything pd.Timestamp accepts; end exclusive). Positional
+    fallback when there are no timestamps.
+    """
+    if ts is None:
+        if days is not None:
+            return max(0, n - days * INTERVALS_PER_DAY), n
+        return 0 if start is None else int(start), n if end is None else int(end)
+    if days is not None:
+        end_ns = _series_end(ts, weights)
+        start_ns = end_ns - days * DAY_NS
+    else:
+        start_ns = ts[0] if start is None else _to_ns(start, ts)
+        end_ns = _series_end(ts, weights) if end is None else _to_ns(end, ts)
+    return int(np.searchsorted(ts, start_ns, side="left")), int(np.searchsorted(ts, end_ns, side="left"))
+
+
+def _to_ns(value, ts):
+    stamp = pd.Timestamp(value)
+    if stamp.tzinfo is None:
+        return stamp.as_unit("ns").value
+    return stamp.tz_convert("UTC").as_unit("ns").value
+
+
+def share_below(prices, threshold, days=365):
+    """Duration-weighted share of the trailing `days` priced below threshold ($/MWh); NaN if empty"""
+    ts, values, weights = prepare_series(prices)
+    i0, i1 = window_slice(ts, weights, len(values), days=days)
+    values, weights = values[i0:i1], weights[i0:i1]
+    valid = ~np.isnan(values)
+    total = weights[valid].sum()
+    return float(weights[valid & (values < threshold)].sum() / total) if total > 0 else float("nan")
+
+
+def tail_window(prices, days):
+    """Trailing `days` of a Series as an iloc view (no copy unless the index needs sorting)"""
+    if isinstance(prices, pd.Series) and isinstance(prices.index, pd.DatetimeIndex) and not prices.index.is_monotonic_increasing:
+        # window_slice bounds are positions in time order
+        prices = prices.sort_index(kind="stable")
+    ts, _, weights = prepare_series(prices)
+    i0, i1 = window_slice(ts, weights, len(prices), days=days)
+    return prices.iloc[i0:i1]
+
+
+# --- PREFIX-SUM ENGINE ---
+def _prefix(values):
+    out = np.zeros(len(values) + 1, dtype=np.float64)
+    np.cumsum(values, out=out[1:])
+    return out
+
+
+def _margin_tables(values, weights, breakeven_val):
+    """Prefix sums of duration-weighted margins, prices and weights"""
+    valid = ~np.isnan(values)
+    w = np.where(valid, weights, 0.0)
+    # fmax drops NaN intervals to a zero margin, matching max(0, ...) in the scalar loop
+    return {
+        "mining": _prefix(np.fmax(breakeven_val - values, 0.0) * weights),
+        "battery": _prefix(np.fmax(values - breakeven_val, 0.0) * weights),
+        "price": _prefix(np.where(valid, values, 0.0) * w),
+        "valid_weight": _prefix(w),
+        "weight": _prefix(weights),
+    }
+
+
+def _window_result(tables, i0, i1, ideal_m, ideal_b, w_pct, s_pct):
+    span = lambda key: tables[key][i1] - tables[key][i0]
+    k = span("weight")
+    if k < INTERVALS_PER_DAY:
+        return 0, 0, 0
+    valid_weight = span("valid_weight")
+    avg_price = span("price") / valid_weight if valid_weight > 0 else float("nan")
+    weighted_mining, weighted_battery = scale_alpha(span("mining"), span("battery"), k, ideal_m, ideal_b, w_pct, s_pct)
+    return weighted_mining, weighted_battery, avg_price
+
+
+def horizon_alpha(prices, breakeven_val, ideal_m, ideal_b, horizons=HORIZON_DAYS, w_pct=0.5, s_pct=0.5):
+    """Mining/battery alpha and average price for every horizon in a single pass.
+
+    Margins are clipped and duration-weighted once over the full series and
+    folded into prefix sums; each horizon's window is located by binary search
+    on the timestamps, so it is an O(log n) lookup no matter how many days it
+    covers. Returns {days: (weighted_mining, weighted_battery, avg_price)}.
+    """
+    ts, values, weights = prepare_series(prices)
+    tables = _margin_tables(values, weights, breakeven_val)
+    results = {}
+    for days in horizons:
+        i0, i1 = window_slice(ts, weights, len(values), days=days)
+        results[days] = _window_result(tables, i0, i1, ideal_m, ideal_b, w_pct, s_pct)
+    return results
+
+
+def range_alpha(prices, breakeven_val, ideal_m, ideal_b, start=None, end=None, w_pct=0.5, s_pct=0.5):
+    """Mining/battery alpha and average price for an arbitrary [start, end) range"""
+    ts, values, weights = prepare_series(prices)
+    i0, i1 = window_slice(ts, weights, len(values), start=start, end=end)
+    tables = _margin_tables(values[i0:i1], weights[i0:i1], breakeven_val)
+    return _window_result(tables, 0, i1 - i0, ideal_m, ideal_b, w_pct, s_pct)
+
+
+def scale_alpha(mining_sum, battery_sum, k, ideal_m, ideal_b, w_pct, s_pct):
+    """Turn margin sums over k five-minute intervals into weighted period alpha"""
+    actual_days = k / float(INTERVALS_PER_DAY)
+
+    # Convert to daily averages and scale to period
+    base_mining = (mining_sum * ideal_m / INTERVALS_PER_DAY) * actual_days
+    base_battery = (battery_sum * ideal_b / INTERVALS_PER_DAY) * actual_days
+
+    # Apply Synchronized Generation Weights
+    weighted_mining = base_mining * (1.0 + (w_pct * 0.20))
+    weighted_battery = base_battery * (1.0 + (s_pct * 0.25))
+    return weighted_mining, weighted_battery
+
+
+def annual_alpha(mining_sum, battery_sum, k, ideal_m, ideal_b, w_pct, s_pct):
+    """scale_alpha for a 365-day year at the sums' per-interval rate.
+
+    scale_alpha grows with the square of the period (its sums already grow with
+    the intervals covered), so windows of different lengths only compare once
+    their sums are rescaled to the same year.
+    """
+    year_k = 365 * INTERVALS_PER_DAY
+    return scale_alpha(mining_sum * year_k / k, battery_sum * year_k / k, year_k, ideal_m, ideal_b, w_pct, s_pct)
+
+
+# --- SORTED PRICE INDEX ---
+class SortedPriceIndex:
+    """Sorted prices plus duration-weighted prefix sums for one window of the series.
+
+    sum(w * max(0, b - p)) and sum(w * max(0, p - b)) for any breakeven b
+    reduce to a binary search and two prefix-sum lookups, so slider moves
+    never rescan the window. Breakevens may be scalars or arrays.
+    """
+
+    def __init__(self, prices, weights=None):
+        p = np.asarray(prices, dtype=np.float64)
+        w = np.ones(len(p)) if weights is None else np.asarray(weights, dtype=np.float64)
+        self.window = float(w.sum())
+        valid = ~np.isnan(p)
+        order = np.argsort(p[valid], kind="stable")
+        self.sorted_prices = p[valid][order]
+        sorted_w = w[valid][order]
+        self.weight_prefix = _prefix(sorted_w)
+        self.prefix = _prefix(self.sorted_prices * sorted_w)
+
+    @property
+    def count(self):
+        return len(self.sorted_prices)
+
+    @property
+    def avg_price(self):
+        total = self.weight_prefix[-1]
+        return self.prefix[-1] / total if total > 0 else float("nan")
+
+    def margins(self, breakeven_val):
+        """Return (sum of w * max(0, b - p), sum of w * max(0, p - b)) over the window"""
+        b = np.asarray(breakeven_val, dtype=np.float64)
+        i = np.searchsorted(self.sorted_prices, b, side="left")
+        below = b * self.weight_prefix[i] - self.prefix[i]
+        above = (self.prefix[-1] - self.prefix[i]) - b * (self.weight_prefix[-1] - self.weight_prefix[i])
+        return below, above
+
+
+def build_horizon_indexes(prices, horizons=HORIZON_DAYS):
+    """Build one SortedPriceIndex per horizon over the time-based tail of the series"""
+    ts, values, weights = prepare_series(prices)
+    indexes = {}
+    for days in horizons:
+        i0, i1 = window_slice(ts, weights, len(values), days=days)
+        indexes[days] = SortedPriceIndex(values[i0:i1], weights[i0:i1])
+    return indexes
+
+
+def indexed_horizon_alpha(indexes, breakeven_val, ideal_m, ideal_b, w_pct=0.5, s_pct=0.5):
+    """Same result as horizon_alpha, answered from prebuilt horizon indexes"""
+    results = {}
+    for days, index in indexes.items():
+        if index.window < INTERVALS_PER_DAY:
+            results[days] = (0, 0, 0)
+            continue
+        mining_sum, battery_sum = index.margins(breakeven_val)
+        weighted_mining, weighted_battery = scale_alpha(mining_sum, battery_sum, index.window, ideal_m, ideal_b, w_pct, s_pct)
+        results[days] = (float(weighted_mining), float(weighted_battery), index.avg_price)
+    return results
+
+
+def alpha_sensitivity(index, breakevens, ideal_m, ideal_b, w_pct=0.5, s_pct=0.5):
+    """Mining and battery alpha across an array of breakeven values for one window"""
+    mining_sum, battery_sum = index.margins(breakevens)
+    return scale_alpha(mining_sum, battery_sum, index.window, ideal_m, ideal_b, w_pct, s_pct)
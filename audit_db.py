@@ -1,72 +1,286 @@
 import sqlite3
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
 # --- CONFIGURATION ---
 DB_FILE = "api_iso_hubs_5yr.db"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+DEFAULT_INTERVAL_SECONDS = 300
+# A step longer than this many native intervals counts as a gap
+GAP_TOLERANCE = 1.5
+SCAN_CHUNK_ROWS = 250_000
 
-def audit_database():
+# SQL Query to get the exact start, end, and row counts for every hub
+AUDIT_QUERY = """
+SELECT
+    iso AS "ISO",
+    location AS "Hub / Node",
+    MIN(timestamp) AS "First Record",
+    MAX(timestamp) AS "Last Record",
+    COUNT(*) AS "Total Rows Captured"
+FROM historical_prices
+GROUP BY iso, location
+ORDER BY iso, location;
+"""
+
+# Incremental audit state: each series' extent and interval, the rowid it was
+# scanned up to, and its gaps as the present timestamps on either side
+AUDIT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS audit_state (
+    iso TEXT NOT NULL,
+    location TEXT NOT NULL,
+    interval_seconds INTEGER NOT NULL,
+    first_ts TEXT NOT NULL,
+    last_ts TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    last_rowid INTEGER NOT NULL,
+    audited_at TEXT NOT NULL,
+    PRIMARY KEY (iso, location)
+);
+CREATE TABLE IF NOT EXISTS audit_gaps (
+    iso TEXT NOT NULL,
+    location TEXT NOT NULL,
+    prev_ts TEXT NOT NULL,
+    next_ts TEXT NOT NULL,
+    PRIMARY KEY (iso, location, prev_ts)
+);
+"""
+
+# --- GAP ENGINE ---
+def _to_ns(stamps):
+    return pd.to_datetime(pd.Series(stamps), format=TIMESTAMP_FORMAT).to_numpy("datetime64[ns]").view("i8")
+
+def _to_text(ns):
+    return pd.to_datetime(np.asarray(ns, dtype="i8")).strftime(TIMESTAMP_FORMAT).tolist()
+
+def infer_interval(ts_ns):
+    """Native sampling interval in ns: the median positive step"""
+    steps = np.diff(ts_ns)
+    steps = steps[steps > 0]
+    return int(np.median(steps)) if len(steps) else DEFAULT_INTERVAL_SECONDS * 10**9
+
+def chain_gaps(ts_ns, interval_ns):
+    """(prev, next) present timestamps around every step longer than the native interval"""
+    steps = np.diff(ts_ns)
+    idx = np.flatnonzero(steps > interval_ns * GAP_TOLERANCE)
+    return ts_ns[idx], ts_ns[idx + 1]
+
+def scan_series(conn, iso, location, max_rowid, chunk_rows=SCAN_CHUNK_ROWS):
+    """Full pass over one series in timestamp order, streamed through the covering index"""
+    query = "SELECT timestamp FROM historical_prices WHERE iso = ? AND location = ? AND rowid <= ? ORDER BY timestamp"
+    state, prev, nxt, carry = None, [], [], None
+    for chunk in pd.read_sql_query(query, conn, params=(iso, location, max_rowid), chunksize=chunk_rows):
+        ts = _to_ns(chunk["timestamp"])
+        if state is None:
+            state = {"interval": infer_interval(ts), "first": int(ts[0]), "rows": 0}
+        chain = ts if carry is None else np.concatenate(([carry], ts))
+        p, n = chain_gaps(chain, state["interval"])
+        prev.append(p)
+        nxt.append(n)
+        state["rows"] += len(ts)
+        carry = int(ts[-1])
+    if state is None:
+        return None
+    state["last"] = carry
+    state["gaps"] = (np.concatenate(prev), np.concatenate(nxt))
+    return state
+
+def update_series(state, new_ts):
+    """Fold newly inserted timestamps into a series' audit state without rescanning it.
+
+    New points can extend the series at either end or land inside a known gap
+    (a backfill), which splits or closes that gap; anything else is a repeat
+    of a timestamp already present.
+    """
+    new_ts = np.unique(new_ts)
+    interval, first, last = state["interval"], state["first"], state["last"]
+    gap_prev, gap_next = state["gaps"]
+
+    before = new_ts[new_ts < first]
+    after = new_ts[new_ts > last]
+    inside = new_ts[(new_ts > first) & (new_ts < last)]
+    slot = np.searchsorted(gap_prev, inside, side="right") - 1
+    in_gap = (slot >= 0) & (inside < gap_next[np.maximum(slot, 0)]) if len(gap_prev) else np.zeros(len(inside), bool)
+
+    touched = np.unique(slot[in_gap])
+    keep = np.ones(len(gap_prev), bool)
+    keep[touched] = False
+    prev, nxt = [gap_prev[keep]], [gap_next[keep]]
+    for g in touched:
+        chain = np.concatenate(([gap_prev[g]], inside[in_gap & (slot == g)], [gap_next[g]]))
+        p, n = chain_gaps(chain, interval)
+        prev.append(p)
+        nxt.append(n)
+    if len(before):
+        p, n = chain_gaps(np.append(before, first), interval)
+        prev.append(p)
+        nxt.append(n)
+        first = int(before[0])
+    if len(after):
+        p, n = chain_gaps(np.insert(after, 0, last), interval)
+        prev.append(p)
+        nxt.append(n)
+        last = int(after[-1])
+
+    prev, nxt = np.concatenate(prev), np.concatenate(nxt)
+    order = np.argsort(prev)
+    return {**state, "first": first, "last": last, "rows": state["rows"] + len(before) + len(after) + int(in_gap.sum()),
+            "gaps": (prev[order], nxt[order])}
+
+# --- AUDIT STATE ---
+def _load_states(conn):
+    states = {}
+    for iso, location, interval, first, last, rows, last_rowid in conn.execute(
+            "SELECT iso, location, interval_seconds, first_ts, last_ts, rows, last_rowid FROM audit_state"):
+        states[(iso, location)] = {"interval": interval * 10**9, "first": int(_to_ns([first])[0]), "last": int(_to_ns([last])[0]),
+                                   "rows": rows, "last_rowid": last_rowid}
+    gaps = pd.read_sql_query("SELECT iso, location, prev_ts, next_ts FROM audit_gaps ORDER BY iso, location, prev_ts", conn)
+    for key, state in states.items():
+        state["gaps"] = (np.empty(0, "i8"), np.empty(0, "i8"))
+    for (iso, location), g in gaps.groupby(["iso", "location"]):
+        if (iso, location) in states:
+            states[(iso, location)]["gaps"] = (_to_ns(g["prev_ts"]), _to_ns(g["next_ts"]))
+    return states
+
+def _save_states(conn, states, max_rowid):
+    audited_at = datetime.now().isoformat(timespec="seconds")
+    with conn:
+        for (iso, location), s in states.items():
+            conn.execute("INSERT OR REPLACE INTO audit_state VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (iso, location, s["interval"] // 10**9, *_to_text([s["first"], s["last"]]), s["rows"], max_rowid, audited_at))
+            conn.execute("DELETE FROM audit_gaps WHERE iso = ? AND location = ?", (iso, location))
+            prev, nxt = s["gaps"]
+            conn.executemany("INSERT INTO audit_gaps VALUES (?, ?, ?, ?)", zip([iso] * len(prev), [location] * len(prev), _to_text(prev), _to_text(nxt)))
+
+def refresh_audit(conn, full=False, chunk_rows=SCAN_CHUNK_ROWS):
+    """Bring the audit state up to date; only rows added since the last audit are read.
+
+    The first run (or full=True) streams every series once through the
+    covering index. Later runs seek past the stored rowid watermark. Returns
+    {(iso, location): state} for every series in the table.
+    """
+    conn.executescript(AUDIT_SCHEMA)
+    max_rowid = conn.execute("SELECT MAX(rowid) FROM historical_prices").fetchone()[0] or 0
+    states = {} if full else _load_states(conn)
+    changed = set()
+
+    if states:
+        watermark = min(s["last_rowid"] for s in states.values())
+        rescan = set()
+        query = "SELECT rowid, iso, location, timestamp FROM historical_prices WHERE rowid > ? AND rowid <= ?"
+        for chunk in pd.read_sql_query(query, conn, params=(watermark, max_rowid), chunksize=chunk_rows):
+            for (iso, location), rows in chunk.groupby(["iso", "location"]):
+                state = states.get((iso, location))
+                if state is None:
+                    rescan.add((iso, location))
+                    continue
+                rows = rows[rows["rowid"] > state["last_rowid"]]
+                if len(rows):
+                    states[(iso, location)] = update_series(state, _to_ns(rows["timestamp"]))
+                    changed.add((iso, location))
+    else:
+        rescan = {(iso, location) for iso, location in conn.execute("SELECT DISTINCT iso, location FROM historical_prices")}
+
+    for iso, location in sorted(rescan):
+        state = scan_series(conn, iso, location, max_rowid, chunk_rows)
+        if state is not None:
+            states[(iso, location)] = state
+            changed.add((iso, location))
+
+    if full:
+        conn.execute("DELETE FROM audit_state")
+        conn.execute("DELETE FROM audit_gaps")
+    _save_states(conn, {k: states[k] for k in (states if full else changed)}, max_rowid)
+    conn.execute("UPDATE audit_state SET last_rowid = ?", (max_rowid,))
+    conn.commit()
+    return states
+
+def summarize(states):
+    """One audit row per series: extent, native interval, gap count and completeness"""
+    rows = []
+    for (iso, location), s in sorted(states.items()):
+        prev, nxt = s["gaps"]
+        missing = int((np.round((nxt - prev) / s["interval"]) - 1).sum()) if len(prev) else 0
+        rows.append({
+            "ISO": iso,
+            "Hub / Node": location,
+            "First Record": pd.Timestamp(s["first"]).strftime('%Y-%m-%d %H:%M'),
+            "Last Record": pd.Timestamp(s["last"]).strftime('%Y-%m-%d %H:%M'),
+            "Total Rows Captured": s["rows"],
+            "Interval (min)": s["interval"] / 6e10,
+            "Gaps": len(prev),
+            "Missing Intervals": missing,
+            "Data Health": f"{100.0 * s['rows'] / max(1, s['rows'] + missing):.1f}%",
+        })
+    return pd.DataFrame(rows)
+
+def gap_table(states):
+    """Every missing range as [Gap Start, Gap End) of interval start times"""
+    frames = []
+    for (iso, location), s in sorted(states.items()):
+        prev, nxt = s["gaps"]
+        if len(prev):
+            frames.append(pd.DataFrame({
+                "ISO": iso,
+                "Hub / Node": location,
+                "Gap Start": pd.to_datetime(prev + s["interval"]),
+                "Gap End": pd.to_datetime(nxt),
+                "Missing Intervals": np.round((nxt - prev) / s["interval"]).astype(int) - 1,
+            }))
+    if not frames:
+        return pd.DataFrame(columns=["ISO", "Hub / Node", "Gap Start", "Gap End", "Missing Intervals"])
+    return pd.concat(frames, ignore_index=True)
+
+def find_gaps(db_file=DB_FILE, full=False):
+    """Missing ranges per ISO/hub after an incremental audit of db_file"""
+    conn = sqlite3.connect(db_file)
     try:
-        conn = sqlite3.connect(DB_FILE)
-        
-        # SQL Query to get the exact start, end, and row counts for every hub
-        query = """
-        SELECT 
-            iso AS "ISO",
-            location AS "Hub / Node",
-            MIN(timestamp) AS "First Record",
-            MAX(timestamp) AS "Last Record",
-            COUNT(*) AS "Total Rows Captured"
-        FROM historical_prices
-        GROUP BY iso, location
-        ORDER BY iso, location;
-        """
-        
-        print(f"\n🔍 Scanning 250MB Database: {DB_FILE}...\n")
-        df = pd.read_sql_query(query, conn)
-        
+        return gap_table(refresh_audit(conn, full=full))
+    finally:
+        conn.close()
+
+def backfill_ranges(gaps):
+    """{iso: {location: [(start, end), ...]}} in UTC, the form price_db's loader takes"""
+    ranges = {}
+    for row in gaps.itertuples(index=False):
+        ranges.setdefault(row[0], {}).setdefault(row[1], []).append((row[2].tz_localize("UTC"), row[3].tz_localize("UTC")))
+    return ranges
+
+def audit_database(db_file=DB_FILE, full=False):
+    try:
+        # mode=rw fails on a missing file instead of creating an empty database
+        conn = sqlite3.connect(f"file:{db_file}?mode=rw", uri=True)
+
+        print(f"\n🔍 Scanning 250MB Database: {db_file}...\n")
+        states = refresh_audit(conn, full=full)
+        df = summarize(states)
+
         if df.empty:
             print("⚠️ The database exists but contains zero rows of data.")
             return
 
-        # Format the timestamps to be readable
-        df['First Record'] = pd.to_datetime(df['First Record']).dt.strftime('%Y-%m-%d %H:%M')
-        df['Last Record'] = pd.to_datetime(df['Last Record']).dt.strftime('%Y-%m-%d %H:%M')
-        
-        # Calculate expected rows for a rough "Completeness" check
-        # Assuming 5-minute intervals (288 rows/day) for most, except ERCOT which is 15-min (96 rows/day)
-        completeness = []
-        for index, row in df.iterrows():
-            start = pd.to_datetime(row['First Record'])
-            end = pd.to_datetime(row['Last Record'])
-            days_diff = (end - start).days
-            
-            # Rough estimate based on ISO interval schemas
-            if row['ISO'] == 'ERCOT':
-                expected_rows = max(1, days_diff * 96)
-            else:
-                expected_rows = max(1, days_diff * 288)
-                
-            actual_rows = row['Total Rows Captured']
-            health_pct = min(100.0, (actual_rows / expected_rows) * 100)
-            
-            completeness.append(f"{health_pct:.1f}%")
-            
-        df['Data Health'] = completeness
-        
         # Print the clean table to the terminal
         print("✅ AUDIT COMPLETE. HERE IS EXACTLY WHAT YOU HAVE:\n")
         print(df.to_string(index=False))
         print("\n==========================================================================")
         print(f"Total Rows Across All ISOs: {df['Total Rows Captured'].sum():,}")
+        print(f"Missing Intervals Across All ISOs: {df['Missing Intervals'].sum():,} in {df['Gaps'].sum():,} gaps")
         print("==========================================================================\n")
-        
+
+        gaps = gap_table(states)
+        if not gaps.empty:
+            print("🕳️ LARGEST GAPS (run `python price_db.py --backfill-gaps` to refetch):\n")
+            print(gaps.nlargest(20, "Missing Intervals").to_string(index=False))
+            print()
+
         conn.close()
-        
+
     except sqlite3.OperationalError:
-        print(f"❌ ERROR: Could not find '{DB_FILE}'. Make sure you are in the correct folder.")
+        print(f"❌ ERROR: Could not find '{db_file}'. Make sure you are in the correct folder.")
     except Exception as e:
         print(f"❌ ERROR: {e}")
 
 if __name__ == "__main__":
-    audit_database()
+    import sys
+    audit_database(full="--full" in sys.argv)
@@ -0,0 +1,251 @@
+"""Multi-year, multi-hub backtest straight from the historical_prices SQLite history.
+
+The history is split into (ISO, hub, year) partitions. Each partition is
+streamed through the series index in fixed-size row chunks and folded into
+duration-weighted margin sums, so a worker holds one chunk at a time however
+long the history is. Partitions run in parallel worker processes and their
+few-number results are merged as they finish into a year-by-hub matrix. Each
+partition gets the live-mode alpha for that year of prices, annualized from
+the days it covers, and the get_metrics economics on that year's measured
+mining capacity.
+
+    python backtest_engine.py                              # every hub, last 5 years
+    python backtest_engine.py --iso ERCOT PJM --metric irr -o backtest.csv
+"""
+import argparse
+import math
+import multiprocessing
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import diagnostics
+import economics
+import price_db
+from alpha_engine import BASE_INTERVAL_NS, INTERVALS_PER_DAY, annual_alpha
+from audit_db import DB_FILE, TIMESTAMP_FORMAT, infer_interval
+from scenario_engine import DEFAULT_CAP, MINING_PRICE_CAP, SCENARIO_DEFAULTS, normalize_scenario, scenario_inputs
+
+# --- CONFIGURATION ---
+CHUNK_ROWS = 200_000
+BACKTEST_YEARS = 5
+MATRIX_METRICS = ("total_alpha", "mining_alpha", "battery_alpha", "irr", "model_alpha", "avg_price", "cap", "coverage_days")
+
+PARTITION_SQL = """
+SELECT timestamp, price FROM historical_prices
+WHERE iso = ? AND location = ? AND timestamp >= ? AND timestamp < ?
+ORDER BY timestamp
+"""
+
+
+# --- STREAMING SUMS ---
+class MarginAccumulator:
+    """Duration-weighted margin and price sums over a time-ordered stream of price chunks.
+
+    Weights follow alpha_engine.interval_weights: an interval runs to the next
+    timestamp, capped at the native interval. The last row of each chunk is
+    held back until the next chunk supplies its successor.
+    """
+
+    def __init__(self, breakeven_val, interval_ns=None):
+        self.breakeven = breakeven_val
+        self.interval_ns = interval_ns
+        self.rows = 0
+        self.sums = dict.fromkeys(("mining", "battery", "price", "valid_weight", "weight", "below_cap"), 0.0)
+        self._pending = None
+
+    def _fold(self, values, weights):
+        valid = ~np.isnan(values)
+        w = np.where(valid, weights, 0.0)
+        s = self.sums
+        # fmax drops NaN intervals to a zero margin, as alpha_engine does
+        s["mining"] += float(np.fmax(self.breakeven - values, 0.0) @ weights)
+        s["battery"] += float(np.fmax(values - self.breakeven, 0.0) @ weights)
+        s["price"] += float(np.where(valid, values, 0.0) @ w)
+        s["valid_weight"] += float(w.sum())
+        s["weight"] += float(weights.sum())
+        s["below_cap"] += float(w[valid & (values < MINING_PRICE_CAP)].sum())
+
+    def add(self, ts_ns, values):
+        """Fold in one sorted chunk"""
+        self.rows += len(values)
+        if self._pending is not None:
+            ts_ns = np.append(self._pending[0], ts_ns)
+            values = np.append(self._pending[1], values)
+        if self.interval_ns is None and len(ts_ns) > 1:
+            self.interval_ns = infer_interval(ts_ns)
+        if len(ts_ns) > 1:
+            weights = np.minimum(np.diff(ts_ns), self.interval_ns) / BASE_INTERVAL_NS
+            self._fold(values[:-1], weights)
+        self._pending = (ts_ns[-1], values[-1])
+
+    def finish(self):
+        """Close the stream (the last interval gets the native duration) and return the sums"""
+        if self._pending is not None:
+            native = self.interval_ns or BASE_INTERVAL_NS
+            self._fold(np.array([self._pending[1]]), np.array([native / BASE_INTERVAL_NS]))
+            self._pending = None
+        return self.sums
+
+
+# --- PARTITIONS ---
+def list_partitions(conn, series, years=BACKTEST_YEARS):
+    """(iso, location, year) for every series over the last `years` calendar years in the database"""
+    bounds = {}
+    for iso, location in series:
+        lo, hi = conn.execute("SELECT MIN(timestamp), MAX(timestamp) FROM historical_prices WHERE iso = ? AND location = ?",
+                              (iso, location)).fetchone()
+        if lo is not None:
+            bounds[(iso, location)] = (int(lo[:4]), int(hi[:4]))
+    if not bounds:
+        return []
+    last = max(hi for _, hi in bounds.values())
+    first = last - years + 1
+    return [(iso, location, year) for (iso, location), (lo, hi) in bounds.items()
+            for year in range(max(lo, first), min(hi, last) + 1)]
+
+
+def partition_result(iso, location, year, sums, rows, scenario):
+    """Result row for one partition's sums under a normalized scenario.
+
+    Alpha and IRR are a year at the partition's rate (annual_alpha), so
+    partial, gappy and complete years are comparable down the matrix.
+    """
+    m, b, breakeven_val, s_pct, w_pct = scenario_inputs(scenario)
+    k = sums["weight"]
+    days = k / INTERVALS_PER_DAY
+    ma, ba = annual_alpha(sums["mining"], sums["battery"], k, m, b, w_pct, s_pct) if k > 0 else (0.0, 0.0)
+    cap = sums["below_cap"] / sums["valid_weight"] if sums["valid_weight"] > 0 else math.nan
+    model = economics.get_metrics(m, b, scenario["itc"], scenario["macrs"], DEFAULT_CAP if math.isnan(cap) else cap,
+                                  breakeven_val, w_pct, s_pct, scenario["efficiency"], scenario["miner_cost"])
+    nc = model[2]
+    total = ma + ba
+    return {
+        "iso": iso,
+        "location": location,
+        "year": year,
+        "intervals": rows,
+        "coverage_days": days,
+        "avg_price": sums["price"] / sums["valid_weight"] if sums["valid_weight"] > 0 else math.nan,
+        "cap": cap,
+        "mining_alpha": ma,
+        "battery_alpha": ba,
+        "total_alpha": total,
+        "irr": total * 100 / nc if nc > 0 and k > 0 else 0.0,
+        "model_alpha": model[0] + model[1],
+        "model_irr": model[3],
+        "net_capex": nc,
+    }
+
+
+def backtest_partition(db_file, iso, location, year, scenario, chunk_rows=CHUNK_ROWS):
+    """Stream one (ISO, hub, year) partition in row chunks and return its result row"""
+    acc = MarginAccumulator(economics.miner_breakeven(scenario["efficiency"], scenario["hashprice"]))
+    t0 = time.perf_counter()
+    conn = sqlite3.connect(db_file, timeout=60)
+    try:
+        cursor = conn.execute(PARTITION_SQL, (iso, location, f"{year}-01-01 00:00:00", f"{year + 1}-01-01 00:00:00"))
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            stamps, prices = zip(*rows)
+            ts_ns = pd.to_datetime(pd.Index(stamps), format=TIMESTAMP_FORMAT).as_unit("ns").asi8
+            acc.add(ts_ns, np.array(prices, dtype=np.float64))
+    finally:
+        conn.close()
+    diagnostics.observe("backtest.partition", time.perf_counter() - t0, iso=iso, year=year, rows=acc.rows)
+    return partition_result(iso, location, year, acc.finish(), acc.rows, scenario)
+
+
+# --- RUNNER ---
+def run_backtest(db_file=DB_FILE, series=None, scenario=None, years=BACKTEST_YEARS, workers=None, chunk_rows=CHUNK_ROWS):
+    """One result row per (ISO, hub, year) partition as a DataFrame.
+
+    series defaults to every ISO_HUBS hub present in the database; scenario is
+    a scenario_engine scenario (defaults apply to missing fields; its own
+    iso/location are ignored).
+    """
+    scenario = normalize_scenario(scenario or {})
+    series = series if series is not None else price_db.available_series(db_file)
+    conn = sqlite3.connect(db_file, timeout=60)
+    try:
+        tasks = list_partitions(conn, series, years)
+    finally:
+        conn.close()
+    if not tasks:
+        return pd.DataFrame(columns=["iso", "location", "year"])
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    with diagnostics.timed("backtest.run", partitions=len(tasks), workers=workers):
+        if workers <= 1:
+            rows = [backtest_partition(db_file, iso, location, year, scenario, chunk_rows) for iso, location, year in tasks]
+        else:
+            # spawn: forking a threaded Streamlit server is unsafe
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                futures = [pool.submit(backtest_partition, db_file, iso, location, year, scenario, chunk_rows) for iso, location, year in tasks]
+                rows = [f.result() for f in as_completed(futures)]
+    return pd.DataFrame(rows).sort_values(["iso", "location", "year"], ignore_index=True)
+
+
+def backtest_matrix(results, metric="total_alpha"):
+    """Year-by-hub matrix of one result column; hub columns are labelled "ISO · hub" """
+    if results.empty:
+        return pd.DataFrame()
+    labels = results["iso"] + " · " + results["location"]
+    matrix = results.assign(hub=labels).pivot(index="year", columns="hub", values=metric)
+    return matrix[list(dict.fromkeys(labels))]
+
+
+def db_version(db_file=DB_FILE):
+    """Cheap identity of the history table: its newest rowid (loads only append)"""
+    if not os.path.exists(db_file):
+        return None
+    conn = sqlite3.connect(db_file, timeout=60)
+    try:
+        return conn.execute("SELECT MAX(rowid) FROM historical_prices").fetchone()[0]
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Year-by-hub backtest over the historical_prices database")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--iso", nargs="+", default=None, help="limit to these ISOs")
+    parser.add_argument("--years", type=int, default=BACKTEST_YEARS)
+    parser.add_argument("--metric", default="total_alpha", choices=MATRIX_METRICS)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("-o", "--output", default=None, help="write every partition row to this CSV")
+    for field in ("solar_mw", "wind_mw", "miner_mw", "battery_mw", "efficiency", "miner_cost", "hashprice", "itc"):
+        parser.add_argument(f"--{field.replace('_', '-')}", type=float, default=SCENARIO_DEFAULTS[field])
+    parser.add_argument("--no-macrs", action="store_true")
+    args = parser.parse_args()
+
+    scenario = {field: getattr(args, field) for field in ("solar_mw", "wind_mw", "miner_mw", "battery_mw", "efficiency", "miner_cost", "hashprice", "itc")}
+    scenario["macrs"] = not args.no_macrs
+    series = price_db.available_series(args.db)
+    if args.iso:
+        series = [s for s in series if s[0] in args.iso]
+
+    t0 = time.perf_counter()
+    results = run_backtest(args.db, series, scenario, args.years, args.workers, args.chunk_rows)
+    if results.empty:
+        print(f"No price history in {args.db}")
+        return
+    print(f"{len(results)} partitions, {results['intervals'].sum():,} intervals in {time.perf_counter() - t0:.1f}s\n")
+    fmt = (lambda v: f"{v:,.1f}") if args.metric in ("irr", "avg_price", "coverage_days") else (lambda v: f"{v:.1%}") if args.metric == "cap" else (lambda v: f"{v:,.0f}")
+    print(backtest_matrix(results, args.metric).to_string(float_format=fmt))
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""Offline benchmark suite for the compute and data-loading hot paths.
+
+Runs against synthetic 1-year and 5-year 5-minute price series and a
+generated historical_prices SQLite table, appends one JSON line per case to
+benchmark_results.jsonl and compares medians with the previous run.
+
+    python benchmark.py                 # full suite (~250MB audit database)
+    python benchmark.py --quick         # small database, fewer repeats
+    python benchmark.py --only alpha    # cases whose name starts with "alpha"
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import pickle
+import platform
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import audit_db
+import economics
+import price_data
+import price_db
+from alpha_engine import HORIZON_DAYS, alpha_sensitivity, build_horizon_indexes, horizon_alpha, indexed_horizon_alpha
+from backtest_engine import run_backtest
+from chart_data import MinMaxPyramid
+from dispatch import simulate_dispatch
+from price_store import write_frame
+from risk_engine import risk_profile
+from volatility_engine import RollingAnalytics, rolling_stats
+
+# --- CONFIGURATION ---
+RESULTS_FILE = "benchmark_results.jsonl"
+DATA_DIR = "bench_data"
+REGRESSION_THRESHOLD = 0.10
+# (iso, hubs, minutes per interval) for the generated 5-year history; ~250MB at scale 1.0
+DB_LAYOUT = [
+    ("ERCOT", ["HB_WEST", "HB_NORTH", "HB_SOUTH", "HB_HOUSTON"], 15),
+    ("CAISO", ["TH_NP15_GEN-APND", "TH_SP15_GEN-APND"], 5),
+    ("PJM", ["WESTERN HUB", "AEP-DAYTON HUB"], 5),
+    ("MISO", ["ILLINOIS.HUB", "INDIANA.HUB"], 5),
+    ("SPP", ["SPPNORTH_HUB", "SPPSOUTH_HUB"], 5),
+]
+# Columns of the generated live cache, like the ERCOT hubs and load zones update_prices keeps
+CACHE_LOCATIONS = ["HB_WEST", "HB_NORTH", "HB_SOUTH", "HB_HOUSTON", "HB_PAN", "LZ_WEST", "LZ_NORTH", "LZ_SOUTH", "LZ_HOUSTON", "LZ_LCRA"]
+
+
+# --- SYNTHETIC DATA ---
+def synthetic_prices(years, seed=0, freq="5min"):
+    """Diurnal 5-minute RTM-like series with fat-tailed spikes and negative dips"""
+    index = pd.date_range(end=pd.Timestamp("2025-12-31 23:55", tz="US/Central"), periods=int(years * 365 * 288), freq=freq)
+    rng = np.random.default_rng(seed)
+    hours = index.hour.to_numpy() + index.minute.to_numpy() / 60.0
+    base = 32 + 18 * np.sin((hours - 15) / 24 * 2 * np.pi)
+    spikes = np.where(rng.random(len(index)) < 0.004, rng.pareto(1.5, len(index)) * 200, 0.0)
+    dips = np.where(rng.random(len(index)) < 0.06, -rng.exponential(15, len(index)), 0.0)
+    return pd.Series(base + rng.normal(0, 9, len(index)) + spikes + dips, index=index, name="LMP")
+
+
+def build_history_db(path, scale=1.0, years=5, seed=0):
+    """Generate a historical_prices table shaped like the 5-year multi-ISO database, indexed like price_db"""
+    if os.path.exists(path):
+        _index_db(path)
+        return path
+    tmp_path = path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("CREATE TABLE historical_prices (iso TEXT, location TEXT, timestamp TEXT, price REAL)")
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp("2025-12-31 23:55")
+    for iso, hubs, minutes in DB_LAYOUT:
+        periods = int(years * 365 * 24 * 60 / minutes * scale)
+        stamps = pd.date_range(end=end, periods=periods, freq=f"{minutes}min").strftime("%Y-%m-%d %H:%M:%S").tolist()
+        for hub in hubs:
+            prices = (35 + rng.normal(0, 12, periods)).round(2).tolist()
+            conn.executemany("INSERT INTO historical_prices VALUES (?, ?, ?, ?)", zip([iso] * periods, [hub] * periods, stamps, prices))
+        conn.commit()
+    conn.close()
+    os.replace(tmp_path, path)
+    _index_db(path)
+    return path
+
+
+def _index_db(path):
+    conn = price_db.connect(path)
+    try:
+        price_db.ensure_schema(conn)
+    finally:
+        conn.close()
+
+
+# --- HARNESS ---
+def run_case(name, fn, repeat):
+    """One warmup call, then `repeat` timed calls; returns timing summary"""
+    fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return {"case": name, "repeat": repeat, "min_s": min(samples), "median_s": statistics.median(samples), "mean_s": statistics.fmean(samples)}
+
+
+def load_cache_entry(path, hub):
+    """The app's entry read for one hub (price_data.load_cache_entry) against the cache at path"""
+    price_data.CACHE_FILE = path
+    return price_data.load_cache_entry([hub])
+
+
+def load_hub_cold(path, hub):
+    """A first request for one hub: header-only entry, then PriceRefresher._hub maps the column"""
+    price_data.CACHE_FILE = path
+    refresher = price_data.PriceRefresher()
+    refresher._reload_if_changed()
+    return refresher._hub(hub)
+
+
+def load_pickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def build_cases(args, tmpdir):
+    """(name, fn, repeat) tuples for every benchmarked path"""
+    repeat = args.repeat
+    cases = []
+    for years in (1, 5):
+        prices = synthetic_prices(years, seed=years)
+        label = f"{years}y"
+        indexes = build_horizon_indexes(prices)
+        breakeven = 111.11
+        cases += [
+            (f"alpha.horizon_alpha.{label}", lambda p=prices: horizon_alpha(p, breakeven, 40, 60, HORIZON_DAYS, 0.5, 0.5), repeat),
+            (f"alpha.period_365d.{label}", lambda p=prices: horizon_alpha(p, breakeven, 40, 60, (365,), 0.5, 0.5), repeat),
+            (f"alpha.index_build.{label}", lambda p=prices: build_horizon_indexes(p), repeat),
+            (f"alpha.indexed_lookup.{label}", lambda ix=indexes: indexed_horizon_alpha(ix, breakeven, 40, 60, 0.5, 0.5), repeat * 10),
+            (f"alpha.sensitivity_400.{label}", lambda ix=indexes: alpha_sensitivity(ix[365], np.linspace(0, 250, 400), 40, 60), repeat * 10),
+            (f"chart.pyramid_build.{label}", lambda p=prices: MinMaxPyramid(p.to_numpy()), repeat),
+        ]
+
+        col_path = os.path.join(tmpdir, f"prices_{label}.col")
+        pkl_path = os.path.join(tmpdir, f"prices_{label}.pkl")
+        # Hubs are shifted copies of one series; only the layout matters for load cost
+        frame = pd.DataFrame({hub: np.roll(prices.to_numpy(), i * 37) for i, hub in enumerate(CACHE_LOCATIONS)}, index=prices.index)
+        write_frame(col_path, frame, {"timestamp": datetime.now().isoformat()})
+        with open(pkl_path, "wb") as f:
+            pickle.dump({"prices": prices, "timestamp": datetime.now()}, f)
+        cases += [
+            (f"cache.save.{label}", lambda f=frame, path=col_path: write_frame(path, f, {"timestamp": datetime.now().isoformat()}), repeat),
+            (f"cache.load_entry.{label}", lambda path=col_path: load_cache_entry(path, "HB_NORTH"), repeat * 10),
+            (f"cache.load_hub_cold.{label}", lambda path=col_path: load_hub_cold(path, "HB_NORTH"), repeat * 10),
+            (f"cache.load_legacy_pickle.{label}", lambda path=pkl_path: load_pickle(path), repeat),
+        ]
+        if years == 1:
+            cases.append((f"dispatch.simulate_24_sizes.{label}", lambda p=prices: simulate_dispatch(p, np.linspace(10, 240, 24), 2.0, breakeven), repeat))
+            cases.append((f"risk.profile_5000_paths.{label}", lambda p=prices: risk_profile(p, breakeven, 40, 60, 0.5, 0.5, 5e7, workers=1), repeat))
+            cases.append((f"volatility.rolling_30d.{label}", lambda p=prices: rolling_stats(p, 30, breakeven), repeat))
+            cases.append((f"volatility.windows_build.{label}", lambda p=prices: RollingAnalytics().extend(p), repeat))
+
+    cases += [
+        ("economics.get_metrics_x4", lambda: [economics.get_metrics(m, b, itc, mc, 0.456, 111.11, 0.5, 0.5, 15.0, 20.0) for m, b, itc, mc in ((0, 0, 0, False), (35, 60, 0, False), (0, 0, 0.3, True), (35, 60, 0.3, True))], repeat * 10),
+        ("economics.optimize_sizing_101x101", lambda: economics.optimize_sizing(np.linspace(0, 200, 101), np.linspace(0, 200, 101), 0.456, 111.11, 0.5, 0.5, 15.0, 20.0, max_payback=3.0), repeat),
+    ]
+
+    if args.only and not any(p.startswith(args.only) or args.only.startswith(p) for p in ("audit", "backtest")):
+        return cases
+    db_path = build_history_db(os.path.join(DATA_DIR, f"historical_prices_x{args.db_scale:g}.db"), scale=args.db_scale)
+
+    def audit_query():
+        conn = sqlite3.connect(db_path)
+        try:
+            return pd.read_sql_query(audit_db.AUDIT_QUERY, conn)
+        finally:
+            conn.close()
+
+    def audit_full():
+        with contextlib.redirect_stdout(io.StringIO()):
+            audit_db.audit_database(db_path, full=True)
+
+    def audit_incremental():
+        with contextlib.redirect_stdout(io.StringIO()):
+            audit_db.audit_database(db_path)
+
+    cases += [
+        ("audit.query", audit_query, max(1, repeat // 2)),
+        ("audit.full", audit_full, max(1, repeat // 2)),
+        ("audit.incremental", audit_incremental, repeat),
+        ("backtest.ercot_hubs", lambda: run_backtest(db_path, [s for s in price_db.available_series(db_path) if s[0] == "ERCOT"], workers=1), max(1, repeat // 2)),
+    ]
+    return cases
+
+
+# --- RESULTS ---
+def load_previous(path, run_id):
+    """Latest earlier result per (case, db_scale), for regression comparison"""
+    previous = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                row = json.loads(line)
+                if row.get("run_id") != run_id:
+                    previous[(row["case"], row.get("db_scale"))] = row
+    return previous
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hybrid OS hot-path benchmarks")
+    parser.add_argument("--quick", action="store_true", help="small audit database and fewer repeats")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db-scale", type=float, default=1.0, help="fraction of the ~250MB audit database to generate")
+    parser.add_argument("--only", default=None, help="run cases whose name starts with this prefix")
+    parser.add_argument("--results", default=RESULTS_FILE)
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 if any median regresses past the threshold")
+    args = parser.parse_args()
+    if args.quick:
+        args.repeat = min(args.repeat, 3)
+        args.db_scale = min(args.db_scale, 0.05)
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    run_id = uuid.uuid4().hex[:12]
+    meta = {
+        "run_id": run_id,
+        "ts": datetime.now().isoformat(timespec="seconds"),
+        "git_rev": git_revision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.node(),
+        "db_scale": args.db_scale,
+    }
+    previous = load_previous(args.results, run_id)
+
+    regressions = []
+    with tempfile.TemporaryDirectory() as tmpdir, open(args.results, "a") as out:
+        for name, fn, repeat in build_cases(args, tmpdir):
+            if args.only and not name.startswith(args.only):
+                continue
+            result = {**meta, **run_case(name, fn, repeat)}
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+
+            prior = previous.get((name, args.db_scale))
+            delta = ""
+            if prior and prior["median_s"] > 0:
+                change = result["median_s"] / prior["median_s"] - 1
+                delta = f"{change:+7.1%} vs {prior['git_rev']}"
+                if change > REGRESSION_THRESHOLD:
+                    delta += "  REGRESSION"
+                    regressions.append(name)
+            print(f"{name:<40} median {result['median_s'] * 1000:10.3f} ms   min {result['min_s'] * 1000:10.3f} ms   {delta}")
+
+    print(f"\nResults appended to {args.results} (run {run_id}, rev {meta['git_rev']})")
+    if regressions and args.fail_on_regression:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
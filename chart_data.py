@@ -0,0 +1,59 @@
+import numpy as np
+
+# --- CONFIGURATION ---
+DEFAULT_POINT_BUDGET = 2000
+PYRAMID_BASE = 4
+
+
+class MinMaxPyramid:
+    """Multi-resolution min/max decimation of a price series.
+
+    Level k groups the raw series into buckets of PYRAMID_BASE**k intervals and
+    keeps the position of each bucket's min and max, so spikes survive any
+    amount of downsampling. Each level is built from the one below it, making
+    the whole pyramid O(n). Queries pick the finest level whose bucket count
+    fits the point budget for the requested range.
+    """
+
+    def __init__(self, values, base=PYRAMID_BASE):
+        v = np.asarray(values, dtype=np.float64)
+        self.n = len(v)
+        self.base = base
+        self.levels = []
+
+        lo_key = np.where(np.isnan(v), np.inf, v)
+        hi_key = np.where(np.isnan(v), -np.inf, v)
+        min_i = max_i = np.arange(self.n)
+        size = 1
+        while len(min_i) > 1:
+            pad = (-len(min_i)) % base
+            # Pad with the last bucket's own index so padding never wins a comparison
+            min_p = np.concatenate([min_i, np.repeat(min_i[-1:], pad)]).reshape(-1, base)
+            max_p = np.concatenate([max_i, np.repeat(max_i[-1:], pad)]).reshape(-1, base)
+            rows = np.arange(len(min_p))
+            min_i = min_p[rows, np.argmin(lo_key[min_p], axis=1)]
+            max_i = max_p[rows, np.argmax(hi_key[max_p], axis=1)]
+            size *= base
+            self.levels.append((size, min_i, max_i))
+
+    def query(self, start=0, stop=None, budget=DEFAULT_POINT_BUDGET):
+        """Sorted raw positions in [start, stop) to plot, at most ~budget of them"""
+        stop = self.n if stop is None else min(stop, self.n)
+        start = max(0, start)
+        if stop - start <= budget:
+            return np.arange(start, stop)
+        for size, min_i, max_i in self.levels:
+            b_lo, b_hi = start // size, -(-stop // size)
+            if 2 * (b_hi - b_lo) <= budget:
+                picks = np.union1d(min_i[b_lo:b_hi], max_i[b_lo:b_hi])
+                return picks[(picks >= start) & (picks < stop)]
+        size, min_i, max_i = self.levels[-1]
+        return np.union1d(min_i, max_i)
+
+
+def decimate(series, pyramid, start=None, end=None, budget=DEFAULT_POINT_BUDGET):
+    """Downsample series between index labels start and end (inclusive) to the point budget"""
+    index = series.index
+    lo = 0 if start is None else int(index.searchsorted(start, side="left"))
+    hi = len(series) if end is None else int(index.searchsorted(end, side="right"))
+    return series.iloc[pyramid.query(lo, hi, budget)]
@@ -0,0 +1,130 @@
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+
+# --- CONFIGURATION ---
+LOG_FILE = os.environ.get("HYBRID_DIAGNOSTICS_LOG", "hybrid_os_diagnostics.jsonl")
+# Each process appends to its own file (log_path): RotatingFileHandler cannot be shared
+# by processes rotating the same file. Files rotate at LOG_MAX_BYTES and keep LOG_BACKUPS
+# old copies, so a long-lived server stays bounded on disk
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 3
+SAMPLE_WINDOW = 200
+ERROR_WINDOW = 50
+
+_lock = threading.Lock()
+_timings = {}
+_counters = {}
+_errors = deque(maxlen=ERROR_WINDOW)
+_logger = None
+_logger_pid = None
+
+
+def log_path(pid=None):
+    """This process's log file: LOG_FILE with the pid before the extension"""
+    root, ext = os.path.splitext(LOG_FILE)
+    return f"{root}.{pid or os.getpid()}{ext}"
+
+
+def _get_logger():
+    """JSON-lines logger, one object per event, appended to log_path() and rotated by size"""
+    global _logger, _logger_pid
+    if _logger is not None and _logger_pid == os.getpid():
+        return _logger
+    with _lock:
+        if _logger is not None and _logger_pid == os.getpid():
+            return _logger
+        logger = logging.getLogger("hybrid_os.diagnostics")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        # A forked worker inherits its parent's handler; give it a file of its own
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        try:
+            handler = logging.handlers.RotatingFileHandler(log_path(), maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+        except OSError:
+            logger.addHandler(logging.NullHandler())
+        _logger, _logger_pid = logger, os.getpid()
+    return _logger
+
+
+def _emit(kind, name, **fields):
+    event = {"ts": datetime.now(timezone.utc).isoformat(), "pid": os.getpid(), "kind": kind, "name": name, **fields}
+    _get_logger().info(json.dumps(event, default=str))
+
+
+# --- RECORDING ---
+def observe(name, seconds, **fields):
+    """Record one duration sample under name"""
+    with _lock:
+        stat = _timings.get(name)
+        if stat is None:
+            stat = _timings[name] = {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0, "samples": deque(maxlen=SAMPLE_WINDOW)}
+        stat["count"] += 1
+        stat["total"] += seconds
+        stat["max"] = max(stat["max"], seconds)
+        stat["last"] = seconds
+        stat["samples"].append(seconds)
+    _emit("timing", name, seconds=round(seconds, 6), **fields)
+
+
+def incr(name, n=1, **fields):
+    """Bump a counter (cache hits, rows processed, retries...)"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+    _emit("counter", name, value=n, **fields)
+
+
+def error(name, exc, **fields):
+    """Record a handled exception instead of swallowing it silently"""
+    entry = {"ts": datetime.now(), "name": name, "error": f"{type(exc).__name__}: {exc}"}
+    with _lock:
+        _errors.append(entry)
+        _counters[f"{name}.error"] = _counters.get(f"{name}.error", 0) + 1
+    _emit("error", name, error=entry["error"], **fields)
+
+
+@contextmanager
+def timed(name, **fields):
+    """Time the enclosed block; extra fields go to the JSON log"""
+    start = time.perf_counter()
+    try:
+        yield fields
+    finally:
+        observe(name, time.perf_counter() - start, **fields)
+
+
+# --- REPORTING ---
+def snapshot():
+    """Copy of current timings, counters and recent errors for display"""
+    with _lock:
+        timings = []
+        for name, stat in sorted(_timings.items()):
+            samples = np.array(stat["samples"]) if stat["samples"] else np.zeros(1)
+            timings.append({
+                "name": name,
+                "count": stat["count"],
+                "mean_ms": stat["total"] / stat["count"] * 1000,
+                "p95_ms": float(np.percentile(samples, 95)) * 1000,
+                "max_ms": stat["max"] * 1000,
+                "last_ms": stat["last"] * 1000,
+            })
+        return {"timings": timings, "counters": dict(sorted(_counters.items())), "errors": list(_errors)}
+
+
+def reset():
+    """Clear all in-memory stats (the JSON log is left untouched)"""
+    with _lock:
+        _timings.clear()
+        _counters.clear()
+        _errors.clear()
@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+# --- CONFIGURATION ---
+DEFAULT_RTE = 0.85
+DEFAULT_SOC_MIN = 0.10
+DEFAULT_SOC_MAX = 0.90
+DEFAULT_INTERVAL_HOURS = 5 / 60.0
+CHUNK_INTERVALS = 288 * 31
+
+
+# --- CLAMP SCAN ---
+# Each interval applies soc -> min(max(soc + a, lo), hi). Functions of that
+# form are closed under composition, so the whole SoC path is an associative
+# prefix scan: log2(n) vectorized passes instead of n Python iterations.
+def _compose(a1, l1, h1, a2, l2, h2):
+    """Apply (a1, l1, h1) then (a2, l2, h2); returns the combined clamp"""
+    h = np.minimum(np.maximum(h1 + a2, l2), h2)
+    l = np.minimum(np.maximum(l1 + a2, l2), h)
+    return a1 + a2, l, h
+
+
+def _clamp_scan(a, lo, hi, soc0):
+    """SoC after every interval for soc_t = clip(soc_{t-1} + a_t, lo, hi); columns are independent"""
+    a = a.copy()
+    l = np.broadcast_to(lo, a.shape).copy()
+    h = np.broadcast_to(hi, a.shape).copy()
+    shift = 1
+    while shift < len(a):
+        a_new, l_new, h_new = _compose(a[:-shift], l[:-shift], h[:-shift], a[shift:], l[shift:], h[shift:])
+        a[shift:], l[shift:], h[shift:] = a_new, l_new, h_new
+        shift *= 2
+    return np.minimum(np.maximum(soc0 + a, l), h)
+
+
+def _interval_hours(prices):
+    """Median spacing of a DatetimeIndex in hours, defaulting to 5-minute settlement"""
+    if isinstance(prices, pd.Series) and isinstance(prices.index, pd.DatetimeIndex) and len(prices) > 1:
+        step = np.median(np.diff(prices.index.asi8)) / 3.6e12
+        if step > 0:
+            return float(step)
+    return DEFAULT_INTERVAL_HOURS
+
+
+def simulate_dispatch(prices, power_mw, duration_h, breakeven, rte=DEFAULT_RTE, soc_min=DEFAULT_SOC_MIN, soc_max=DEFAULT_SOC_MAX,
+                      miner_mw=0.0, charge_below=None, discharge_above=None, interval_hours=None, chunk_size=CHUNK_INTERVALS):
+    """Simulate threshold battery dispatch with SoC limits for many battery sizes at once.
+
+    The battery charges when price <= charge_below (default: breakeven) and
+    discharges when price >= discharge_above (default: breakeven / rte), with
+    round-trip efficiency split evenly between charge and discharge. When
+    miners are on site, charging is costed at max(price, breakeven): energy
+    put into the battery is energy the miners could have monetized. Intervals
+    without a price (NaN) are idle for both.
+
+    Dispatch in MWh scales linearly with power for a fixed duration, so the
+    SoC path is solved once per distinct duration (vectorized across them and
+    chunked over time) and scaled to each power rating. power_mw and
+    duration_h broadcast together. Returns one DataFrame row per battery.
+    """
+    p = np.asarray(prices, dtype=np.float64)
+    dt = interval_hours if interval_hours is not None else _interval_hours(prices)
+    # Outage intervals (NaN) are idle: a zero step leaves SoC where it is and nothing settles
+    priced = ~np.isnan(p)
+    settle = np.where(priced, p, 0.0)
+    power, duration = (x.ravel() for x in np.broadcast_arrays(np.asarray(power_mw, dtype=np.float64), np.asarray(duration_h, dtype=np.float64)))
+
+    eta = np.sqrt(rte)
+    charge_below = breakeven if charge_below is None else charge_below
+    discharge_above = breakeven / rte if discharge_above is None else discharge_above
+    charge_cost = np.where(priced, np.maximum(p, breakeven), 0.0) if miner_mw > 0 else settle
+
+    # Intended SoC change per MW of power, in hours of stored energy
+    step = np.where(priced & (p <= charge_below), dt * eta, np.where(priced & (p >= discharge_above), -dt, 0.0))
+
+    durations, dur_idx = np.unique(duration, return_inverse=True)
+    lo, hi = soc_min * durations, soc_max * durations
+    soc = lo.copy()
+    revenue = np.zeros(len(durations))
+    cost = np.zeros(len(durations))
+    charged = np.zeros(len(durations))
+    discharged = np.zeros(len(durations))
+    for start in range(0, len(p), chunk_size):
+        stop = min(start + chunk_size, len(p))
+        a = np.repeat(step[start:stop, None], len(durations), axis=1)
+        path = _clamp_scan(a, lo, hi, soc)
+        delta = np.diff(np.vstack([soc, path]), axis=0)
+        into = np.maximum(delta, 0.0) / eta
+        out = np.maximum(-delta, 0.0) * eta
+        revenue += settle[start:stop] @ out
+        cost += charge_cost[start:stop] @ into
+        charged += into.sum(axis=0)
+        discharged += out.sum(axis=0)
+        soc = path[-1]
+
+    mining_alpha = float(np.fmax(breakeven - p, 0.0).sum() * miner_mw * dt)
+    usable = (soc_max - soc_min) * durations
+    results = pd.DataFrame({
+        "power_mw": power,
+        "duration_h": duration,
+        "energy_mwh": power * duration,
+        "discharge_revenue": revenue[dur_idx] * power,
+        "charge_cost": cost[dur_idx] * power,
+        "battery_alpha": (revenue - cost)[dur_idx] * power,
+        "discharged_mwh": discharged[dur_idx] * power,
+        "charged_mwh": charged[dur_idx] * power,
+        "cycles": np.divide(discharged / eta, usable, out=np.zeros_like(usable), where=usable > 0)[dur_idx],
+        "mining_alpha": mining_alpha,
+    })
+    results["total_alpha"] = results["battery_alpha"] + results["mining_alpha"]
+    return results
@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+# --- CONFIGURATION ---
+BATT_COST_PER_MW = 897404.0
+CORP_TAX_RATE = 0.21
+HOURS_PER_YEAR = 8760
+ITC_OPTIONS = (0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6)
+# Grid-only revenue per horizon for a 200 MW reference site, before the export margin
+BASELINE_REVENUE = {1: 101116, 7: 704735, 30: 3009339, 182: 13159992, 365: 26469998}
+BASELINE_SITE_MW = 200
+BASELINE_MARGIN = 0.65
+
+METRIC_FIELDS = ("mining_alpha", "battery_alpha", "net_capex", "irr", "payback", "miner_capex", "battery_capex", "itc_value", "macrs_shield")
+
+
+def _safe_ratio(num, den, mask):
+    """num / den where mask holds, 0 elsewhere, without divide-by-zero warnings"""
+    num, den, mask = np.broadcast_arrays(num, den, mask)
+    return np.divide(num, den, out=np.zeros(num.shape, dtype=np.float64), where=mask)
+
+
+# --- SITE MODEL ---
+def miner_breakeven(m_eff, hp_cents):
+    """Power price in $/MWh at which a miner's hashprice revenue equals its power cost"""
+    return (1e6 / m_eff) * (hp_cents / 100.0) / 24.0
+
+
+def generation_mix(solar_mw, wind_mw):
+    """(solar share, wind share) of nameplate generation; an empty site counts as an even mix"""
+    total = solar_mw + wind_mw
+    if total <= 0:
+        return 0.5, 0.5
+    return solar_mw / total, wind_mw / total
+
+
+def ideal_sizing(solar_mw, wind_mw):
+    """Target (miner MW, battery MW) for a generation mix: wind favors miners, solar favors storage"""
+    total = solar_mw + wind_mw
+    s_pct, w_pct = generation_mix(solar_mw, wind_mw)
+    return int(total * ((s_pct * 0.10) + (w_pct * 0.25))), int(total * ((s_pct * 0.50) + (w_pct * 0.25)))
+
+
+def revenue_split(ma, ba, total_gen, days):
+    """Grid baseline for a horizon and the mining/battery alpha on top of it, as a dict"""
+    baseline = BASELINE_REVENUE[days] * (total_gen / BASELINE_SITE_MW) * BASELINE_MARGIN
+    pct = lambda v: (v / baseline * 100) if baseline > 0 else 0
+    return {
+        "baseline": baseline,
+        "alpha": ma + ba,
+        "total": baseline + ma + ba,
+        "pct_increase": pct(ma + ba),
+        "mining_pct": pct(ma),
+        "battery_pct": pct(ba),
+    }
+
+
+def get_metrics(m, b, itc_v, mc_on, cap, breakeven, w_pct, s_pct, m_eff, m_cost):
+    """Annual alpha, capex, tax shields, IRR and payback for a miner/battery configuration.
+
+    Every argument may be a scalar or a NumPy array; arrays broadcast against
+    each other so whole sizing grids evaluate in one call. Returns the tuple
+    (ma, ba, nc, irr, roi, m_c, b_c, iv, ms); scalar inputs give float outputs.
+    """
+    scalar = all(np.ndim(x) == 0 for x in (m, b, itc_v, mc_on, cap, breakeven, w_pct, s_pct, m_eff, m_cost))
+    m = np.asarray(m, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+
+    ma = (cap * HOURS_PER_YEAR * m * (breakeven - 12)) * (1.0 + (w_pct * 0.20))
+    ba = (0.12 * HOURS_PER_YEAR * b * (breakeven + 30)) * (1.0 + (s_pct * 0.25))
+    m_c = ((m * 1e6) / m_eff) * m_cost
+    b_c = b * BATT_COST_PER_MW
+    iv = b_c * itc_v
+    ms = np.where(mc_on, ((m_c + b_c) - (0.5 * iv)) * CORP_TAX_RATE, 0.0)
+    nc = (m_c + b_c) - iv - ms
+    alpha = ma + ba
+    irr = _safe_ratio(alpha * 100, nc, nc > 0)
+    roi = _safe_ratio(nc, alpha, alpha > 0)
+
+    out = np.broadcast_arrays(ma, ba, nc, irr, roi, m_c, b_c, iv, ms)
+    if scalar:
+        return tuple(float(x) for x in out)
+    return tuple(out)
+
+
+# --- SIZING OPTIMIZER ---
+def pareto_frontier(alpha, irr):
+    """Indices of configurations not beaten on both annual alpha and IRR, by descending alpha"""
+    order = np.lexsort((-irr, -alpha))
+    best_irr = np.maximum.accumulate(irr[order])
+    keep = np.empty(len(order), dtype=bool)
+    keep[:1] = True
+    keep[1:] = irr[order][1:] > best_irr[:-1]
+    return order[keep]
+
+
+def optimize_sizing(m_grid, b_grid, cap, breakeven, w_pct, s_pct, m_eff, m_cost, itc_options=ITC_OPTIONS, macrs_options=(False, True), max_payback=None):
+    """Sweep every (miner MW, battery MW, ITC, MACRS) combination as one broadcast.
+
+    Returns (grid, frontier, optimum): grid is a DataFrame of every evaluated
+    configuration, frontier the IRR-vs-alpha Pareto set, and optimum the row
+    with the highest IRR (ties to higher alpha) among profitable configurations
+    whose payback is within max_payback years, or None if none qualify.
+    """
+    m = np.asarray(m_grid, dtype=np.float64)[:, None, None, None]
+    b = np.asarray(b_grid, dtype=np.float64)[None, :, None, None]
+    itc = np.asarray(itc_options, dtype=np.float64)[None, None, :, None]
+    mc = np.asarray(macrs_options, dtype=bool)[None, None, None, :]
+
+    metrics = get_metrics(m, b, itc, mc, cap, breakeven, w_pct, s_pct, m_eff, m_cost)
+    shape = metrics[0].shape
+    m_b, b_b, itc_b, mc_b = np.broadcast_arrays(m, b, itc, mc)
+    grid = pd.DataFrame({
+        "miner_mw": m_b.ravel(),
+        "battery_mw": b_b.ravel(),
+        "itc": itc_b.ravel(),
+        "macrs": mc_b.ravel(),
+        **{name: np.broadcast_to(v, shape).ravel() for name, v in zip(METRIC_FIELDS, metrics)},
+    })
+    grid["annual_alpha"] = grid["mining_alpha"] + grid["battery_alpha"]
+
+    alpha = grid["annual_alpha"].to_numpy()
+    irr = grid["irr"].to_numpy()
+    frontier = grid.iloc[pareto_frontier(alpha, irr)].reset_index(drop=True)
+
+    ok = (alpha > 0) & (grid["net_capex"].to_numpy() > 0)
+    if max_payback is not None:
+        ok &= grid["payback"].to_numpy() <= max_payback
+    optimum = None
+    if ok.any():
+        candidates = np.flatnonzero(ok)
+        # Round IRR so float noise between proportional configurations does not break the alpha tie-break
+        best = candidates[np.lexsort((-alpha[candidates], -np.round(irr[candidates], 6)))[0]]
+        optimum = grid.iloc[best]
+    return grid, frontier, optimum
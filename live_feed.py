@@ -0,0 +1,195 @@
+"""Near-real-time price feed: the newest RTM intervals for one hub in a fixed-size ring buffer.
+
+A worker thread polls only the last few intervals every POLL_SECONDS and
+appends anything newer than what it holds, so the live metrics stay within a
+settlement interval of the market without reloading the year-long history.
+Readers copy at most BUFFER_SIZE values under a lock. A feed nobody has
+asked for in IDLE_SECONDS stops polling and restarts on the next get_feed().
+
+    python live_feed.py --iso ERCOT --location HB_WEST   # print each new interval
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import diagnostics
+import price_db
+from price_fetch import fetch_with_retries
+
+# --- CONFIGURATION ---
+POLL_SECONDS = 120
+BUFFER_SIZE = 288
+LOOKBACK_MINUTES = 30
+IDLE_SECONDS = 900
+POLL_RETRIES = 1
+
+
+# --- RING BUFFER ---
+class RingBuffer:
+    """Last `size` (timestamp, price) intervals in preallocated arrays, oldest overwritten first"""
+
+    def __init__(self, size=BUFFER_SIZE):
+        self.size = size
+        self.ts = np.zeros(size, dtype=np.int64)
+        self.values = np.zeros(size, dtype=np.float64)
+        self.count = 0
+        self._head = 0
+
+    @property
+    def last_ts(self):
+        return int(self.ts[(self._head - 1) % self.size]) if self.count else None
+
+    def append(self, ts_ns, value):
+        """Add one interval; a repeat of the newest timestamp revises it, anything older is ignored"""
+        last = self.last_ts
+        if last is not None and ts_ns < last:
+            return False
+        if last is not None and ts_ns == last:
+            self.values[(self._head - 1) % self.size] = value
+            return False
+        self.ts[self._head] = ts_ns
+        self.values[self._head] = value
+        self._head = (self._head + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        return True
+
+    def extend(self, series):
+        """Append a time-indexed Series in order; returns the number of new intervals"""
+        if len(series) == 0:
+            return 0
+        ts = series.index.as_unit("ns").asi8
+        values = series.to_numpy(dtype=np.float64)
+        order = np.argsort(ts, kind="stable")
+        ts, values = ts[order], values[order]
+        if self.last_ts is not None:
+            keep = np.searchsorted(ts, self.last_ts, side="left")
+            ts, values = ts[keep:], values[keep:]
+        return sum(self.append(int(t), float(v)) for t, v in zip(ts[-self.size:], values[-self.size:]))
+
+    def to_series(self, tz="UTC"):
+        """Buffered intervals, oldest first, as a Series"""
+        idx = (np.arange(self.count) + self._head - self.count) % self.size
+        return pd.Series(self.values[idx], index=pd.DatetimeIndex(self.ts[idx], tz="UTC").tz_convert(tz), name="LMP")
+
+
+# --- FEED ---
+class LiveFeed:
+    """Polls the newest RTM intervals of one hub on a worker thread into a RingBuffer"""
+
+    def __init__(self, iso, location, client=None, poll_seconds=POLL_SECONDS, size=BUFFER_SIZE):
+        self.iso = iso
+        self.location = location
+        self.client = client
+        self.poll_seconds = poll_seconds
+        self.buffer = RingBuffer(size)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.polled_at = None
+        self.last_error = None
+        self.last_read = time.time()
+
+    def seed(self, prices):
+        """Fill the buffer from already-loaded history so the panel has a price before the first poll"""
+        if not isinstance(prices, pd.Series) or not isinstance(prices.index, pd.DatetimeIndex):
+            return 0
+        with self._lock:
+            return self.buffer.extend(prices.iloc[-self.buffer.size:].dropna())
+
+    def poll(self):
+        """Fetch the last LOOKBACK_MINUTES and append what is new; returns the number of new intervals"""
+        client = self.client if self.client is not None else price_db.get_client(self.iso)
+        end = pd.Timestamp.now(tz="UTC")
+        start = end - pd.Timedelta(minutes=LOOKBACK_MINUTES)
+        with diagnostics.timed("live.poll", iso=self.iso) as fields:
+            df, error = fetch_with_retries(lambda s, e: price_db.fetch_iso_lmp(client, self.iso, s, e, [self.location]),
+                                           start, end, retries=POLL_RETRIES)
+            new = 0
+            if df is not None:
+                series = pd.Series(df["price"].to_numpy(), index=pd.to_datetime(df["timestamp"], utc=True))
+                with self._lock:
+                    new = self.buffer.extend(series.dropna())
+            fields["new"] = new
+        with self._lock:
+            self.polled_at = pd.Timestamp.now(tz="UTC")
+            self.last_error = None if error is None else str(error)
+        return new
+
+    def _run(self):
+        while not self._stop.is_set():
+            if time.time() - self.last_read > IDLE_SECONDS:
+                break
+            try:
+                self.poll()
+            except Exception as e:
+                with self._lock:
+                    self.last_error = str(e)
+                diagnostics.error("live.poll", e, iso=self.iso, location=self.location)
+            self._stop.wait(self.poll_seconds)
+
+    def start(self):
+        """Start polling unless a poller is already running"""
+        with self._lock:
+            self.last_read = time.time()
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name=f"live-feed-{self.location}", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def snapshot(self):
+        """Newest price and time, the buffered series and poll state"""
+        with self._lock:
+            series = self.buffer.to_series()
+            return {
+                "price": float(series.iloc[-1]) if len(series) else None,
+                "as_of": series.index[-1] if len(series) else None,
+                "series": series,
+                "polled_at": self.polled_at,
+                "error": self.last_error,
+            }
+
+
+_feeds = {}
+_feeds_lock = threading.Lock()
+
+def get_feed(iso, location):
+    """Process-wide feed per hub; each call keeps its poller alive"""
+    with _feeds_lock:
+        if (iso, location) not in _feeds:
+            _feeds[(iso, location)] = LiveFeed(iso, location)
+        feed = _feeds[(iso, location)]
+    feed.start()
+    return feed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Poll the newest RTM intervals for one hub")
+    parser.add_argument("--iso", default="ERCOT")
+    parser.add_argument("--location", default="HB_WEST")
+    parser.add_argument("--poll-seconds", type=float, default=POLL_SECONDS)
+    args = parser.parse_args()
+
+    feed = LiveFeed(args.iso, args.location, poll_seconds=args.poll_seconds)
+    last = None
+    try:
+        while True:
+            feed.poll()
+            snap = feed.snapshot()
+            if snap["as_of"] is not None and snap["as_of"] != last:
+                print(f"{snap['as_of']:%Y-%m-%d %H:%M} UTC  ${snap['price']:.2f}  ({len(snap['series'])} buffered)")
+                last = snap["as_of"]
+            elif snap["error"]:
+                print(f"poll failed: {snap['error']}")
+            time.sleep(args.poll_seconds)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+import os
+import pickle
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import diagnostics
+from price_fetch import coalesce_ranges, fetch_chunks
+from price_store import DEFAULT_COLUMN, FileLock, read_frame, read_header, read_prices, write_frame
+
+# --- CONFIGURATION ---
+CACHE_FILE = "ercot_price_cache.col"
+LEGACY_CACHE_FILE = "ercot_price_cache.pkl"
+CACHE_EXPIRY_HOURS = 1
+RETENTION_DAYS = 365
+CHUNK_DAYS = 30
+DEFAULT_HUB = "HB_WEST"
+# Settlement points kept from each download: trading hubs and load zones
+LOCATION_PREFIXES = ("HB_", "LZ_")
+TIMEZONE = "US/Central"
+RETRY_SECONDS = 60
+LOCK_FILE = CACHE_FILE + ".lock"
+LOCK_WAIT_SECONDS = 600
+
+# --- CACHE FUNCTIONS ---
+def _encode_ranges(ranges):
+    return [[pd.Timestamp(s).isoformat(), pd.Timestamp(e).isoformat()] for s, e in ranges or []]
+
+def _decode_ranges(ranges):
+    return [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in ranges or []]
+
+def _as_frame(prices):
+    """Single-hub caches (the old pickle, pre-multi-hub .col files) hold HB_WEST only"""
+    if isinstance(prices, pd.Series):
+        return prices.to_frame(DEFAULT_HUB)
+    if list(prices.columns) == [DEFAULT_COLUMN]:
+        return prices.rename(columns={DEFAULT_COLUMN: DEFAULT_HUB})
+    return prices
+
+def _load_legacy_entry():
+    """Read the old pickle cache once so an upgrade does not force a full backfill"""
+    try:
+        with open(LEGACY_CACHE_FILE, 'rb') as f:
+            entry = pickle.load(f)
+        entry['prices'] = _as_frame(entry['prices'])
+        return entry
+    except Exception as e:
+        diagnostics.error('cache.load_legacy', e)
+        return None
+
+def load_cache_entry(columns=None):
+    """Load the raw cache entry ({'prices', 'timestamp', 'missing', 'locations'}) regardless of age.
+
+    prices has one column per location; pass columns to read only some of
+    them (columns=[] reads just the timestamps and metadata).
+    """
+    if os.path.exists(CACHE_FILE):
+        try:
+            with diagnostics.timed('cache.load') as fields:
+                locations = list(read_header(CACHE_FILE)['columns'])
+                legacy = locations == [DEFAULT_COLUMN]
+                if legacy and columns is not None:
+                    columns = [DEFAULT_COLUMN] if DEFAULT_HUB in columns else []
+                wanted = None if columns is None else [c for c in columns if c in locations]
+                prices, meta = read_frame(CACHE_FILE, wanted)
+                fields['rows'] = len(prices)
+            return {
+                'prices': _as_frame(prices),
+                'timestamp': datetime.fromisoformat(meta['timestamp']),
+                'missing': _decode_ranges(meta.get('missing')),
+                'locations': [DEFAULT_HUB] if legacy else locations,
+            }
+        except Exception as e:
+            diagnostics.error('cache.load', e)
+    elif os.path.exists(LEGACY_CACHE_FILE):
+        entry = _load_legacy_entry()
+        if entry is not None:
+            entry['locations'] = list(entry['prices'].columns)
+        return entry
+    return None
+
+def load_cached_hub(location=DEFAULT_HUB):
+    """One hub's Series from the cache regardless of age, or None.
+
+    The values stay memory-mapped (read_prices), so every worker process
+    shares the page cache instead of holding its own copy. Intervals where the
+    hub has no price are NaN; consumers skip them.
+    """
+    if not os.path.exists(CACHE_FILE):
+        entry = load_cache_entry([location])  # legacy pickle
+        return entry['prices'][location] if entry is not None and location in entry['prices'] else None
+    try:
+        with diagnostics.timed('cache.load_hub') as fields:
+            columns = list(read_header(CACHE_FILE)['columns'])
+            column = DEFAULT_COLUMN if columns == [DEFAULT_COLUMN] and location == DEFAULT_HUB else location
+            if column not in columns:
+                return None
+            prices, _ = read_prices(CACHE_FILE, column)
+            fields['rows'] = len(prices)
+        prices.name = location
+        return prices
+    except Exception as e:
+        diagnostics.error('cache.load_hub', e)
+        return None
+
+def load_cached_prices(location=DEFAULT_HUB):
+    """Load one hub's prices from local cache if fresh"""
+    return load_cached_hub(location) if is_fresh(load_cache_entry(columns=[])) else None
+
+def save_cached_prices(prices, missing=None):
+    """Save every hub's prices (and any still-missing ranges) to the columnar cache atomically"""
+    try:
+        with diagnostics.timed('cache.save', rows=len(prices), locations=prices.shape[1]):
+            write_frame(CACHE_FILE, prices, {'timestamp': datetime.now().isoformat(), 'missing': _encode_ranges(missing)})
+    except Exception as e:
+        diagnostics.error('cache.save', e)
+
+# --- UPSTREAM FETCH ---
+def keep_location(location):
+    """True for the settlement points worth keeping from a download"""
+    return str(location).startswith(LOCATION_PREFIXES)
+
+def fetch_rtm_prices(start, end, ranges=None):
+    """Fetch RTM LMPs for every hub and load zone concurrently; returns (frame chunks, missing ranges)"""
+    return fetch_chunks(start, end, location=keep_location, chunk_days=CHUNK_DAYS, ranges=ranges)
+
+def merge_prices(existing, new_chunks, end, retention_days=RETENTION_DAYS):
+    """Append new chunks, dedupe on timestamp (newest wins) and trim to the retention window"""
+    parts = ([existing] if existing is not None and len(existing) > 0 else []) + list(new_chunks)
+    if not parts:
+        return None
+    merged = pd.concat(parts)
+    merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+    return merged[merged.index >= end - pd.Timedelta(days=retention_days)]
+
+def is_fresh(entry):
+    """True if a cache entry was written within CACHE_EXPIRY_HOURS"""
+    return entry is not None and entry['timestamp'] > datetime.now() - timedelta(hours=CACHE_EXPIRY_HOURS)
+
+def update_prices():
+    """Return the cached hub frame, fetching only the intervals missing since the last stored timestamp.
+
+    A fresh cache is returned as-is. A stale cache is topped up from its last
+    timestamp to now; a missing, unreadable or out-of-window cache falls back
+    to a full RETENTION_DAYS backfill. Ranges that failed on an earlier run are
+    retried alongside the new tail. Returns None if nothing could be fetched.
+
+    Refreshes are single-flight through LOCK_FILE: a caller that finds another
+    process mid-refresh returns the stale frame instead of fetching again.
+    """
+    entry = load_cache_entry()
+    if is_fresh(entry):
+        diagnostics.incr('cache.hit')
+        return entry['prices']
+    diagnostics.incr('cache.miss')
+
+    # Single-flight across threads and worker processes: one holder fetches,
+    # everyone else keeps serving stale data (or waits if there is none yet)
+    lock = FileLock(LOCK_FILE)
+    if not lock.acquire(blocking=False):
+        if entry is not None:
+            diagnostics.incr('cache.stale_served')
+            return entry['prices']
+        if not lock.acquire(timeout=LOCK_WAIT_SECONDS):
+            return None
+    try:
+        # Re-check under the lock: the previous holder may have just published
+        entry = load_cache_entry()
+        if is_fresh(entry):
+            return entry['prices']
+        return _refresh_entry(entry)
+    finally:
+        lock.release()
+
+def _refresh_entry(entry):
+    """Fetch what the stale (or missing) entry lacks and publish the merged frame"""
+    end_date = pd.Timestamp.now(tz=TIMEZONE)
+    window_start = end_date - pd.Timedelta(days=RETENTION_DAYS)
+
+    existing = entry['prices'] if entry is not None else None
+    if existing is not None and len(existing) > 0 and isinstance(existing.index, pd.DatetimeIndex):
+        last_ts = existing.index.max()
+        if last_ts.tzinfo is None:
+            last_ts = last_ts.tz_localize(TIMEZONE)
+        # Refetch from the last stored interval; overlap is removed by the dedupe
+        start_date = max(last_ts, window_start)
+    else:
+        existing = None
+        start_date = window_start
+
+    # Retry holes left by earlier runs alongside the new tail
+    prior_missing = [(max(s, window_start), e) for s, e in (entry or {}).get('missing', []) if e > window_start and existing is not None]
+    ranges = coalesce_ranges(prior_missing + [(start_date, end_date)])
+    with diagnostics.timed('fetch.backfill', ranges=len(ranges)) as fields:
+        new_chunks, missing = fetch_rtm_prices(start_date, end_date, ranges=ranges)
+        fields['rows'] = sum(len(c) for c in new_chunks)
+        fields['missing_ranges'] = len(missing)
+    merged = merge_prices(existing, new_chunks, end_date)
+    if merged is None or len(merged) == 0:
+        return None
+    if new_chunks:
+        save_cached_prices(merged, missing)
+    return merged
+
+# --- STALE-WHILE-REVALIDATE ---
+class PriceRefresher:
+    """Serves the last good dataset immediately and refreshes it on a worker thread.
+
+    get() never touches the network: it returns whatever is in memory (or on
+    disk, if another process has written a newer file) and, when that data is
+    stale, starts a single background update_prices() run. Failed refreshes are
+    retried at most every RETRY_SECONDS. Hubs are read from the cache file one
+    column at a time on first request, so switching hubs is a local lookup.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._file_mtime = None
+        self.entry = None
+        self.state = 'idle'
+        self.last_error = None
+        self.last_attempt = 0.0
+        self._hubs = {}
+
+    def _reload_if_changed(self):
+        try:
+            mtime = os.path.getmtime(CACHE_FILE)
+        except OSError:
+            mtime = None
+        if self.entry is None or mtime != self._file_mtime:
+            entry = load_cache_entry(columns=[])
+            if entry is not None:
+                self.entry = entry
+                self._hubs = {}
+            self._file_mtime = mtime
+
+    def _hub(self, location):
+        """One hub's Series, memory-mapped from disk on first use and then served from memory"""
+        if location not in self._hubs:
+            prices = self.entry['prices']
+            if location in prices.columns:
+                # Fetched data kept in memory when there is no cache file
+                self._hubs[location] = prices[location]
+            else:
+                self._hubs[location] = load_cached_hub(location) if location in self.entry['locations'] else None
+        return self._hubs[location]
+
+    def _run(self):
+        try:
+            prices = update_prices()
+            with self._lock:
+                self._reload_if_changed()
+                if prices is not None and self.entry is None:
+                    # Nothing on disk (e.g. read-only deploy); keep the fetched data in memory
+                    self.entry = {'prices': prices, 'timestamp': datetime.now(), 'missing': [], 'locations': list(prices.columns)}
+                    self._hubs = {}
+                self.state = 'idle' if prices is not None else 'error'
+                self.last_error = None if prices is not None else 'No data returned from upstream'
+        except Exception as e:
+            with self._lock:
+                self.state = 'error'
+                self.last_error = str(e)
+            diagnostics.error('refresh', e)
+
+    def get(self, location=DEFAULT_HUB):
+        """Return one hub's price Series (or None) and trigger a refresh if the dataset is stale"""
+        with self._lock:
+            self._reload_if_changed()
+            running = self._thread is not None and self._thread.is_alive()
+            due = time.time() - self.last_attempt >= RETRY_SECONDS
+            if not is_fresh(self.entry) and not running and due:
+                self.last_attempt = time.time()
+                self.state = 'refreshing'
+                self._thread = threading.Thread(target=self._run, name='price-refresh', daemon=True)
+                self._thread.start()
+            return self._hub(location) if self.entry is not None else None
+
+    def locations(self):
+        """Hubs and load zones available without another download"""
+        with self._lock:
+            return list(self.entry['locations']) if self.entry is not None else []
+
+    def status(self):
+        """Snapshot of refresh state and data age for display"""
+        with self._lock:
+            prices = self.entry['prices'] if self.entry is not None else None
+            return {
+                'state': self.state,
+                'refreshed_at': self.entry['timestamp'] if self.entry is not None else None,
+                'data_as_of': prices.index.max() if prices is not None and len(prices) > 0 else None,
+                'rows': len(prices) if prices is not None else 0,
+                'missing': self.entry.get('missing', []) if self.entry is not None else [],
+                'locations': len(self.entry['locations']) if self.entry is not None else 0,
+                'error': self.last_error,
+            }
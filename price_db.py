@@ -0,0 +1,321 @@
+"""Bulk loader for the multi-ISO historical_prices SQLite database.
+
+Pulls real-time LMPs for each ISO's trading hubs from gridstatus in chunks on
+a thread pool and writes them from a single connection in one transaction
+per chunk. The database runs in WAL mode with a unique covering index on
+(iso, location, timestamp), so re-loads are idempotent and per-hub scans
+(the audit, gap checks, summaries) read the index instead of the table.
+Every committed chunk is recorded in load_progress, which makes an
+interrupted 5-year backfill resume where it stopped.
+
+    python price_db.py                       # 5 years, every ISO
+    python price_db.py --iso ERCOT CAISO --years 1
+    python price_db.py --schema-only         # index an existing database
+    python price_db.py --backfill-gaps       # refetch ranges audit_db reports missing
+"""
+import argparse
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+
+import audit_db
+import diagnostics
+import price_summary
+from audit_db import DB_FILE, TIMESTAMP_FORMAT
+from price_fetch import BACKOFF_SECONDS, MAX_RETRIES, MAX_WORKERS, PROVIDER_ENV, FakeErcot, coalesce_ranges, fetch_with_retries, plan_chunks
+
+# --- CONFIGURATION ---
+CHUNK_DAYS = 7
+CACHE_SIZE_KB = 200_000
+# Trading hubs loaded per ISO (gridstatus location names)
+ISO_HUBS = {
+    "ERCOT": ["HB_WEST", "HB_NORTH", "HB_SOUTH", "HB_HOUSTON"],
+    "CAISO": ["TH_NP15_GEN-APND", "TH_SP15_GEN-APND"],
+    "PJM": ["WESTERN HUB", "AEP-DAYTON HUB"],
+    "MISO": ["ILLINOIS.HUB", "INDIANA.HUB"],
+    "SPP": ["SPPNORTH_HUB", "SPPSOUTH_HUB"],
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS historical_prices (
+    iso TEXT NOT NULL,
+    location TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    price REAL
+);
+CREATE TABLE IF NOT EXISTS load_progress (
+    iso TEXT NOT NULL,
+    location TEXT NOT NULL,
+    chunk_start TEXT NOT NULL,
+    chunk_end TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    loaded_at TEXT NOT NULL,
+    PRIMARY KEY (iso, location, chunk_start, chunk_end)
+);
+"""
+INDEX_SQL = "CREATE UNIQUE INDEX IF NOT EXISTS idx_prices_series ON historical_prices (iso, location, timestamp)"
+DEDUPE_SQL = """
+DELETE FROM historical_prices WHERE rowid NOT IN (
+    SELECT MAX(rowid) FROM historical_prices GROUP BY iso, location, timestamp
+)
+"""
+
+
+# --- CONNECTION & SCHEMA ---
+def connect(db_file=DB_FILE):
+    """Connection tuned for bulk loads and concurrent readers (WAL)"""
+    conn = sqlite3.connect(db_file, timeout=60)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB}")
+    return conn
+
+
+def ensure_schema(conn):
+    """Create tables and the covering series index; legacy duplicate rows are dropped first"""
+    conn.executescript(SCHEMA)
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_prices_series'").fetchone()
+    if exists:
+        return
+    try:
+        with diagnostics.timed("db.index"):
+            conn.execute(INDEX_SQL)
+    except sqlite3.IntegrityError:
+        # Databases filled before the unique index may hold repeated intervals
+        with conn:
+            removed = conn.execute(DEDUPE_SQL).rowcount
+        diagnostics.incr("db.duplicates_removed", removed)
+        conn.execute(INDEX_SQL)
+    conn.execute("ANALYZE")
+    conn.commit()
+
+
+def to_db_timestamps(times):
+    """UTC 'YYYY-MM-DD HH:MM:SS' strings; naive input is taken as UTC"""
+    times = pd.to_datetime(pd.Series(times), utc=True)
+    return times.dt.strftime(TIMESTAMP_FORMAT)
+
+
+# --- PROVIDERS ---
+_clients = {}
+
+def get_client(iso):
+    """One gridstatus client per ISO; HYBRID_PRICE_PROVIDER=fake serves synthetic hubs offline"""
+    if iso not in _clients:
+        if os.environ.get(PROVIDER_ENV, "").lower() == "fake":
+            _clients[iso] = FakeErcot(locations=ISO_HUBS[iso], seed=len(_clients))
+        else:
+            import gridstatus
+            _clients[iso] = {"ERCOT": gridstatus.Ercot, "CAISO": gridstatus.CAISO, "PJM": gridstatus.PJM,
+                             "MISO": gridstatus.MISO, "SPP": gridstatus.SPP}[iso]()
+    return _clients[iso]
+
+
+def fetch_iso_lmp(client, iso, start, end, hubs):
+    """Real-time LMPs for the hubs of one ISO as a (timestamp, location, price) frame"""
+    if isinstance(client, FakeErcot):
+        df = client.get_lmp(start, end=end, locations=hubs)
+    elif iso == "ERCOT":
+        df = client.get_rtm_lmp(start=start, end=end, verbose=False)
+    elif iso == "SPP":
+        df = client.get_lmp_real_time_5_min_by_location(start, end=end, location_type="HUB")
+    elif iso == "PJM":
+        df = client.get_lmp(start, end=end, market="REAL_TIME_5_MIN", locations="hubs")
+    else:
+        df = client.get_lmp(start, end=end, market="REAL_TIME_5_MIN", locations=hubs)
+
+    time_col = "Interval Start" if "Interval Start" in df.columns else "Time"
+    df = df[df["Location"].isin(hubs)]
+    return pd.DataFrame({
+        "timestamp": to_db_timestamps(df[time_col]).to_numpy(),
+        "location": df["Location"].to_numpy(),
+        "price": df["LMP"].astype(float).round(4).to_numpy(),
+    })
+
+
+# --- RESUME STATE ---
+def loaded_ranges(conn, iso, location):
+    """Coalesced [start, end) ranges already committed for one hub"""
+    rows = conn.execute("SELECT chunk_start, chunk_end FROM load_progress WHERE iso = ? AND location = ?", (iso, location)).fetchall()
+    return coalesce_ranges([(pd.Timestamp(s), pd.Timestamp(e)) for s, e in rows])
+
+
+def _covered(ranges, start, end):
+    return any(s <= start and end <= e for s, e in ranges)
+
+
+def pending_chunks(conn, iso, hubs, start, end, chunk_days=CHUNK_DAYS, ranges=None, force=False):
+    """Chunks of [start, end) (or explicit ranges) not yet committed for every hub"""
+    done = {hub: loaded_ranges(conn, iso, hub) for hub in hubs}
+    chunks = []
+    for r_start, r_end in (ranges if ranges is not None else [(start, end)]):
+        for s, e in plan_chunks(r_start, r_end, chunk_days):
+            if force or not all(_covered(done[hub], s, e) for hub in hubs):
+                chunks.append((s, e))
+    return chunks
+
+
+# --- READERS ---
+def read_series(conn, iso, location, start=None, end=None):
+    """One hub's prices over [start, end) as a UTC-indexed Series, seeking through the series index"""
+    query = "SELECT timestamp, price FROM historical_prices WHERE iso = ? AND location = ?"
+    params = [iso, location]
+    if start is not None:
+        query += " AND timestamp >= ?"
+        params.append(to_db_timestamps([start]).iloc[0])
+    if end is not None:
+        query += " AND timestamp < ?"
+        params.append(to_db_timestamps([end]).iloc[0])
+    df = pd.read_sql_query(query + " ORDER BY timestamp", conn, params=params)
+    index = pd.DatetimeIndex(pd.to_datetime(df["timestamp"], format=TIMESTAMP_FORMAT)).tz_localize("UTC")
+    return pd.Series(df["price"].to_numpy(dtype=float), index=index, name="LMP")
+
+
+def available_series(db_file=DB_FILE):
+    """(iso, location) pairs from ISO_HUBS that have rows, one index seek each"""
+    if not os.path.exists(db_file):
+        return []
+    conn = sqlite3.connect(db_file)
+    try:
+        return [(iso, hub) for iso, hubs in ISO_HUBS.items() for hub in hubs
+                if conn.execute("SELECT 1 FROM historical_prices WHERE iso = ? AND location = ? LIMIT 1", (iso, hub)).fetchone()]
+    except sqlite3.Error:
+        return []
+    finally:
+        conn.close()
+
+
+def read_recent(db_file, iso, location, days=365):
+    """The trailing `days` of one hub, ending at its latest stored interval"""
+    conn = sqlite3.connect(db_file)
+    try:
+        last = conn.execute("SELECT MAX(timestamp) FROM historical_prices WHERE iso = ? AND location = ?", (iso, location)).fetchone()[0]
+        if last is None:
+            return None
+        start = pd.Timestamp(last, tz="UTC") - pd.Timedelta(days=days)
+        return read_series(conn, iso, location, start=start)
+    finally:
+        conn.close()
+
+
+# --- LOADER ---
+def _write_chunk(conn, iso, hubs, chunk_start, chunk_end, df, complete):
+    """Insert one chunk and its progress rows in a single transaction"""
+    loaded_at = datetime.now().isoformat(timespec="seconds")
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO historical_prices (iso, location, timestamp, price) VALUES (?, ?, ?, ?)",
+            zip([iso] * len(df), df["location"], df["timestamp"], df["price"].tolist()),
+        )
+        if complete:
+            counts = df["location"].value_counts()
+            conn.executemany(
+                "INSERT OR REPLACE INTO load_progress VALUES (?, ?, ?, ?, ?, ?)",
+                [(iso, hub, chunk_start.isoformat(), chunk_end.isoformat(), int(counts.get(hub, 0)), loaded_at) for hub in hubs],
+            )
+
+
+def load_iso(conn, iso, start, end, hubs=None, ranges=None, client=None, chunk_days=CHUNK_DAYS,
+             max_workers=MAX_WORKERS, retries=MAX_RETRIES, backoff=BACKOFF_SECONDS, force=False):
+    """Backfill one ISO's hubs over [start, end), skipping chunks already loaded.
+
+    Fetches run on a bounded thread pool; this thread is the only writer.
+    Chunks ending after the last full hour are written but not marked
+    complete, so the next run tops them up. Returns a summary dict with the
+    rows inserted and the (start, end) ranges that still failed.
+    """
+    hubs = list(hubs or ISO_HUBS[iso])
+    client = client if client is not None else get_client(iso)
+    chunks = pending_chunks(conn, iso, hubs, start, end, chunk_days, ranges, force)
+    settled = pd.Timestamp.now(tz="UTC").floor("h")
+    inserted, missing = 0, []
+    if chunks:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+            futures = {pool.submit(fetch_with_retries, lambda s, e: fetch_iso_lmp(client, iso, s, e, hubs), s, e, retries, backoff): (s, e)
+                       for s, e in chunks}
+            for future in as_completed(futures):
+                s, e = futures[future]
+                df, error = future.result()
+                if error is not None:
+                    missing.append((s, e))
+                    continue
+                if df is None:
+                    df = pd.DataFrame({"timestamp": [], "location": [], "price": []})
+                before = conn.total_changes
+                with diagnostics.timed("db.write", iso=iso, rows=len(df)):
+                    _write_chunk(conn, iso, hubs, s, e, df, complete=pd.Timestamp(e) <= settled)
+                inserted += conn.total_changes - before
+    diagnostics.incr("db.rows_inserted", inserted, iso=iso)
+    return {"iso": iso, "chunks": len(chunks), "rows": inserted, "missing": coalesce_ranges(missing)}
+
+
+def load_history(isos=None, years=5, db_file=DB_FILE, end=None, **kwargs):
+    """Resumable multi-ISO backfill of the trailing `years` into db_file"""
+    end = pd.Timestamp.now(tz="UTC").floor("5min") if end is None else pd.Timestamp(end)
+    start = (end - pd.Timedelta(days=round(365 * years))).floor("D")
+    conn = connect(db_file)
+    try:
+        ensure_schema(conn)
+        results = [load_iso(conn, iso, start, end, **kwargs) for iso in (isos or ISO_HUBS)]
+        price_summary.refresh_summary(conn)
+        conn.execute("PRAGMA optimize")
+        return results
+    finally:
+        conn.close()
+
+
+def backfill_gaps(db_file=DB_FILE, isos=None, **kwargs):
+    """Refetch every missing range the incremental audit finds, one pass per ISO"""
+    ranges = audit_db.backfill_ranges(audit_db.find_gaps(db_file))
+    conn = connect(db_file)
+    try:
+        ensure_schema(conn)
+        results = []
+        for iso, by_hub in ranges.items():
+            if iso not in ISO_HUBS or (isos and iso not in isos):
+                continue
+            merged = coalesce_ranges([r for hub_ranges in by_hub.values() for r in hub_ranges])
+            results.append(load_iso(conn, iso, None, None, hubs=sorted(by_hub), ranges=merged, force=True, **kwargs))
+        price_summary.refresh_summary(conn)
+        return results
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load multi-ISO RTM prices into historical_prices")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--iso", nargs="+", choices=sorted(ISO_HUBS), default=None)
+    parser.add_argument("--years", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--schema-only", action="store_true", help="create tables and indexes on an existing database, no download")
+    parser.add_argument("--backfill-gaps", action="store_true", help="refetch only the missing ranges found by audit_db")
+    args = parser.parse_args()
+
+    if args.schema_only:
+        conn = connect(args.db)
+        try:
+            ensure_schema(conn)
+        finally:
+            conn.close()
+        print(f"✅ Schema and covering index ready in {args.db}")
+        return
+
+    t0 = time.perf_counter()
+    if args.backfill_gaps:
+        results = backfill_gaps(args.db, args.iso, max_workers=args.workers)
+    else:
+        results = load_history(args.iso, args.years, args.db, max_workers=args.workers)
+    for result in results:
+        status = "✅" if not result["missing"] else f"⚠️ {len(result['missing'])} range(s) still missing"
+        print(f"{result['iso']:<6} {result['chunks']:>4} chunks  {result['rows']:>10,} rows  {status}")
+    print(f"\nDone in {time.perf_counter() - t0:.1f}s -> {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import diagnostics
+
+# --- CONFIGURATION ---
+CHUNK_DAYS = 30
+MAX_WORKERS = 4
+MAX_RETRIES = 3
+BACKOFF_SECONDS = 2.0
+PROVIDER_ENV = "HYBRID_PRICE_PROVIDER"
+
+# --- PROVIDERS ---
+class FakeErcot:
+    """Offline stand-in for gridstatus ISO clients (get_rtm_lmp and get_lmp).
+
+    Generates a deterministic 5-minute RTM series per location so backfill
+    throughput and failure handling can be exercised without the network.
+    latency adds a per-call sleep; fail_rate and fail_calls inject errors.
+    """
+
+    def __init__(self, locations=("HB_WEST", "HB_NORTH", "HB_SOUTH", "HB_HOUSTON"), latency=0.0, fail_rate=0.0, fail_calls=0, seed=0):
+        self.locations = list(locations)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.fail_calls = fail_calls
+        self.calls = 0
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def get_rtm_lmp(self, start, end, verbose=False):
+        with self._lock:
+            self.calls += 1
+            fail = self.calls <= self.fail_calls or self._rng.random() < self.fail_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise ConnectionError(f"FakeErcot: injected failure for {start} - {end}")
+
+        times = pd.date_range(pd.Timestamp(start).ceil("5min"), end, freq="5min", inclusive="left")
+        if len(times) == 0:
+            return pd.DataFrame(columns=["Time", "Location", "LMP"])
+        # Seed from the interval itself so overlapping fetches agree on prices
+        hours = times.hour.to_numpy() + times.minute.to_numpy() / 60.0
+        frames = []
+        for i, loc in enumerate(self.locations):
+            noise = np.random.default_rng((int(times[0].value // 10**9) + i) % 2**32).standard_normal(len(times))
+            lmp = 30 + 25 * np.sin((hours - 14) / 24 * 2 * np.pi) + 12 * noise + 5 * i
+            frames.append(pd.DataFrame({"Time": times, "Location": loc, "LMP": lmp}))
+        return pd.concat(frames, ignore_index=True)
+
+    def get_lmp(self, date, end=None, market=None, locations=None, verbose=False):
+        """Same synthetic series through the get_lmp call used by the other ISOs"""
+        df = self.get_rtm_lmp(start=date, end=end, verbose=verbose)
+        if locations is not None and locations != "ALL":
+            df = df[df["Location"].isin(locations)]
+        return df
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+def get_provider():
+    """Process-wide upstream client; set HYBRID_PRICE_PROVIDER=fake to run offline"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            if os.environ.get(PROVIDER_ENV, "").lower() == "fake":
+                _provider = FakeErcot()
+            else:
+                import gridstatus
+                _provider = gridstatus.Ercot()
+        return _provider
+
+# --- CHUNK SCHEDULER ---
+def plan_chunks(start, end, chunk_days=CHUNK_DAYS):
+    """Split [start, end) into consecutive windows of at most chunk_days"""
+    chunks = []
+    current = start
+    while current < end:
+        chunk_end = min(current + pd.Timedelta(days=chunk_days), end)
+        chunks.append((current, chunk_end))
+        current = chunk_end
+    return chunks
+
+
+def fetch_with_retries(call, start, end, retries=MAX_RETRIES, backoff=BACKOFF_SECONDS):
+    """Run call(start, end) with exponential backoff; returns (DataFrame or None, error or None)"""
+    error = None
+    for attempt in range(retries + 1):
+        t0 = time.perf_counter()
+        try:
+            df = call(start, end)
+            diagnostics.observe('fetch.chunk', time.perf_counter() - t0, attempt=attempt, rows=0 if df is None else len(df))
+            if df is None or len(df) == 0:
+                return None, None
+            diagnostics.incr('fetch.rows', len(df))
+            return df, None
+        except Exception as e:
+            error = e
+            diagnostics.error('fetch.chunk', e, start=start, end=end, attempt=attempt)
+            if attempt < retries:
+                diagnostics.incr('fetch.retry')
+                time.sleep(backoff * (2 ** attempt))
+    return None, error
+
+
+def _fetch_chunk(provider, start, end, location, retries, backoff):
+    """Fetch one RTM chunk; returns (series or None, error or None).
+
+    location is a settlement point name (a Series comes back) or a predicate
+    over names (a DataFrame with one column per matching location).
+    """
+    df, error = fetch_with_retries(lambda s, e: provider.get_rtm_lmp(start=s, end=e, verbose=False), start, end, retries, backoff)
+    if df is None:
+        return None, error
+    if callable(location):
+        df = df[df['Location'].isin([loc for loc in df['Location'].unique() if location(loc)])]
+        return df.pivot_table(index='Time', columns='Location', values='LMP', aggfunc='last').sort_index(), None
+    return df[df['Location'] == location].set_index('Time').sort_index()['LMP'], None
+
+
+def fetch_chunks(start, end, location="HB_WEST", provider=None, chunk_days=CHUNK_DAYS, max_workers=MAX_WORKERS, retries=MAX_RETRIES, backoff=BACKOFF_SECONDS, ranges=None):
+    """Backfill [start, end) (or explicit ranges) on a bounded thread pool.
+
+    One provider instance is shared by every worker. Chunks that still fail
+    after retries are reported rather than dropped: returns
+    (list of chunk series in time order, list of (start, end) missing ranges).
+    """
+    provider = provider if provider is not None else get_provider()
+    chunks = []
+    for r_start, r_end in (ranges if ranges is not None else [(start, end)]):
+        chunks.extend(plan_chunks(r_start, r_end, chunk_days))
+    if not chunks:
+        return [], []
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+        futures = [pool.submit(_fetch_chunk, provider, s, e, location, retries, backoff) for s, e in chunks]
+        results = [f.result() for f in futures]
+
+    data, missing = [], []
+    for (s, e), (series, error) in zip(chunks, results):
+        if error is not None:
+            missing.append((s, e))
+        elif series is not None and len(series) > 0:
+            data.append(series)
+    return data, coalesce_ranges(missing)
+
+
+def coalesce_ranges(ranges):
+    """Merge touching or overlapping (start, end) ranges"""
+    merged = []
+    for s, e in sorted(ranges):
+        if merged and s <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], e))
+        else:
+            merged.append((s, e))
+    return merged
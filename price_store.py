@@ -0,0 +1,194 @@
+import json
+import os
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+import pandas as pd
+
+# --- FILE LAYOUT ---
+# MAGIC | uint64 header length | JSON header | padding | int64 UTC ns timestamps | float32 column per location
+# Columns start on ALIGN-byte boundaries so they can be memory-mapped in place.
+# Files written before multi-column support carry a single px_offset column.
+MAGIC = b"HBTMCOL1"
+ALIGN = 64
+DEFAULT_COLUMN = "LMP"
+
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def write_frame(path, frame, meta=None):
+    """Atomically write a datetime-indexed DataFrame (one float column per location).
+
+    Data goes to a temp file in the same directory and is moved into place
+    with os.replace, so readers see either the old file or the new one,
+    never a partial write. meta must be JSON-serializable.
+    """
+    index = pd.DatetimeIndex(frame.index)
+    tz = str(index.tz) if index.tz is not None else None
+    utc = index.tz_convert("UTC") if index.tz is not None else index
+    ts = utc.as_unit("ns").asi8.astype(np.int64, copy=False)
+    names = [str(c) for c in frame.columns]
+    cols = [np.asarray(frame.iloc[:, i].to_numpy(), dtype=np.float32) for i in range(len(names))]
+
+    n = len(ts)
+    header = {"rows": n, "tz": tz, "meta": meta or {}}
+    prefix_len = len(MAGIC) + 8
+    # Header size depends on the offsets it records, so settle them iteratively
+    ts_offset, offsets = 0, [0] * len(names)
+    for _ in range(3):
+        header.update(ts_offset=ts_offset, columns=dict(zip(names, offsets)), px_offset=offsets[0] if offsets else 0)
+        header_bytes = json.dumps(header).encode("utf-8")
+        ts_offset = _align(prefix_len + len(header_bytes))
+        offsets, pos = [], _align(ts_offset + ts.nbytes)
+        for col in cols:
+            offsets.append(pos)
+            pos = _align(pos + col.nbytes)
+    header.update(ts_offset=ts_offset, columns=dict(zip(names, offsets)), px_offset=offsets[0] if offsets else 0)
+    header_bytes = json.dumps(header).encode("utf-8")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".prices-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(np.uint64(len(header_bytes)).tobytes())
+            f.write(header_bytes)
+            f.write(b"\0" * (ts_offset - f.tell()))
+            f.write(ts.tobytes())
+            for offset, col in zip(offsets, cols):
+                f.write(b"\0" * (offset - f.tell()))
+                f.write(col.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_prices(path, prices, meta=None):
+    """Atomically write a single price Series (see write_frame)"""
+    write_frame(path, prices.to_frame(prices.name if prices.name is not None else DEFAULT_COLUMN), meta)
+
+
+def read_header(path):
+    """Read only the JSON header of a columnar price file"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a columnar price file")
+        header_len = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+        header = json.loads(f.read(header_len).decode("utf-8"))
+    header.setdefault("columns", {DEFAULT_COLUMN: header["px_offset"]})
+    return header
+
+
+def open_columns(path, columns=None):
+    """Memory-map the timestamps and the requested price columns read-only; returns (ts_ns, {name: prices}, header)"""
+    header = read_header(path)
+    n = header["rows"]
+    names = list(header["columns"]) if columns is None else list(columns)
+    if n == 0:
+        return np.empty(0, dtype=np.int64), {c: np.empty(0, dtype=np.float32) for c in names}, header
+    ts = np.memmap(path, dtype=np.int64, mode="r", offset=header["ts_offset"], shape=(n,))
+    cols = {c: np.memmap(path, dtype=np.float32, mode="r", offset=header["columns"][c], shape=(n,)) for c in names}
+    return ts, cols, header
+
+
+def _utc_ns(value):
+    stamp = pd.Timestamp(value)
+    return (stamp.tz_localize("UTC") if stamp.tzinfo is None else stamp).value
+
+
+def _row_bounds(ts, start, end):
+    """[i0, i1) of the sorted ns timestamps inside [start, end); naive bounds are taken as UTC"""
+    i0 = 0 if start is None else int(np.searchsorted(ts, _utc_ns(start), side="left"))
+    i1 = len(ts) if end is None else int(np.searchsorted(ts, _utc_ns(end), side="left"))
+    return i0, i1
+
+
+def _index(ts, header):
+    index = pd.DatetimeIndex(np.asarray(ts).view("M8[ns]"))
+    if header["tz"]:
+        index = index.tz_localize("UTC").tz_convert(header["tz"])
+    return index
+
+
+def read_frame(path, columns=None, start=None, end=None):
+    """Load (DataFrame, meta) with only the requested columns and the rows in [start, end)"""
+    ts, cols, header = open_columns(path, columns)
+    i0, i1 = _row_bounds(ts, start, end)
+    frame = pd.DataFrame({c: np.asarray(v[i0:i1]) for c, v in cols.items()}, index=_index(ts[i0:i1], header))
+    return frame, header["meta"]
+
+
+def read_prices(path, column=None, start=None, end=None):
+    """Load one column as (Series, meta); the values stay memory-mapped (default: first column)"""
+    header = read_header(path)
+    column = next(iter(header["columns"])) if column is None else column
+    ts, cols, header = open_columns(path, [column])
+    i0, i1 = _row_bounds(ts, start, end)
+    return pd.Series(cols[column][i0:i1], index=_index(ts[i0:i1], header), name=column, copy=False), header["meta"]
+
+
+# --- CROSS-PROCESS LOCK ---
+class FileLock:
+    """Advisory lock on a sidecar file, shared by threads and worker processes.
+
+    Uses flock on POSIX (msvcrt on Windows). The lock is released by the OS if
+    the holder dies, so a crashed refresh never wedges the others.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def _try_lock(self, fd):
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self, blocking=True, timeout=None, poll=0.25):
+        """Take the lock; returns False if non-blocking or timed out without it"""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._try_lock(fd):
+            if not blocking or (deadline is not None and time.monotonic() >= deadline):
+                os.close(fd)
+                return False
+            time.sleep(poll)
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
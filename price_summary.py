@@ -0,0 +1,198 @@
+"""Materialized price-bucket frequencies per ISO, hub and year.
+
+The dashboard's trend tables (share of intervals in each $/kWh bracket by
+year) are aggregated from historical_prices into price_bucket_summary. The
+aggregation runs in SQL over fixed rowid ranges, so memory stays flat for
+any table size, and a rowid watermark means later refreshes only fold in
+rows added since the last run. Counts are additive, so a refresh never
+rereads old rows.
+
+    python price_summary.py            # refresh, then print HB_WEST
+    python price_summary.py --full     # rebuild from scratch
+"""
+import argparse
+import os
+import sqlite3
+import time
+
+import diagnostics
+from audit_db import DB_FILE
+
+# --- CONFIGURATION ---
+CHUNK_ROWS = 1_000_000
+# Bracket upper edges in $/MWh; the last bracket is everything above $1,000
+BUCKET_EDGES = (0, 20, 40, 60, 80, 100, 150, 250, 1000)
+BUCKET_LABELS = (
+    "Negative (<$0)", "$0 - $0.02", "$0.02 - $0.04", "$0.04 - $0.06", "$0.06 - $0.08",
+    "$0.08 - $0.10", "$0.10 - $0.15", "$0.15 - $0.25", "$0.25 - $1.00", "$1.00 - $5.00",
+)
+TREND_YEARS = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_bucket_summary (
+    iso TEXT NOT NULL,
+    location TEXT NOT NULL,
+    year TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    intervals INTEGER NOT NULL,
+    PRIMARY KEY (iso, location, year, bucket)
+);
+CREATE TABLE IF NOT EXISTS summary_state (
+    name TEXT PRIMARY KEY,
+    last_rowid INTEGER NOT NULL,
+    refreshed_at TEXT NOT NULL
+);
+"""
+
+
+def _bucket_sql():
+    cases = " ".join(f"WHEN price < {edge} THEN {i}" for i, edge in enumerate(BUCKET_EDGES))
+    return f"CASE {cases} ELSE {len(BUCKET_EDGES)} END"
+
+
+# Timestamps are stored in UTC, so years split at UTC midnight on Jan 1
+CHUNK_SQL = f"""
+INSERT INTO price_bucket_summary (iso, location, year, bucket, intervals)
+SELECT iso, location, substr(timestamp, 1, 4), {_bucket_sql()}, COUNT(*)
+FROM historical_prices
+WHERE rowid > ? AND rowid <= ? AND price IS NOT NULL
+GROUP BY 1, 2, 3, 4
+ON CONFLICT (iso, location, year, bucket) DO UPDATE SET intervals = intervals + excluded.intervals
+"""
+
+
+# --- REFRESH ---
+def refresh_summary(conn, full=False, chunk_rows=CHUNK_ROWS):
+    """Fold rows added since the last refresh into price_bucket_summary.
+
+    Each rowid range commits together with the advanced watermark, so an
+    interrupted refresh resumes without double counting. Returns the number
+    of source rows read.
+    """
+    conn.executescript(SCHEMA)
+    if full:
+        with conn:
+            conn.execute("DELETE FROM price_bucket_summary")
+            conn.execute("DELETE FROM summary_state WHERE name = 'price_bucket_summary'")
+    row = conn.execute("SELECT last_rowid FROM summary_state WHERE name = 'price_bucket_summary'").fetchone()
+    watermark = row[0] if row else 0
+    max_rowid = conn.execute("SELECT MAX(rowid) FROM historical_prices").fetchone()[0] or 0
+
+    with diagnostics.timed("summary.refresh", rows=max(0, max_rowid - watermark)):
+        for lo in range(watermark, max_rowid, chunk_rows):
+            hi = min(lo + chunk_rows, max_rowid)
+            with conn:
+                conn.execute(CHUNK_SQL, (lo, hi))
+                conn.execute("INSERT OR REPLACE INTO summary_state VALUES ('price_bucket_summary', ?, datetime('now'))", (hi,))
+    return max(0, max_rowid - watermark)
+
+
+def refresh(db_file=DB_FILE, full=False):
+    conn = sqlite3.connect(db_file, timeout=60)
+    try:
+        return refresh_summary(conn, full=full)
+    finally:
+        conn.close()
+
+
+# --- QUERIES ---
+def trend_data(conn, iso, location=None, years=TREND_YEARS):
+    """{bucket label: {year: share of intervals}} for the latest `years` years.
+
+    Same shape as the hand-entered TREND_DATA tables. location=None pools every
+    hub of the ISO (the system-wide view). Returns None when nothing is stored.
+    """
+    query = "SELECT year, bucket, SUM(intervals) FROM price_bucket_summary WHERE iso = ?"
+    params = [iso]
+    if location is not None:
+        query += " AND location = ?"
+        params.append(location)
+    rows = conn.execute(query + " GROUP BY year, bucket", params).fetchall()
+    if not rows:
+        return None
+
+    kept = sorted({year for year, _, _ in rows})[-years:]
+    totals = {year: 0 for year in kept}
+    counts = {}
+    for year, bucket, n in rows:
+        if year in totals:
+            totals[year] += n
+            counts[(bucket, year)] = n
+    return {
+        label: {year: counts.get((b, year), 0) / totals[year] for year in kept}
+        for b, label in enumerate(BUCKET_LABELS)
+    }
+
+
+def trend_share_below(trend, year, price):
+    """Share of a year's intervals below `price` ($/MWh), interpolated linearly inside its bracket.
+
+    The estimate used when only the bucket table, not the prices, is at hand.
+    """
+    shares = [trend[label][year] for label in BUCKET_LABELS]
+    if price <= 0:
+        return shares[0] if price == 0 else 0.0
+    lower = (0,) + BUCKET_EDGES
+    upper = BUCKET_EDGES[1:] + (5000,)
+    total = shares[0]
+    for share, lo, hi in zip(shares[1:], lower[1:], upper):
+        if price >= hi:
+            total += share
+        else:
+            total += share * (price - lo) / (hi - lo)
+            break
+    return total
+
+
+def load_trend_data(db_file, iso, location=None, years=TREND_YEARS):
+    """Read one trend table without writing; None if the database has no such data.
+
+    The connection is read-only, so dashboard reads never wait on the write
+    lock or aggregate on first paint. price_db refreshes the summary after
+    every load and `python price_summary.py` refreshes it by hand.
+    """
+    if not os.path.exists(db_file):
+        return None
+    try:
+        conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True, timeout=60)
+    except sqlite3.Error as e:
+        diagnostics.error("summary.load", e)
+        return None
+    try:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'price_bucket_summary'").fetchone() is None:
+            return None
+        return trend_data(conn, iso, location, years)
+    except sqlite3.Error as e:
+        diagnostics.error("summary.load", e, iso=iso, location=location)
+        return None
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the price-bucket summary table")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--full", action="store_true", help="rebuild from scratch")
+    parser.add_argument("--iso", default="ERCOT")
+    parser.add_argument("--location", default="HB_WEST")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    rows = refresh(args.db, full=args.full)
+    print(f"Folded {rows:,} new rows in {time.perf_counter() - t0:.1f}s")
+    conn = sqlite3.connect(args.db)
+    try:
+        trend = trend_data(conn, args.iso, args.location)
+    finally:
+        conn.close()
+    if trend is None:
+        print(f"No rows for {args.iso} {args.location}")
+        return
+    years = list(next(iter(trend.values())))
+    print(f"\n{args.iso} {args.location}\n{'':<16}" + "".join(f"{y:>8}" for y in years))
+    for label, by_year in trend.items():
+        print(f"{label:<16}" + "".join(f"{by_year[y]:>8.1%}" for y in years))
+
+
+if __name__ == "__main__":
+    main()
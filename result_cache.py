@@ -0,0 +1,208 @@
+"""Persistent LRU cache for computed results, shared by every server process.
+
+Results are pickled into a SQLite table under a digest of the inputs that
+determine them, so they survive restarts and deploys, and every Streamlit
+worker reuses the others' results. Price series enter the key through
+dataset_version (length, first/last timestamp and value sum), which costs one
+pass of np.sum instead of hashing the Series row by row. Keys also carry a
+digest of the model source files, so a deploy that changes the model never
+serves results computed by the old one. Least recently used entries are
+evicted once the table passes max_entries or max_bytes; the entry count and
+size are kept as running totals, so a put never scans the table.
+
+    python result_cache.py            # entry count and size
+    python result_cache.py --clear
+"""
+import argparse
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import diagnostics
+
+# --- CONFIGURATION ---
+CACHE_FILE = "hybrid_os_results.db"
+MAX_ENTRIES = 20_000
+MAX_BYTES = 256 * 1024 * 1024
+# Hits refresh an entry's recency at most this often, so popular keys do not write on every read
+TOUCH_SECONDS = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_last_used ON results (last_used);
+CREATE TABLE IF NOT EXISTS totals (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    entries INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+"""
+
+
+# --- KEYS ---
+def dataset_version(prices):
+    """Cheap identity of a time-indexed price Series; None for data not worth persisting (no timestamps)"""
+    if not isinstance(prices, pd.Series) or not isinstance(prices.index, pd.DatetimeIndex) or len(prices) == 0:
+        return None
+    ts = prices.index.as_unit("ns").asi8
+    return f"{len(prices)}:{ts[0]}:{ts[-1]}:{float(np.nansum(prices.to_numpy(dtype=np.float64)))!r}"
+
+
+def code_version(*modules):
+    """Digest of the modules' source files"""
+    digest = hashlib.sha1()
+    for module in modules:
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def _canonical(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float):
+        return round(value, 9)
+    if isinstance(value, (tuple, list)):
+        return tuple(_canonical(v) for v in value)
+    return value
+
+
+def make_key(*parts):
+    """Digest of the key parts; numpy scalars and floats equal to 9 decimals share a key"""
+    return hashlib.sha1(repr(_canonical(parts)).encode()).hexdigest()
+
+
+# --- CACHE ---
+class ResultCache:
+    """Disk-backed LRU map from input keys to pickled results.
+
+    Storage errors (read-only deploys, a locked file) fall back to computing
+    without caching; they are reported to diagnostics, never raised.
+    """
+
+    def __init__(self, path=CACHE_FILE, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES, code_version=""):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.code_version = code_version
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            if conn.execute("SELECT 1 FROM totals").fetchone() is None:
+                # Tables written before the running totals existed: count them once
+                with conn:
+                    conn.execute("INSERT OR IGNORE INTO totals SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM results")
+            self._local.conn = conn
+        return conn
+
+    def key(self, parts):
+        return make_key(self.code_version, *parts)
+
+    def get(self, parts):
+        """(True, value) on a hit, (False, None) on a miss"""
+        key = self.key(parts)
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT value, last_used FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                diagnostics.incr("result_cache.miss")
+                return False, None
+            now = time.time()
+            if now - row[1] > TOUCH_SECONDS:
+                with conn:
+                    conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (now, key))
+            diagnostics.incr("result_cache.hit")
+            return True, pickle.loads(row[0])
+        except (sqlite3.Error, pickle.UnpicklingError, EOFError, AttributeError) as e:
+            diagnostics.error("result_cache.get", e)
+            return False, None
+
+    def put(self, parts, value):
+        """Store a result, then evict least recently used entries past the limits"""
+        key = self.key(parts)
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            if len(blob) > self.max_bytes:
+                return
+            conn = self._conn()
+            now = time.time()
+            with conn:
+                # Take the write lock up front so the running totals see every writer's puts in order
+                conn.execute("BEGIN IMMEDIATE")
+                old = conn.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+                conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", (key, blob, len(blob), now, now))
+                conn.execute("UPDATE totals SET entries = entries + ?, bytes = bytes + ?",
+                             (old is None, len(blob) - (old[0] if old else 0)))
+                self._evict(conn)
+        except (sqlite3.Error, pickle.PicklingError, TypeError) as e:
+            diagnostics.error("result_cache.put", e)
+
+    def _evict(self, conn):
+        count, size = conn.execute("SELECT entries, bytes FROM totals").fetchone()
+        if count <= self.max_entries and size <= self.max_bytes:
+            return
+        # Walk from least recent until both limits hold again
+        doomed, freed = [], 0
+        for key, entry_size in conn.execute("SELECT key, size FROM results ORDER BY last_used"):
+            if count - len(doomed) <= self.max_entries and size - freed <= self.max_bytes:
+                break
+            doomed.append((key,))
+            freed += entry_size
+        conn.executemany("DELETE FROM results WHERE key = ?", doomed)
+        conn.execute("UPDATE totals SET entries = entries - ?, bytes = bytes - ?", (len(doomed), freed))
+        diagnostics.incr("result_cache.evict", len(doomed))
+
+    def get_or_compute(self, parts, compute):
+        """Cached result for the key parts, computing and storing it on a miss"""
+        hit, value = self.get(parts)
+        if hit:
+            return value
+        value = compute()
+        self.put(parts, value)
+        return value
+
+    def stats(self):
+        count, size = self._conn().execute("SELECT entries, bytes FROM totals").fetchone()
+        return {"entries": count, "bytes": size, "max_entries": self.max_entries, "max_bytes": self.max_bytes}
+
+    def clear(self):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM results")
+            conn.execute("UPDATE totals SET entries = 0, bytes = 0")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the persistent result cache")
+    parser.add_argument("--path", default=CACHE_FILE)
+    parser.add_argument("--clear", action="store_true")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        print(f"No cache at {args.path}")
+        return
+    cache = ResultCache(args.path)
+    if args.clear:
+        cache.clear()
+    stats = cache.stats()
+    print(f"{stats['entries']:,} entries, {stats['bytes'] / 1e6:,.1f} MB (limits {stats['max_entries']:,} / {stats['max_bytes'] / 1e6:,.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Monte Carlo risk engine: block-bootstrapped price paths to P10/P50/P90 alpha and IRR.
+
+Alpha only depends on a path through its duration-weighted margin sums, so
+the trailing history is reduced once to per-day sums of mining margin,
+battery margin and interval weight. A path is a sequence of multi-day blocks
+resampled from that history (moving block bootstrap with day-aligned starts,
+which keeps the diurnal shape and multi-day weather regimes). Its sums are
+prefix-sum differences over the day table, so thousands of paths cost a few
+array gathers instead of materializing millions of prices. Very large runs
+are split across a process pool.
+
+    python risk_engine.py --paths 20000                  # ERCOT HB_WEST from the history database
+    python risk_engine.py --iso CAISO --location TH_NP15_GEN-APND
+"""
+import argparse
+import multiprocessing
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import economics
+from alpha_engine import DAY_NS, INTERVALS_PER_DAY, annual_alpha, prepare_series, scale_alpha, window_slice
+
+# --- CONFIGURATION ---
+DEFAULT_PATHS = 5000
+BLOCK_DAYS = 7
+HISTORY_DAYS = 365
+RISK_HORIZONS = (182, 365)
+PERCENTILES = (10, 50, 90)
+CHUNK_PATHS = 1000
+# paths x blocks above which sampling moves to a process pool
+POOL_MIN_DRAWS = 5_000_000
+
+
+# --- DAY TABLE ---
+def daily_sums(prices, breakeven_val, history_days=HISTORY_DAYS):
+    """(3, n_days) array of per-day mining margin, battery margin and weight sums.
+
+    Days are counted from the first interval of the trailing window, so
+    consecutive days always keep the same time-of-day phase.
+    """
+    ts, values, weights = prepare_series(prices)
+    i0, i1 = window_slice(ts, weights, len(values), days=history_days)
+    values, weights = values[i0:i1], weights[i0:i1]
+    if len(values) == 0:
+        raise ValueError("no price history to resample")
+    if ts is not None:
+        day = ((ts[i0:i1] - ts[i0]) // DAY_NS).astype(np.int64)
+    else:
+        day = np.arange(len(values)) // INTERVALS_PER_DAY
+    n_days = int(day[-1]) + 1
+    return np.stack([
+        np.bincount(day, np.fmax(breakeven_val - values, 0.0) * weights, n_days),
+        np.bincount(day, np.fmax(values - breakeven_val, 0.0) * weights, n_days),
+        np.bincount(day, weights, n_days),
+    ])
+
+
+def _block_lengths(horizon_days, block_days):
+    full, rest = divmod(horizon_days, block_days)
+    return np.array([block_days] * full + ([rest] if rest else []), dtype=np.int64)
+
+
+def _sample_chunk(day_table, horizon_days, block_days, n_paths, seed):
+    """Margin and weight sums, shape (3, n_paths), for one chunk of bootstrap paths"""
+    n_days = day_table.shape[1]
+    lengths = _block_lengths(horizon_days, min(block_days, n_days))
+    prefix = np.zeros((3, n_days + 1))
+    np.cumsum(day_table, axis=1, out=prefix[:, 1:])
+    starts = np.random.default_rng(seed).integers(0, n_days - lengths + 1, size=(n_paths, len(lengths)))
+    return (prefix[:, starts + lengths] - prefix[:, starts]).sum(axis=2)
+
+
+def bootstrap_sums(day_table, horizon_days, n_paths=DEFAULT_PATHS, block_days=BLOCK_DAYS, seed=0, workers=None):
+    """Sums for n_paths resampled paths of horizon_days; identical for any worker count.
+
+    workers=None picks a process pool only when the draw count is large enough
+    to pay for starting it.
+    """
+    sizes = [min(CHUNK_PATHS, n_paths - i) for i in range(0, n_paths, CHUNK_PATHS)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if workers is None:
+        draws = n_paths * len(_block_lengths(horizon_days, min(block_days, day_table.shape[1])))
+        workers = (os.cpu_count() or 1) if draws >= POOL_MIN_DRAWS else 1
+    args = [(day_table, horizon_days, block_days, n, s) for n, s in zip(sizes, seeds)]
+    if workers > 1 and len(args) > 1:
+        # spawn: forking a threaded Streamlit server is unsafe
+        with ProcessPoolExecutor(max_workers=min(workers, len(args)), mp_context=multiprocessing.get_context("spawn")) as pool:
+            parts = list(pool.map(_sample_chunk, *zip(*args)))
+    else:
+        parts = [_sample_chunk(*a) for a in args]
+    return np.concatenate(parts, axis=1)
+
+
+# --- RISK PROFILE ---
+def risk_profile(prices, breakeven_val, ideal_m, ideal_b, w_pct, s_pct, net_capex, horizons=RISK_HORIZONS,
+                 n_paths=DEFAULT_PATHS, block_days=BLOCK_DAYS, history_days=HISTORY_DAYS, seed=0, workers=None):
+    """P10/P50/P90 mining, battery and total alpha plus IRR for each horizon.
+
+    Alpha is over the horizon; IRR follows economics.get_metrics: a year of
+    alpha at the path's rate (annual_alpha) over net capex, in percent, so
+    horizons compare. Returns one DataFrame row per (horizon, percentile).
+    """
+    day_table = daily_sums(prices, breakeven_val, history_days)
+    rows = []
+    for days in horizons:
+        mining_sum, battery_sum, weight = bootstrap_sums(day_table, days, n_paths, block_days, seed, workers)
+        ma, ba = scale_alpha(mining_sum, battery_sum, weight, ideal_m, ideal_b, w_pct, s_pct)
+        total = ma + ba
+        year_ma, year_ba = annual_alpha(mining_sum, battery_sum, weight, ideal_m, ideal_b, w_pct, s_pct)
+        irr = (year_ma + year_ba) * 100 / net_capex if net_capex > 0 else np.zeros_like(total)
+        for q in PERCENTILES:
+            rows.append({
+                "horizon_days": days,
+                "percentile": f"P{q}",
+                "mining_alpha": float(np.percentile(ma, q)),
+                "battery_alpha": float(np.percentile(ba, q)),
+                "total_alpha": float(np.percentile(total, q)),
+                "irr": float(np.percentile(irr, q)),
+            })
+    return pd.DataFrame(rows)
+
+
+def net_capex(m, b, itc_v, mc_on, m_eff, m_cost):
+    """Net capex for a configuration (alpha inputs do not affect it)"""
+    return economics.get_metrics(m, b, itc_v, mc_on, 0.0, 0.0, 0.0, 0.0, m_eff, m_cost)[2]
+
+
+def main():
+    import price_db
+    from audit_db import DB_FILE
+
+    parser = argparse.ArgumentParser(description="Block-bootstrap alpha and IRR percentiles from the price history")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--iso", default="ERCOT")
+    parser.add_argument("--location", default="HB_WEST")
+    parser.add_argument("--paths", type=int, default=DEFAULT_PATHS)
+    parser.add_argument("--block-days", type=int, default=BLOCK_DAYS)
+    parser.add_argument("--history-days", type=int, default=HISTORY_DAYS)
+    parser.add_argument("--breakeven", type=float, default=111.11)
+    parser.add_argument("--miner-mw", type=float, default=35)
+    parser.add_argument("--battery-mw", type=float, default=60)
+    parser.add_argument("--itc", type=float, default=0.3)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        prices = price_db.read_series(conn, args.iso, args.location)
+    finally:
+        conn.close()
+    nc = net_capex(args.miner_mw, args.battery_mw, args.itc, True, 15.0, 20.0)
+    profile = risk_profile(prices, args.breakeven, args.miner_mw, args.battery_mw, 0.5, 0.5, nc, n_paths=args.paths,
+                           block_days=args.block_days, history_days=args.history_days, workers=args.workers)
+    print(profile.to_string(index=False, float_format=lambda v: f"{v:,.2f}"))
+
+
+if __name__ == "__main__":
+    main()
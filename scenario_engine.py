@@ -0,0 +1,251 @@
+"""Headless scenario runner: the dashboard's site model evaluated for many sites at once.
+
+A JSON scenario file crosses sites, pricing hubs, miner specs, hashprices and
+tax options; a CSV file lists fully specified scenarios one per row. Each
+scenario gets the numbers the dashboard shows for it: miner breakeven, target
+sizing, get_metrics economics on the hub's measured mining capacity, and the
+live alpha split per horizon from the hub's last year of prices. Scenarios
+are grouped by hub, so a worker process reads and indexes each hub's prices
+once, and result chunks stream to CSV or Parquet (needs pyarrow) as they
+finish.
+
+    python scenario_engine.py sites.json -o results.csv
+    python scenario_engine.py sites.csv -o results.parquet --workers 8
+"""
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import diagnostics
+import economics
+import price_db
+from alpha_engine import HORIZON_DAYS, build_horizon_indexes, indexed_horizon_alpha, share_below
+from audit_db import DB_FILE
+
+# --- CONFIGURATION ---
+CHUNK_SCENARIOS = 250
+# Share of hours priced below $20/MWh (the Negative and $0 - $0.02 buckets); 2025 HB_WEST when a hub has no prices
+MINING_PRICE_CAP = 20.0
+DEFAULT_CAP = 0.456
+HORIZON_LABELS = {1: "24h", 7: "7d", 30: "30d", 182: "6m", 365: "1y"}
+SCENARIO_DEFAULTS = {
+    "site": "", "iso": "ERCOT", "location": "HB_WEST", "solar_mw": 100.0, "wind_mw": 100.0,
+    "miner_mw": None, "battery_mw": None, "miner": "", "efficiency": 15.0, "miner_cost": 20.0,
+    "hashprice": 4.0, "itc": 0.3, "macrs": True, "cap": None,
+}
+FLOAT_FIELDS = ("solar_mw", "wind_mw", "miner_mw", "battery_mw", "efficiency", "miner_cost", "hashprice", "itc", "cap")
+# Scenario-file names inside each section, mapped to scenario fields
+SECTION_FIELDS = {
+    "sites": {"name": "site"},
+    "hubs": {},
+    "miners": {"name": "miner", "cost": "miner_cost"},
+    "tax": {},
+}
+
+
+# --- SCENARIO FILES ---
+def normalize_scenario(scenario):
+    """Scenario dict over SCENARIO_DEFAULTS with numeric fields as floats (None where unset) and macrs as a bool"""
+    s = {**SCENARIO_DEFAULTS, **{k: v for k, v in scenario.items() if k in SCENARIO_DEFAULTS}}
+    for key in FLOAT_FIELDS:
+        value = s[key]
+        s[key] = None if value is None or (isinstance(value, float) and math.isnan(value)) else float(value)
+    if isinstance(s["macrs"], str):
+        s["macrs"] = s["macrs"].strip().lower() in ("1", "true", "yes", "on")
+    s["macrs"] = bool(s["macrs"])
+    for key in ("site", "iso", "location", "miner"):
+        s[key] = "" if s[key] is None or (isinstance(s[key], float) and math.isnan(s[key])) else str(s[key])
+    return s
+
+
+def expand_scenarios(spec):
+    """Flat scenario dicts for every combination of sites x hubs x miners x hashprices x tax.
+
+    Missing sections fall back to SCENARIO_DEFAULTS; a site's own iso/location
+    is used when the spec lists no hubs.
+    """
+    sections = []
+    for name, renames in SECTION_FIELDS.items():
+        entries = spec.get(name) or [{}]
+        sections.append([{renames.get(k, k): v for k, v in entry.items()} for entry in entries])
+    hashprices = [{"hashprice": hp} for hp in spec.get("hashprices") or [SCENARIO_DEFAULTS["hashprice"]]]
+    sites, hubs, miners, tax = sections
+    return [
+        normalize_scenario({**site, **hub, **miner, **hp, **tx})
+        for site, hub, miner, hp, tx in itertools.product(sites, hubs, miners, hashprices, tax)
+    ]
+
+
+def load_scenarios(path):
+    """Scenarios from a JSON spec (crossed by expand_scenarios) or a CSV with one scenario per row"""
+    if path.lower().endswith(".csv"):
+        return [normalize_scenario(row) for row in pd.read_csv(path).to_dict("records")]
+    with open(path) as f:
+        spec = json.load(f)
+    if isinstance(spec, list):
+        return [normalize_scenario(row) for row in spec]
+    return expand_scenarios(spec)
+
+
+# --- EVALUATION ---
+_hub_inputs = {}
+
+
+def load_hub_prices(iso, location, db_file=DB_FILE):
+    """Last year of a hub from the history database, falling back to the live ERCOT cache"""
+    prices = None
+    if os.path.exists(db_file):
+        try:
+            prices = price_db.read_recent(db_file, iso, location)
+        except sqlite3.Error as e:
+            diagnostics.error("scenario.prices", e, iso=iso, location=location)
+    if (prices is None or len(prices) == 0) and iso == "ERCOT":
+        from price_data import load_cached_hub
+        prices = load_cached_hub(location)
+    return prices if prices is not None and len(prices) > 0 else None
+
+
+def hub_inputs(iso, location, db_file=DB_FILE):
+    """(horizon indexes, measured mining capacity, rows) for a hub, built once per process"""
+    key = (db_file, iso, location)
+    if key not in _hub_inputs:
+        prices = load_hub_prices(iso, location, db_file)
+        if prices is None:
+            _hub_inputs[key] = (None, None, 0)
+        else:
+            with diagnostics.timed("scenario.hub_index", iso=iso, rows=len(prices)):
+                _hub_inputs[key] = (build_horizon_indexes(prices), share_below(prices, MINING_PRICE_CAP), len(prices))
+    return _hub_inputs[key]
+
+
+def scenario_inputs(scenario):
+    """(miner MW, battery MW, breakeven, solar share, wind share); sizing defaults to the mix's target"""
+    s = scenario
+    s_pct, w_pct = economics.generation_mix(s["solar_mw"], s["wind_mw"])
+    ideal_m, ideal_b = economics.ideal_sizing(s["solar_mw"], s["wind_mw"])
+    m = float(ideal_m if s["miner_mw"] is None else s["miner_mw"])
+    b = float(ideal_b if s["battery_mw"] is None else s["battery_mw"])
+    return m, b, economics.miner_breakeven(s["efficiency"], s["hashprice"]), s_pct, w_pct
+
+
+def evaluate_scenario(scenario, indexes=None, measured_cap=None, price_rows=0):
+    """One result row: the scenario's inputs, sizing, get_metrics economics and live alpha per horizon"""
+    s = scenario
+    m, b, breakeven_val, s_pct, w_pct = scenario_inputs(s)
+    if s["cap"] is not None:
+        cap = s["cap"]
+    elif measured_cap is not None and not math.isnan(measured_cap):
+        cap = measured_cap
+    else:
+        cap = DEFAULT_CAP
+
+    metrics = economics.get_metrics(m, b, s["itc"], s["macrs"], cap, breakeven_val, w_pct, s_pct, s["efficiency"], s["miner_cost"])
+    row = {**s, "miner_mw": m, "battery_mw": b, "breakeven": breakeven_val, "cap": cap, "price_rows": price_rows,
+           **dict(zip(economics.METRIC_FIELDS, metrics))}
+    row["annual_alpha"] = row["mining_alpha"] + row["battery_alpha"]
+
+    live = indexed_horizon_alpha(indexes, breakeven_val, m, b, w_pct, s_pct) if indexes else {}
+    total_gen = s["solar_mw"] + s["wind_mw"]
+    for days in HORIZON_DAYS:
+        label = HORIZON_LABELS[days]
+        ma, ba, avg_p = (float(v) for v in live.get(days, (math.nan,) * 3))
+        split = economics.revenue_split(ma, ba, total_gen, days)
+        row[f"live_mining_alpha_{label}"] = ma
+        row[f"live_battery_alpha_{label}"] = ba
+        row[f"avg_price_{label}"] = avg_p
+        row[f"grid_baseline_{label}"] = split["baseline"]
+        row[f"pct_increase_{label}"] = split["pct_increase"]
+    live_1y = row["live_mining_alpha_1y"] + row["live_battery_alpha_1y"]
+    row["live_irr_1y"] = live_1y * 100 / row["net_capex"] if row["net_capex"] > 0 else 0.0
+    return row
+
+
+def _run_chunk(iso, location, db_file, scenarios):
+    """Rows for one chunk of scenarios that share a hub"""
+    indexes, measured_cap, rows = hub_inputs(iso, location, db_file)
+    return [evaluate_scenario(s, indexes, measured_cap, rows) for s in scenarios]
+
+
+def run_scenarios(scenarios, db_file=DB_FILE, workers=None, chunk_size=CHUNK_SCENARIOS):
+    """Yield one result DataFrame per chunk, in scenario-file order per hub.
+
+    Chunks never mix hubs, so each worker indexes a hub's prices at most once.
+    """
+    groups = {}
+    for i, s in enumerate(scenarios):
+        groups.setdefault((s["iso"], s["location"]), []).append({"scenario_id": i, **s})
+    tasks = [(iso, location, db_file, group[i:i + chunk_size])
+             for (iso, location), group in groups.items() for i in range(0, len(group), chunk_size)]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        for task in tasks:
+            yield pd.DataFrame(_run_chunk(*task))
+        return
+    # spawn: forking a threaded Streamlit server is unsafe
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        for rows in pool.map(_run_chunk, *zip(*tasks)):
+            yield pd.DataFrame(rows)
+
+
+# --- OUTPUT ---
+class ResultWriter:
+    """Appends result chunks to a CSV or Parquet file as they arrive"""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.lower().endswith(".parquet")
+        self.rows = 0
+        self._writer = None
+
+    def write(self, frame):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table.cast(self._writer.schema))
+        else:
+            frame.to_csv(self.path, mode="a" if self.rows else "w", header=not self.rows, index=False)
+        self.rows += len(frame)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate a file of site scenarios without the dashboard")
+    parser.add_argument("scenarios", help="JSON spec or CSV with one scenario per row")
+    parser.add_argument("-o", "--output", default="scenario_results.csv", help=".csv or .parquet")
+    parser.add_argument("--db", default=DB_FILE)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SCENARIOS)
+    args = parser.parse_args()
+
+    scenarios = load_scenarios(args.scenarios)
+    t0 = time.perf_counter()
+    with diagnostics.timed("scenario.run", scenarios=len(scenarios)), ResultWriter(args.output) as out:
+        for frame in run_scenarios(scenarios, args.db, args.workers, args.chunk_size):
+            out.write(frame)
+            print(f"{out.rows:,} / {len(scenarios):,} scenarios", end="\r", flush=True)
+    print(f"Wrote {out.rows:,} scenarios to {args.output} in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,44 +3,43 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 import requests
-import gridstatus
 import os
-import pickle
-from datetime import datetime, timedelta
+import time
+import alpha_engine
+import backtest_engine
+import dispatch
+import economics
+import diagnostics
+import live_feed
+import risk_engine
+import price_db
+import scenario_engine
+import price_summary
+from audit_db import DB_FILE
+from backtest_engine import BACKTEST_YEARS, backtest_matrix, db_version, run_backtest
+from price_data import DEFAULT_HUB, PriceRefresher
+from result_cache import ResultCache, code_version, dataset_version
+from dispatch import simulate_dispatch
+from chart_data import MinMaxPyramid, decimate
+from risk_engine import net_capex, risk_profile
+from scenario_engine import normalize_scenario
+from volatility_engine import RollingAnalytics, rolling_stats
+from alpha_engine import HORIZON_DAYS, alpha_sensitivity, build_horizon_indexes, indexed_horizon_alpha, range_alpha, tail_window
 
 # --- 1. CORE SYSTEM CONFIGURATION ---
 st.set_page_config(layout="wide", page_title="Hybrid OS | Grid Intelligence")
+_rerun_start = time.perf_counter()
 
 DASHBOARD_PASSWORD = "123"
-BATT_COST_PER_MW = 897404.0 
-CORP_TAX_RATE = 0.21 
-CACHE_FILE = "ercot_price_cache.pkl"
-CACHE_EXPIRY_HOURS = 1
-
-# --- CACHE FUNCTIONS ---
-def load_cached_prices():
-    """Load prices from local cache if fresh"""
-    if os.path.exists(CACHE_FILE):
-        try:
-            with open(CACHE_FILE, 'rb') as f:
-                data = pickle.load(f)
-                if data['timestamp'] > datetime.now() - timedelta(hours=CACHE_EXPIRY_HOURS):
-                    return data['prices']
-        except:
-            pass
-    return None
-
-def save_cached_prices(prices):
-    """Save prices to local cache"""
-    try:
-        with open(CACHE_FILE, 'wb') as f:
-            pickle.dump({'prices': prices, 'timestamp': datetime.now()}, f)
-    except:
-        pass
+# Admin login (the diagnostics panel) exists only when the deployment sets a password
+ADMIN_PASSWORD = os.environ.get("HYBRID_ADMIN_PASSWORD") or None
+LIVE_REFRESH_SECONDS = 60
 
 # --- 2. UNIFIED AUTHENTICATION PORTAL WITH EXECUTIVE BRIEF ---
 if "password_correct" not in st.session_state: 
     st.session_state.password_correct = False
+if "is_admin" not in st.session_state:
+    st.session_state.is_admin = False
 
 def check_password():
     if st.session_state.password_correct: return True
@@ -93,8 +92,10 @@ def check_password():
         
         pwd = st.text_input("Institutional Access Key", type="password")
         if st.button("Authenticate Session", use_container_width=True, type="primary"):
-            if pwd == DASHBOARD_PASSWORD:
+            is_admin = ADMIN_PASSWORD is not None and pwd == ADMIN_PASSWORD
+            if pwd == DASHBOARD_PASSWORD or is_admin:
                 st.session_state.password_correct = True
+                st.session_state.is_admin = is_admin
                 st.rerun()
             else:
                 st.error("Authentication Failed")
@@ -150,114 +151,329 @@ TREND_DATA_SYSTEM = {
     "$1.00 - $5.00": {"2021": 0.010, "2022": 0.003, "2023": 0.010, "2024": 0.006, "2025": 0.003}
 }
 
-# --- FETCH 365 DAYS ONCE AND CACHE LOCALLY ---
-@st.cache_data(ttl=300)
-def get_live_data():
-    """Fetch 365 days of ERCOT data once and cache locally"""
-    cached = load_cached_prices()
-    if cached is not None:
-        return cached
-    
+TREND_DATA_CAISO = {
+    "Negative (<$0)": {"2021": 0.034, "2022": 0.062, "2023": 0.089, "2024": 0.118, "2025": 0.145},
+    "$0 - $0.02": {"2021": 0.156, "2022": 0.198, "2023": 0.245, "2024": 0.278, "2025": 0.302},
+    "$0.02 - $0.04": {"2021": 0.412, "2022": 0.368, "2023": 0.312, "2024": 0.278, "2025": 0.245},
+    "$0.04 - $0.06": {"2021": 0.178, "2022": 0.185, "2023": 0.168, "2024": 0.148, "2025": 0.132},
+    "$0.06 - $0.08": {"2021": 0.095, "2022": 0.082, "2023": 0.075, "2024": 0.068, "2025": 0.062},
+    "$0.08 - $0.10": {"2021": 0.051, "2022": 0.044, "2023": 0.042, "2024": 0.039, "2025": 0.036},
+    "$0.10 - $0.15": {"2021": 0.036, "2022": 0.032, "2023": 0.035, "2024": 0.037, "2025": 0.040},
+    "$0.15 - $0.25": {"2021": 0.022, "2022": 0.018, "2023": 0.021, "2024": 0.023, "2025": 0.025},
+    "$0.25 - $1.00": {"2021": 0.012, "2022": 0.008, "2023": 0.012, "2024": 0.011, "2025": 0.010},
+    "$1.00 - $5.00": {"2021": 0.004, "2022": 0.003, "2023": 0.004, "2024": 0.002, "2025": 0.003}
+}
+
+TREND_DATA_PJM = {
+    "Negative (<$0)": {"2021": 0.002, "2022": 0.003, "2023": 0.005, "2024": 0.008, "2025": 0.012},
+    "$0 - $0.02": {"2021": 0.068, "2022": 0.089, "2023": 0.112, "2024": 0.134, "2025": 0.156},
+    "$0.02 - $0.04": {"2021": 0.542, "2022": 0.512, "2023": 0.478, "2024": 0.445, "2025": 0.412},
+    "$0.04 - $0.06": {"2021": 0.198, "2022": 0.205, "2023": 0.198, "2024": 0.189, "2025": 0.178},
+    "$0.06 - $0.08": {"2021": 0.098, "2022": 0.091, "2023": 0.087, "2024": 0.082, "2025": 0.078},
+    "$0.08 - $0.10": {"2021": 0.052, "2022": 0.045, "2023": 0.044, "2024": 0.041, "2025": 0.038},
+    "$0.10 - $0.15": {"2021": 0.024, "2022": 0.020, "2023": 0.022, "2024": 0.024, "2025": 0.026},
+    "$0.15 - $0.25": {"2021": 0.012, "2022": 0.010, "2023": 0.011, "2024": 0.012, "2025": 0.014},
+    "$0.25 - $1.00": {"2021": 0.003, "2022": 0.002, "2023": 0.003, "2024": 0.003, "2025": 0.003},
+    "$1.00 - $5.00": {"2021": 0.001, "2022": 0.001, "2023": 0.002, "2024": 0.002, "2025": 0.003}
+}
+
+TREND_DATA_MISO = {
+    "Negative (<$0)": {"2021": 0.008, "2022": 0.014, "2023": 0.022, "2024": 0.031, "2025": 0.042},
+    "$0 - $0.02": {"2021": 0.134, "2022": 0.168, "2023": 0.201, "2024": 0.232, "2025": 0.261},
+    "$0.02 - $0.04": {"2021": 0.498, "2022": 0.462, "2023": 0.421, "2024": 0.388, "2025": 0.355},
+    "$0.04 - $0.06": {"2021": 0.208, "2022": 0.218, "2023": 0.203, "2024": 0.188, "2025": 0.172},
+    "$0.06 - $0.08": {"2021": 0.087, "2022": 0.078, "2023": 0.072, "2024": 0.068, "2025": 0.062},
+    "$0.08 - $0.10": {"2021": 0.038, "2022": 0.032, "2023": 0.031, "2024": 0.029, "2025": 0.027},
+    "$0.10 - $0.15": {"2021": 0.016, "2022": 0.014, "2023": 0.017, "2024": 0.019, "2025": 0.022},
+    "$0.15 - $0.25": {"2021": 0.007, "2022": 0.006, "2023": 0.008, "2024": 0.010, "2025": 0.012},
+    "$0.25 - $1.00": {"2021": 0.002, "2022": 0.001, "2023": 0.002, "2024": 0.002, "2025": 0.002},
+    "$1.00 - $5.00": {"2021": 0.001, "2022": 0.001, "2023": 0.001, "2024": 0.001, "2025": 0.002}
+}
+
+TREND_DATA_SPP = {
+    "Negative (<$0)": {"2021": 0.012, "2022": 0.021, "2023": 0.032, "2024": 0.045, "2025": 0.058},
+    "$0 - $0.02": {"2021": 0.168, "2022": 0.201, "2023": 0.241, "2024": 0.272, "2025": 0.298},
+    "$0.02 - $0.04": {"2021": 0.478, "2022": 0.441, "2023": 0.398, "2024": 0.361, "2025": 0.325},
+    "$0.04 - $0.06": {"2021": 0.188, "2022": 0.195, "2023": 0.178, "2024": 0.162, "2025": 0.147},
+    "$0.06 - $0.08": {"2021": 0.084, "2022": 0.076, "2023": 0.070, "2024": 0.065, "2025": 0.061},
+    "$0.08 - $0.10": {"2021": 0.038, "2022": 0.032, "2023": 0.030, "2024": 0.028, "2025": 0.026},
+    "$0.10 - $0.15": {"2021": 0.018, "2022": 0.015, "2023": 0.017, "2024": 0.019, "2025": 0.021},
+    "$0.15 - $0.25": {"2021": 0.009, "2022": 0.007, "2023": 0.009, "2024": 0.010, "2025": 0.012},
+    "$0.25 - $1.00": {"2021": 0.003, "2022": 0.002, "2023": 0.003, "2024": 0.003, "2025": 0.003},
+    "$1.00 - $5.00": {"2021": 0.002, "2022": 0.001, "2023": 0.002, "2024": 0.001, "2025": 0.002}
+}
+
+# --- MEASURED TREND TABLES (the hand-entered tables above are the fallback) ---
+@st.cache_data(ttl=3600)
+def get_trend_data(iso, location, fallback):
+    """Bucket frequencies from the historical_prices summary when the database has this hub"""
+    with diagnostics.timed('summary.trend', iso=iso):
+        measured = price_summary.load_trend_data(DB_FILE, iso, location)
+    return measured if measured else fallback
+
+TREND_DATA_WEST = get_trend_data("ERCOT", "HB_WEST", TREND_DATA_WEST)
+TREND_DATA_SYSTEM = get_trend_data("ERCOT", None, TREND_DATA_SYSTEM)
+TREND_DATA_CAISO = get_trend_data("CAISO", "TH_NP15_GEN-APND", TREND_DATA_CAISO)
+TREND_DATA_PJM = get_trend_data("PJM", None, TREND_DATA_PJM)
+TREND_DATA_MISO = get_trend_data("MISO", None, TREND_DATA_MISO)
+TREND_DATA_SPP = get_trend_data("SPP", None, TREND_DATA_SPP)
+# 2025 drives the sizing heuristic; newer databases fall back to their latest year
+CAP_YEAR = "2025" if "2025" in TREND_DATA_WEST["Negative (<$0)"] else max(TREND_DATA_WEST["Negative (<$0)"])
+
+# --- SERVE LAST GOOD DATA, REFRESH IN THE BACKGROUND ---
+@st.cache_resource
+def get_price_refresher():
+    """One background refresher per server process"""
+    return PriceRefresher()
+
+@st.cache_resource(ttl=300)
+def get_placeholder_prices():
+    """Synthetic series shown until the first backfill lands"""
+    return pd.Series(np.random.uniform(15, 45, 8760))
+
+@st.cache_data(ttl=3600)
+def get_db_hubs():
+    """(ISO, hub) pairs present in the 5-year history database"""
+    return price_db.available_series(DB_FILE)
+
+@st.cache_data(ttl=3600, max_entries=16)
+def get_db_prices(iso, location):
+    """Last year of one hub from the history database, read through the series index"""
+    with diagnostics.timed('db.read_hub', iso=iso):
+        return price_db.read_recent(DB_FILE, iso, location)
+
+def hub_options():
+    """ERCOT hubs already in the live cache, then other ISOs' hubs from the history database"""
+    ercot = [("ERCOT", loc) for loc in sorted(get_price_refresher().locations())] or [("ERCOT", DEFAULT_HUB)]
+    return ercot + [s for s in get_db_hubs() if s[0] != "ERCOT"]
+
+def get_live_data(iso, location):
+    """Serve cached prices immediately: ERCOT from the live cache (topped up on a worker thread), other ISOs from the history database"""
     try:
-        all_data = []
-        end_date = pd.Timestamp.now(tz="US/Central")
-        start_date = end_date - pd.Timedelta(days=365)
-        
-        current_date = start_date
-        while current_date < end_date:
-            chunk_end = min(current_date + pd.Timedelta(days=30), end_date)
-            try:
-                iso = gridstatus.Ercot()
-                df = iso.get_rtm_lmp(start=current_date, end=chunk_end, verbose=False)
-                if df is not None and len(df) > 0:
-                    chunk_data = df[df['Location'] == 'HB_WEST'].set_index('Time').sort_index()['LMP']
-                    all_data.append(chunk_data)
-            except:
-                pass
-            current_date = chunk_end
-        
-        if all_data:
-            full_series = pd.concat(all_data).drop_duplicates().sort_index()
-            save_cached_prices(full_series)
-            return full_series
+        prices = get_price_refresher().get(location) if iso == "ERCOT" else get_db_prices(iso, location)
+        if prices is not None and len(prices) > 0:
+            return prices
+    except Exception as e:
+        diagnostics.error('get_live_data', e, iso=iso, location=location)
+    return get_placeholder_prices()
+
+def show_data_status(iso):
+    """Sidebar readout of data age and background refresh state"""
+    if iso != "ERCOT":
+        if isinstance(price_hist.index, pd.DatetimeIndex):
+            st.sidebar.caption(f"{iso} history database · data as of {price_hist.index.max():%Y-%m-%d %H:%M} UTC · {len(price_hist):,} intervals")
         else:
-            return pd.Series(np.random.uniform(15, 45, 8760))
-    except:
-        return pd.Series(np.random.uniform(15, 45, 8760))
+            st.sidebar.warning(f"No {iso} history in the database. Showing placeholder prices.")
+        return
+    status = get_price_refresher().status()
+    if status['data_as_of'] is None:
+        st.sidebar.warning("Live ERCOT history is loading in the background. Showing placeholder prices.")
+    else:
+        age_min = (pd.Timestamp.now(tz=status['data_as_of'].tz) - status['data_as_of']).total_seconds() / 60.0
+        st.sidebar.caption(f"Data as of {status['data_as_of']:%Y-%m-%d %H:%M} ({age_min:,.0f} min old) · {status['rows']:,} intervals · {status['locations']} hubs")
+    if status['state'] == 'refreshing':
+        st.sidebar.caption("🔄 Refreshing from ERCOT…")
+    elif status['state'] == 'error':
+        st.sidebar.caption(f"⚠️ Last refresh failed: {status['error']}")
+    if status['missing']:
+        st.sidebar.caption(f"⚠️ {len(status['missing'])} date range(s) still missing from history")
 
-price_hist = get_live_data()
-breakeven = (1e6 / m_eff) * (hp_cents / 100.0) / 24.0
+st.sidebar.write("---")
+st.sidebar.markdown("### 📡 Market Data")
+hub_choices = hub_options()
+hub_iso, hub_location = st.sidebar.selectbox("Pricing Hub", hub_choices, index=hub_choices.index(("ERCOT", DEFAULT_HUB)) if ("ERCOT", DEFAULT_HUB) in hub_choices else 0,
+                                             format_func=lambda s: f"{s[0]} · {s[1]}")
+price_hist = get_live_data(hub_iso, hub_location)
+live_feed.get_feed(hub_iso, hub_location).seed(price_hist)
+price_version = dataset_version(price_hist)
+# Placeholder prices have no version: in-memory caches key them by identity and the disk cache skips them
+price_key = price_version or f"placeholder-{id(price_hist)}"
+show_data_status(hub_iso)
+breakeven = economics.miner_breakeven(m_eff, hp_cents)
 
 # --- 4.5 CALCULATE FROM CACHED DATA ---
-@st.cache_data(ttl=3600)
-def calculate_period_live_alpha(price_series, breakeven_val, ideal_m, ideal_b, days, w_pct, s_pct):
-    """Calculate mining/battery alpha from CACHED data, weighted by generation source"""
+# Price series are keyed by their dataset version (price_key) instead of being hashed on every call
+@st.cache_resource
+def get_result_cache():
+    """Disk-backed LRU shared by every server process; keys include a digest of the model code"""
+    return ResultCache(code_version=code_version(alpha_engine, backtest_engine, dispatch, economics, risk_engine, scenario_engine))
+
+def cached_result(version, key, compute):
+    """compute() memoized on disk under (dataset version, hub, *key); unversioned data is not persisted"""
+    if version is None:
+        return compute()
+    return get_result_cache().get_or_compute((version, hub_iso, hub_location) + key, compute)
+
+@st.cache_resource(ttl=3600, max_entries=8)
+def get_price_indexes(_price_series, version):
+    """Sorted price + prefix sum index per horizon, independent of breakeven"""
+    with diagnostics.timed('alpha.index_build', rows=len(_price_series)):
+        return build_horizon_indexes(_price_series, HORIZON_DAYS)
+
+def calculate_live_alpha_all_horizons(price_series, breakeven_val, ideal_m, ideal_b, w_pct, s_pct):
+    """Calculate mining/battery alpha for every horizon from the sorted price index"""
     try:
-        data_points_needed = days * 288
-        if len(price_series) < data_points_needed:
-            period_data = price_series
-        else:
-            period_data = price_series.iloc[-data_points_needed:]
-        
-        if len(period_data) < 288:
-            return 0, 0, 0
-            
-        avg_price = period_data.mean()
-        
-        # Raw margin capture based on 5-min intervals
-        raw_mining = sum([max(0, breakeven_val - price) * ideal_m for price in period_data])
-        raw_battery = sum([max(0, price - breakeven_val) * ideal_b for price in period_data])
-        
-        actual_days = len(period_data) / 288.0
-        
-        # Convert to daily averages and scale to period
-        base_mining = (raw_mining / 288.0) * actual_days
-        base_battery = (raw_battery / 288.0) * actual_days
-        
-        # Apply Synchronized Generation Weights
-        weighted_mining = base_mining * (1.0 + (w_pct * 0.20))
-        weighted_battery = base_battery * (1.0 + (s_pct * 0.25))
-        
-        return weighted_mining, weighted_battery, avg_price
-    except:
+        with diagnostics.timed('alpha.horizons', rows=len(price_series)):
+            return cached_result(price_version, ('alpha.horizons', breakeven_val, ideal_m, ideal_b, w_pct, s_pct),
+                                 lambda: indexed_horizon_alpha(get_price_indexes(price_series, price_key), breakeven_val, ideal_m, ideal_b, w_pct, s_pct))
+    except Exception as e:
+        diagnostics.error('alpha.horizons', e)
+        return {days: (0, 0, 0) for days in HORIZON_DAYS}
+
+def calculate_range_alpha(price_series, breakeven_val, ideal_m, ideal_b, start, end, w_pct, s_pct):
+    """Calculate mining/battery alpha for a custom [start, end) date range"""
+    try:
+        with diagnostics.timed('alpha.range', rows=len(price_series)):
+            return cached_result(price_version, ('alpha.range', breakeven_val, ideal_m, ideal_b, start.isoformat(), end.isoformat(), w_pct, s_pct),
+                                 lambda: range_alpha(price_series, breakeven_val, ideal_m, ideal_b, start, end, w_pct, s_pct))
+    except Exception as e:
+        diagnostics.error('alpha.range', e)
         return 0, 0, 0
 
+@st.cache_resource(ttl=3600, max_entries=8)
+def get_chart_pyramid(_price_series, version):
+    """Min/max decimation pyramid so charts ship a fixed point budget"""
+    with diagnostics.timed('chart.pyramid_build', rows=len(_price_series)):
+        return MinMaxPyramid(_price_series.to_numpy())
+
+def simulate_battery_dispatch(price_series, sizes_mw, duration_h, breakeven_val, rte, soc_min, soc_max, miner_mw):
+    """SoC-constrained dispatch over the last year for a sweep of battery sizes"""
+    with diagnostics.timed('dispatch.simulate', sizes=len(sizes_mw)):
+        return cached_result(price_version, ('dispatch.simulate', sizes_mw, duration_h, breakeven_val, rte, soc_min, soc_max, miner_mw),
+                             lambda: simulate_dispatch(tail_window(price_series, 365), np.array(sizes_mw), duration_h, breakeven_val, rte, soc_min, soc_max, miner_mw=miner_mw))
+
+def run_risk_profile(price_series, breakeven_val, ideal_m, ideal_b, w_pct, s_pct, nc, n_paths):
+    """Block-bootstrap P10/P50/P90 alpha and IRR, memoized on their inputs"""
+    with diagnostics.timed('risk.profile', paths=n_paths):
+        return cached_result(price_version, ('risk.profile', breakeven_val, ideal_m, ideal_b, w_pct, s_pct, nc, n_paths),
+                             lambda: risk_profile(price_series, breakeven_val, ideal_m, ideal_b, w_pct, s_pct, nc, n_paths=n_paths))
+
+@st.cache_data
+def cached_metrics(m, b, itc_v, mc_on, cap, breakeven_val, w_pct, s_pct, eff, cost):
+    """get_metrics memoized on its actual inputs"""
+    return economics.get_metrics(m, b, itc_v, mc_on, cap, breakeven_val, w_pct, s_pct, eff, cost)
+
+@st.cache_data(max_entries=64)
+def run_sizing_optimizer(size_cap, cap, breakeven_val, w_pct, s_pct, eff, cost, max_payback):
+    """Sizing sweep memoized on its actual inputs"""
+    return economics.optimize_sizing(np.linspace(0, size_cap, 101), np.linspace(0, size_cap, 101),
+                                     cap, breakeven_val, w_pct, s_pct, eff, cost, max_payback=max_payback)
+
+@st.cache_resource(max_entries=16)
+def get_rolling_analytics(iso, location, horizons=HORIZON_DAYS):
+    """Rolling windows for one hub, shared across sessions and topped up as intervals arrive"""
+    return RollingAnalytics(horizons)
+
+def get_hub_analytics():
+    """Selected hub's rolling windows, synced to the history and the live intervals that continue it"""
+    analytics = get_rolling_analytics(hub_iso, hub_location)
+    with diagnostics.timed('volatility.update', iso=hub_iso) as fields:
+        fields['new'] = analytics.sync(price_hist, live_feed.get_feed(hub_iso, hub_location).snapshot()['series'])
+    return analytics
+
+def iso_window(iso):
+    """Trailing-year window stats for an ISO's lead hub, or None when its prices are not loaded"""
+    location = price_db.ISO_HUBS[iso][0]
+    if iso == "ERCOT":
+        prices = get_live_data(iso, location)
+    else:
+        prices = get_db_prices(iso, location) if (iso, location) in get_db_hubs() else None
+    if prices is None or not isinstance(prices.index, pd.DatetimeIndex):
+        return None
+    analytics = get_rolling_analytics(iso, location, (365,))
+    analytics.sync(prices)
+    return analytics.stats(365, breakeven)
+
+@st.cache_data(ttl=3600, max_entries=8)
+def rolling_volatility(_price_series, version, breakeven_val, days=30):
+    """Trailing-window volatility and price shares sampled once a day for charting"""
+    with diagnostics.timed('volatility.rolling', rows=len(_price_series)):
+        return rolling_stats(_price_series, days, breakeven_val).resample("1D").last()
+
+def iso_key_metrics(trend, window, year):
+    """Key metrics for one ISO from its bucket table; the mining window comes from prices when they are loaded"""
+    years = list(trend["Negative (<$0)"])
+    year = year if year in years else years[-1]
+    neg = trend["Negative (<$0)"]
+    measured = window is not None and window['intervals'] > 0
+    return {
+        "year": year,
+        "first_year": years[0],
+        "negative": neg[year],
+        "negative_trend": (neg[year] / neg[years[0]] - 1) * 100 if neg[years[0]] > 0 else float("nan"),
+        "sub_2c": trend["$0 - $0.02"][year],
+        "sub_4c": neg[year] + trend["$0 - $0.02"][year] + trend["$0.02 - $0.04"][year],
+        "peak": trend["$1.00 - $5.00"][year],
+        "arbitrage": window['below_breakeven'] if measured else price_summary.trend_share_below(trend, year, breakeven),
+        "measured": measured,
+    }
+
+def volatility_trend_label(km):
+    """Direction of the negative-price frequency since the first trend year"""
+    change = km['negative_trend']
+    if np.isnan(change):
+        return "n/a"
+    label = "📈 Rapid" if change >= 100 else "📈 Growing" if change >= 10 else "📉 Falling" if change <= -10 else "➡️ Flat"
+    return f"{label} ({change:+.0f}%)"
+
+def key_metrics_text(km):
+    source = "trailing year" if km['measured'] else f"{km['year']} bucket estimate"
+    return f"""
+            - 🔴 **Negative Price Trend:** {km['negative_trend']:+.0f}% ({km['first_year']}→{km['year']})
+            - 📈 **$0-$0.02 Frequency:** {km['sub_2c']:.1%} in {km['year']}
+            - ⚡ **Peak Volatility:** {km['peak']:.1%} of hours >$1.00/kWh
+            - 🎯 **Arbitrage Window:** {km['arbitrage']:.1%} profitable mining hours at ${breakeven:.0f}/MWh ({source})
+            """
+
+@st.cache_data
+def trend_table(trend):
+    """Year-by-bucket frequency table pre-formatted as percentages for st.table"""
+    return pd.DataFrame(trend).T.map(lambda v: f"{v:.1%}")
+
 # --- 5. DASHBOARD INTERFACE ---
 t_evolution, t_tax, t_volatility, t_price_dsets = st.tabs(
     ["📊 Performance Evolution", "🏛️ Institutional Tax Strategy", "📈 Long-Term Volatility", "📊 Price Datasets"])
 
 with t_evolution:
     st.markdown(f"### ⚙️ Institutional Performance Summary")
-    curr_p = price_hist.iloc[-1]
     total_gen = solar_cap + wind_cap
     
     # Calculate generation percentages early so they can be passed to the alpha function
-    s_pct = solar_cap / total_gen if total_gen > 0 else 0.5
-    w_pct = wind_cap / total_gen if total_gen > 0 else 0.5
-    
-    l1, l2, l3, l4 = st.columns(4)
-    l1.metric("Market Price", f"${curr_p:.2f}")
-    l2.metric("Miner Breakeven", f"${breakeven:.2f}")
-    l3.metric("Miner Status", "OFF" if m_load_in == 0 else ("ACTIVE" if curr_p < breakeven else "INACTIVE"))
-    l4.metric("Total Generation", f"{(total_gen * 0.358):.1f} MW")
+    s_pct, w_pct = economics.generation_mix(solar_cap, wind_cap)
 
-    st.markdown("---")
-    ma_live = m_load_in * (breakeven - max(0, curr_p)) if (m_load_in > 0 and curr_p < breakeven) else 0
-    ba_live = b_mw_in * curr_p if (b_mw_in > 0 and curr_p > breakeven) else 0
-    a1, a2 = st.columns(2)
-    a1.metric("Live Mining Alpha", f"${ma_live:,.2f}/hr")
-    a2.metric("Live Battery Alpha", f"${ba_live:,.2f}/hr")
+    @st.fragment(run_every=LIVE_REFRESH_SECONDS)
+    def render_live_panel():
+        """Live metrics from the polled ring buffer; reruns on its own without touching the full history"""
+        live = live_feed.get_feed(hub_iso, hub_location).snapshot()
+        curr_p = live['price'] if live['price'] is not None else float(price_hist.loc[price_hist.last_valid_index()])
+
+        l1, l2, l3, l4 = st.columns(4)
+        l1.metric("Market Price", f"${curr_p:.2f}")
+        l2.metric("Miner Breakeven", f"${breakeven:.2f}")
+        l3.metric("Miner Status", "OFF" if m_load_in == 0 else ("ACTIVE" if curr_p < breakeven else "INACTIVE"))
+        l4.metric("Total Generation", f"{(total_gen * 0.358):.1f} MW")
+
+        st.markdown("---")
+        ma_live = m_load_in * (breakeven - max(0, curr_p)) if (m_load_in > 0 and curr_p < breakeven) else 0
+        ba_live = b_mw_in * curr_p if (b_mw_in > 0 and curr_p > breakeven) else 0
+        a1, a2 = st.columns(2)
+        a1.metric("Live Mining Alpha", f"${ma_live:,.2f}/hr")
+        a2.metric("Live Battery Alpha", f"${ba_live:,.2f}/hr")
+        if live['as_of'] is not None:
+            note = f" · ⚠️ last poll failed: {live['error']}" if live['error'] else ""
+            st.caption(f"{hub_iso} {hub_location} interval {live['as_of']:%Y-%m-%d %H:%M} UTC · {len(live['series'])} intervals buffered{note}")
+
+    render_live_panel()
 
     st.markdown("---")
     st.subheader("🎯 Optimization Engine")
-    ideal_m, ideal_b = int(total_gen * ((s_pct * 0.10) + (w_pct * 0.25))), int(total_gen * ((s_pct * 0.50) + (w_pct * 0.25)))
+    ideal_m, ideal_b = economics.ideal_sizing(solar_cap, wind_cap)
     
     col_a, col_b = st.columns([1, 2])
     with col_a:
         st.write(f"**Target Sizing:** {ideal_m}MW Miners | {ideal_b}MW Battery")
-        cap_2025 = TREND_DATA_WEST["Negative (<$0)"]["2025"] + TREND_DATA_WEST["$0 - $0.02"]["2025"]
-        m_yield_yr = (cap_2025 * 8760 * ideal_m * (breakeven - 12)) * (1.0 + (w_pct * 0.20))
-        b_yield_yr = (0.12 * 8760 * ideal_b * (breakeven + 30)) * (1.0 + (s_pct * 0.25))
+        cap_2025 = TREND_DATA_WEST["Negative (<$0)"][CAP_YEAR] + TREND_DATA_WEST["$0 - $0.02"][CAP_YEAR]
+        m_yield_yr, b_yield_yr = cached_metrics(ideal_m, ideal_b, 0, False, cap_2025, breakeven, w_pct, s_pct, m_eff, m_cost)[:2]
         idl_alpha = m_yield_yr + b_yield_yr
         st.metric("Annual Strategy Delta", f"${idl_alpha:,.0f}")
     with col_b:
@@ -271,113 +487,241 @@ with t_evolution:
 
     st.markdown("---")
     st.subheader("📅 Historical Alpha Potential (Revenue Split)")
+
+    # Fragments: the live toggle and the live-only controls rerun just their own section
+    @st.fragment
+    def render_dispatch_sim():
+        """Dispatch controls rerun only the simulation"""
+        with st.expander("🔋 Battery Dispatch Simulation (1Y Live)"):
+            st.caption("State-of-charge dispatch over the live price series: the battery charges at or below breakeven (costed at the mining opportunity when miners are on site) and discharges once price clears breakeven / round-trip efficiency.")
+            d1, d2, d3 = st.columns(3)
+            batt_duration = d1.slider("Battery Duration (h)", 1.0, 8.0, 2.0, 0.5)
+            batt_rte = d2.slider("Round-Trip Efficiency", 0.70, 0.95, 0.85, 0.01)
+            soc_lo, soc_hi = d3.slider("SoC Limits", 0.0, 1.0, (0.10, 0.90), 0.05)
+            sweep_mw = np.unique(np.append(np.linspace(0, max(total_gen, 1), 25), ideal_b))
+            dispatch_df = simulate_battery_dispatch(price_hist, tuple(sweep_mw), batt_duration, breakeven, batt_rte, soc_lo, soc_hi, ideal_m)
+            at_ideal = dispatch_df[dispatch_df['power_mw'] == ideal_b].iloc[0]
+            r1, r2, r3 = st.columns(3)
+            r1.metric(f"Dispatch Battery Alpha ({ideal_b}MW)", f"${at_ideal['battery_alpha']:,.0f}")
+            r2.metric("Discharged Energy", f"{at_ideal['discharged_mwh']:,.0f} MWh")
+            r3.metric("Full Cycles", f"{at_ideal['cycles']:,.0f}")
+            fig_disp = go.Figure(data=[go.Scatter(name='Battery Alpha', x=dispatch_df['power_mw'], y=dispatch_df['battery_alpha'], mode='lines+markers', line=dict(color='#0052FF'))])
+            fig_disp.update_layout(height=280, xaxis_title="Battery Size (MW)", yaxis_title="Dispatch Alpha ($)", margin=dict(t=20, b=0, l=0, r=0), paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+            st.plotly_chart(fig_disp, use_container_width=True)
+
+    @st.fragment
+    def render_revenue_split():
+        """Revenue split cards plus the live-only sensitivity and dispatch views"""
+        toggle_col1, toggle_col2 = st.columns([3, 1])
+        with toggle_col2:
+            use_live_data = st.toggle("📊 Use Live Data", value=False)
     
-    toggle_col1, toggle_col2 = st.columns([3, 1])
-    with toggle_col2:
-        use_live_data = st.toggle("📊 Use Live Data", value=False)
-    
-    with st.expander("📊 How These Calculations Work"):
-        st.markdown("""
-        **Historical Estimate (cap_2025):**
-        - `cap_2025` = Frequency of profitable mining windows in 2025
-          - Sum of: Negative prices (12.1%) + $0-$0.02 prices (33.5%) = **45.6% of hours**
-        - **Mining Alpha Formula:** - `(cap_2025 × 8760 hours × ideal_m MW × (breakeven - $12/MWh)) × wind_adjustment`
-          - The `$12` represents average profit margin during low-price periods
-        - **Battery Alpha Formula:**
-          - `(0.12 capacity factor × 8760 hours × ideal_b MW × (breakeven + $30/MWh)) × solar_adjustment`
-          - The `$30` represents average price premium during scarcity periods
+        with st.expander("📊 How These Calculations Work"):
+            st.markdown(f"""
+            **Historical Estimate (cap_2025):**
+            - `cap_2025` = Frequency of profitable mining windows in {CAP_YEAR} (HB_WEST)
+              - Sum of: Negative prices ({TREND_DATA_WEST["Negative (<$0)"][CAP_YEAR]:.1%}) + $0-$0.02 prices ({TREND_DATA_WEST["$0 - $0.02"][CAP_YEAR]:.1%}) = **{cap_2025:.1%} of hours**
+            - **Mining Alpha Formula:** - `(cap_2025 × 8760 hours × ideal_m MW × (breakeven - $12/MWh)) × wind_adjustment`
+              - The `$12` represents average profit margin during low-price periods
+            - **Battery Alpha Formula:**
+              - `(0.12 capacity factor × 8760 hours × ideal_b MW × (breakeven + $30/MWh)) × solar_adjustment`
+              - The `$30` represents average price premium during scarcity periods
         
-        **Live Actual Data:**
-        - Analyzes real ERCOT RTM prices (5-minute intervals, 288 per day)
-        - **24H**: Last 288 data points (1 day)
-        - **7D**: Last 2,016 data points (7 days)
-        - **30D**: Last 8,640 data points (30 days)
-        - **6M**: Last ~43,200 data points (182 days)
-        - **1Y**: Last ~87,360 data points (365 days)
-        - Mining: Sum of (max(0, breakeven - price) × ideal_m) for each interval
-        - Battery: Sum of (max(0, price - breakeven) × ideal_b) for each interval
-        - Results are normalized by hour, scaled to period length, and weighted by generation source.
-        """)
+            **Live Actual Data:**
+            - Analyzes real ERCOT RTM prices (5-minute intervals, 288 per day)
+            - **24H / 7D / 30D / 6M / 1Y**: The last 1, 7, 30, 182 and 365 days by timestamp, ending at the latest interval
+            - Each interval is weighted by its real duration (a 15-minute interval counts as three 5-minute ones), and data gaps add nothing
+            - Mining: Sum of (max(0, breakeven - price) × ideal_m) for each interval
+            - Battery: Sum of (max(0, price - breakeven) × ideal_b) for each interval
+            - Results are normalized by hour, scaled to period length, and weighted by generation source.
+            """)
     
-    h1, h2, h3, h4, h5 = st.columns(5)
-    dm, db = m_yield_yr / 365, b_yield_yr / 365
+        h1, h2, h3, h4, h5 = st.columns(5)
+        dm, db = m_yield_yr / 365, b_yield_yr / 365
+        live_alpha = calculate_live_alpha_all_horizons(price_hist, breakeven, ideal_m, ideal_b, w_pct, s_pct) if use_live_data else {}
+        hub_analytics = get_hub_analytics() if use_live_data else None
     
-    def show_split(col, lbl, days, base, use_live=False):
-        sc = (total_gen / 200)
-        cr = (base * sc) * 0.65
-        
-        if use_live:
-            ma, ba, avg_p = calculate_period_live_alpha(price_hist, breakeven, ideal_m, ideal_b, days, w_pct, s_pct)
-            data_source = "Live"
-        else:
-            ma, ba = dm * days, db * days
-            avg_p = 0 # Historical baseline doesn't use a specific average price
-            data_source = "Historical"
-        
-        total_alpha = ma + ba
-        total_with_baseline = cr + total_alpha
-        pct_increase = ((total_alpha / cr) * 100) if cr > 0 else 0
+        def show_split(col, lbl, days, use_live=False):
+            if use_live:
+                ma, ba, avg_p = live_alpha[days]
+                data_source = "Live"
+            else:
+                ma, ba = dm * days, db * days
+                avg_p = 0 # Historical baseline doesn't use a specific average price
+                data_source = "Historical"
         
-        ma_pct = (ma / cr * 100) if cr > 0 else 0
-        ba_pct = (ba / cr * 100) if cr > 0 else 0
+            split = economics.revenue_split(ma, ba, total_gen, days)
+            cr, total_alpha, total_with_baseline = split["baseline"], split["alpha"], split["total"]
+            pct_increase, ma_pct, ba_pct = split["pct_increase"], split["mining_pct"], split["battery_pct"]
         
-        with col:
-            st.markdown(f"#### {lbl} ({data_source})")
-            if use_live:
-                st.metric("Avg Grid Price", f"${avg_p:.2f}", delta=f"{avg_p - breakeven:.2f} vs Breakeven", delta_color="inverse")
-            st.markdown(f"**📊 Grid Baseline**")
-            st.markdown(f"<h3 style='margin-bottom:5px; color:#ffffff;'>${cr:,.0f}</h3>", unsafe_allow_html=True)
-            st.markdown(f"**⬆️ Alpha Increase**")
-            st.markdown(f"<h3 style='margin-bottom:5px; color:#28a745;'>${total_alpha:,.0f}</h3>", unsafe_allow_html=True)
-            st.markdown(f"**💰 Total**")
-            st.markdown(f"<h3 style='margin-bottom:5px; color:#0052FF;'>${total_with_baseline:,.0f}</h3>", unsafe_allow_html=True)
-            st.markdown(f"**📈 % Increase**")
-            st.markdown(f"<h2 style='margin-bottom:10px; color:#FFD700;'>{pct_increase:+.1f}%</h2>", unsafe_allow_html=True)
-            st.markdown(f"<hr style='margin: 8px 0;'>", unsafe_allow_html=True)
-            st.write(f"⛏️ Mining: `${ma:,.0f}` ({ma_pct:+.1f}%)")
-            st.write(f"🔋 Battery: `${ba:,.0f}` ({ba_pct:+.1f}%)")
+            with col:
+                st.markdown(f"#### {lbl} ({data_source})")
+                if use_live:
+                    st.metric("Avg Grid Price", f"${avg_p:.2f}", delta=f"{avg_p - breakeven:.2f} vs Breakeven", delta_color="inverse")
+                    vol = hub_analytics.stats(days, breakeven)
+                    if vol['intervals'] > 1:
+                        st.caption(f"σ ${vol['std']:.2f} · {vol['below_breakeven']:.1%} below breakeven · {vol['negative_share']:.1%} negative")
+                st.markdown(f"**📊 Grid Baseline**")
+                st.markdown(f"<h3 style='margin-bottom:5px; color:#ffffff;'>${cr:,.0f}</h3>", unsafe_allow_html=True)
+                st.markdown(f"**⬆️ Alpha Increase**")
+                st.markdown(f"<h3 style='margin-bottom:5px; color:#28a745;'>${total_alpha:,.0f}</h3>", unsafe_allow_html=True)
+                st.markdown(f"**💰 Total**")
+                st.markdown(f"<h3 style='margin-bottom:5px; color:#0052FF;'>${total_with_baseline:,.0f}</h3>", unsafe_allow_html=True)
+                st.markdown(f"**📈 % Increase**")
+                st.markdown(f"<h2 style='margin-bottom:10px; color:#FFD700;'>{pct_increase:+.1f}%</h2>", unsafe_allow_html=True)
+                st.markdown(f"<hr style='margin: 8px 0;'>", unsafe_allow_html=True)
+                st.write(f"⛏️ Mining: `${ma:,.0f}` ({ma_pct:+.1f}%)")
+                st.write(f"🔋 Battery: `${ba:,.0f}` ({ba_pct:+.1f}%)")
     
-    show_split(h1, "24H", 1, 101116, use_live=use_live_data)
-    show_split(h2, "7D", 7, 704735, use_live=use_live_data)
-    show_split(h3, "30D", 30, 3009339, use_live=use_live_data)
-    show_split(h4, "6M", 182, 13159992, use_live=use_live_data)
-    show_split(h5, "1Y", 365, 26469998, use_live=use_live_data)
+        show_split(h1, "24H", 1, use_live=use_live_data)
+        show_split(h2, "7D", 7, use_live=use_live_data)
+        show_split(h3, "30D", 30, use_live=use_live_data)
+        show_split(h4, "6M", 182, use_live=use_live_data)
+        show_split(h5, "1Y", 365, use_live=use_live_data)
+
+        if use_live_data:
+            with st.expander("🎚️ Alpha vs. Breakeven Sensitivity (1Y Live)"):
+                be_grid = np.linspace(0, max(200.0, breakeven * 2), 400)
+                sens_m, sens_b = alpha_sensitivity(get_price_indexes(price_hist, price_key)[365], be_grid, ideal_m, ideal_b, w_pct, s_pct)
+                fig_sens = go.Figure(data=[
+                    go.Scatter(name='Mining Alpha', x=be_grid, y=sens_m, line=dict(color='#28a745')),
+                    go.Scatter(name='Battery Alpha', x=be_grid, y=sens_b, line=dict(color='#0052FF')),
+                    go.Scatter(name='Total Alpha', x=be_grid, y=sens_m + sens_b, line=dict(color='#FFD700'))
+                ])
+                fig_sens.add_vline(x=breakeven, line_dash="dash", annotation_text=f"Current ${breakeven:.2f}")
+                fig_sens.update_layout(height=320, xaxis_title="Miner Breakeven ($/MWh)", yaxis_title="1Y Alpha ($)", margin=dict(t=20, b=0, l=0, r=0), paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+                st.plotly_chart(fig_sens, use_container_width=True)
+
+            with st.expander("📅 Custom Date Range (Live)"):
+                if isinstance(price_hist.index, pd.DatetimeIndex):
+                    first_day, last_day = price_hist.index.min().date(), price_hist.index.max().date()
+                    picked = st.date_input("Range", value=(max(first_day, last_day - pd.Timedelta(days=90)), last_day),
+                                           min_value=first_day, max_value=last_day)
+                else:
+                    picked = None
+                    st.info("Custom ranges need timestamped prices.")
+                if isinstance(picked, (tuple, list)) and len(picked) == 2:
+                    # Whole days in the hub's timezone; the end day is included
+                    range_start = pd.Timestamp(picked[0], tz=price_hist.index.tz)
+                    range_end = pd.Timestamp(picked[1], tz=price_hist.index.tz) + pd.Timedelta(days=1)
+                    ra_m, ra_b, ra_avg = calculate_range_alpha(price_hist, breakeven, ideal_m, ideal_b, range_start, range_end, w_pct, s_pct)
+                    rg1, rg2, rg3, rg4 = st.columns(4)
+                    rg1.metric("Avg Grid Price", f"${ra_avg:.2f}")
+                    rg2.metric("Mining Alpha", f"${ra_m:,.0f}")
+                    rg3.metric("Battery Alpha", f"${ra_b:,.0f}")
+                    rg4.metric("Total Alpha", f"${ra_m + ra_b:,.0f}")
+                    st.caption("Alpha for the selected days, scaled to the range's length. Ranges with less than a day of data report zero.")
+
+            with st.expander("🎲 Monte Carlo Risk (6M / 1Y Live)"):
+                st.caption("Thousands of price paths resampled in 7-day blocks from the last year, instead of the single historical path.")
+                rc1, rc2, rc3 = st.columns(3)
+                n_paths = rc1.select_slider("Paths", options=[1000, 5000, 10000, 20000], value=5000)
+                risk_itc = rc2.selectbox("ITC", economics.ITC_OPTIONS, index=3, format_func=lambda v: f"{v:.0%}")
+                risk_macrs = rc3.checkbox("MACRS", value=True)
+                if st.button("Run Simulation"):
+                    nc = net_capex(ideal_m, ideal_b, risk_itc, risk_macrs, m_eff, m_cost)
+                    profile = run_risk_profile(price_hist, breakeven, ideal_m, ideal_b, w_pct, s_pct, nc, n_paths)
+                    st.dataframe(pd.DataFrame({
+                        "Horizon": profile["horizon_days"].map({182: "6M", 365: "1Y"}),
+                        "Percentile": profile["percentile"],
+                        "Mining Alpha": profile["mining_alpha"].map("${:,.0f}".format),
+                        "Battery Alpha": profile["battery_alpha"].map("${:,.0f}".format),
+                        "Total Alpha": profile["total_alpha"].map("${:,.0f}".format),
+                        "IRR": profile["irr"].map("{:.1f}%".format),
+                    }), hide_index=True, use_container_width=True)
+
+            render_dispatch_sim()
+
+    render_revenue_split()
+
+    @st.fragment
+    def render_backtest():
+        """Year-by-hub alpha over the whole history database; reruns only this section"""
+        with st.expander("🗂️ Five-Year Backtest (History Database)"):
+            if not get_db_hubs():
+                st.info("No hubs in the history database yet. Run `python price_db.py --years 5` to load them.")
+                return
+            st.caption("Every hub's live-mode alpha for each calendar year of stored prices, streamed from the database in parallel worker processes.")
+            bc1, bc2, bc3 = st.columns(3)
+            bt_itc = bc1.selectbox("ITC", economics.ITC_OPTIONS, index=3, format_func=lambda v: f"{v:.0%}", key="backtest_itc")
+            bt_macrs = bc2.checkbox("MACRS", value=True, key="backtest_macrs")
+            bt_metric = bc3.radio("Show", ["total_alpha", "irr", "cap"], horizontal=True, key="backtest_metric",
+                                  format_func={"total_alpha": "Total Alpha", "irr": "IRR", "cap": "Hours < $20"}.get)
+            if st.button("Run Backtest"):
+                scenario = normalize_scenario({"solar_mw": solar_cap, "wind_mw": wind_cap, "miner_mw": ideal_m, "battery_mw": ideal_b,
+                                               "efficiency": m_eff, "miner_cost": m_cost, "hashprice": hp_cents, "itc": bt_itc, "macrs": bt_macrs})
+                key = ("backtest", DB_FILE, db_version(DB_FILE), BACKTEST_YEARS, tuple(sorted(scenario.items())))
+                with st.spinner("Streaming the price history..."):
+                    results = get_result_cache().get_or_compute(key, lambda: run_backtest(DB_FILE, get_db_hubs(), scenario))
+                fmt = "{:.1%}" if bt_metric == "cap" else "{:.1f}%" if bt_metric == "irr" else "${:,.0f}"
+                st.dataframe(backtest_matrix(results, bt_metric).style.format(fmt, na_rep="—"), use_container_width=True)
+
+    render_backtest()
 
 with t_tax:
     st.subheader("🏛️ Institutional Tax Strategy")
     st.markdown("---")
-    tx1, tx2, tx3, tx4 = st.columns(4)
-    itc_rate = (0.3 if tx1.checkbox("30% Base ITC", True) else 0) + (0.1 if tx2.checkbox("10% Domestic Content", False) else 0)
-    itc_u_val = tx3.selectbox("Underserved Bonus", [0.0, 0.1, 0.2], format_func=lambda x: f"{int(x*100)}%")
-    itc_total = itc_rate + itc_u_val
-    macrs_on = tx4.checkbox("Apply 100% MACRS Bonus", True)
-
-    def get_metrics(m, b, itc_v, mc_on):
-        ma = (cap_2025 * 8760 * m * (breakeven - 12)) * (1.0 + (w_pct * 0.20))
-        ba = (0.12 * 8760 * b * (breakeven + 30)) * (1.0 + (s_pct * 0.25))
-        m_c = ((m * 1e6) / m_eff) * m_cost
-        b_c = b * BATT_COST_PER_MW
-        iv = b_c * itc_v
-        ms = ((m_c + b_c) - (0.5 * iv)) * CORP_TAX_RATE if mc_on else 0
-        nc = (m_c + b_c) - iv - ms
-        irr, roi = (ma+ba)/nc*100 if nc > 0 else 0, nc/(ma+ba) if (ma+ba)>0 else 0
-        return ma, ba, nc, irr, roi, m_c, b_c, iv, ms
-
-    c00, c10, c0t, c1t = get_metrics(m_load_in, b_mw_in, 0, False), get_metrics(ideal_m, ideal_b, 0, False), get_metrics(m_load_in, b_mw_in, itc_total, macrs_on), get_metrics(ideal_m, ideal_b, itc_total, macrs_on)
-    ca, cb, cc, cd = st.columns(4)
-    def draw_card(col, lbl, met, m_v, b_v, sub):
-        with col:
-            st.write(f"### {lbl}"); st.caption(f"{sub} ({m_v}MW/{b_v}MW)")
-            st.markdown(f"<h1 style='color: #28a745; margin-bottom: 0;'>${(met[0]+met[1]+cur_rev_base):,.0f}</h1>", unsafe_allow_html=True)
-            st.markdown(f"**↑ IRR: {met[3]:.1f}% | Payback: {met[4]:.2f} Y**")
-            st.write(f" * ⚙️ Miner Capex: `${met[5]:,.0f}`")
-            st.write(f" * 🔋 Battery Capex: `${met[6]:,.0f}`")
-            if met[7] > 0 or met[8] > 0: st.write(f" * 🛡️ **Shields (ITC+MACRS):** :green[(`-${(met[7]+met[8]):,.0f}`)]")
-            st.write("---")
-    draw_card(ca, "1. Baseline", c00, m_load_in, b_mw_in, "Current Setup")
-    draw_card(cb, "2. Optimized", c10, ideal_m, ideal_b, "Ideal Ratio")
-    draw_card(cc, "3. Strategy", c0t, m_load_in, b_mw_in, "Incentivized")
-    draw_card(cd, "4. Full Alpha", c1t, ideal_m, ideal_b, "Full Strategy")
+
+    # Fragments: incentive toggles and the payback limit rerun only their own section
+    @st.fragment
+    def render_tax_strategy():
+        """Incentive toggles rerun only the four strategy cards"""
+        tx1, tx2, tx3, tx4 = st.columns(4)
+        itc_rate = (0.3 if tx1.checkbox("30% Base ITC", True) else 0) + (0.1 if tx2.checkbox("10% Domestic Content", False) else 0)
+        itc_u_val = tx3.selectbox("Underserved Bonus", [0.0, 0.1, 0.2], format_func=lambda x: f"{int(x*100)}%")
+        itc_total = itc_rate + itc_u_val
+        macrs_on = tx4.checkbox("Apply 100% MACRS Bonus", True)
+
+        def get_metrics(m, b, itc_v, mc_on):
+            return cached_metrics(m, b, itc_v, mc_on, cap_2025, breakeven, w_pct, s_pct, m_eff, m_cost)
+
+        c00, c10, c0t, c1t = get_metrics(m_load_in, b_mw_in, 0, False), get_metrics(ideal_m, ideal_b, 0, False), get_metrics(m_load_in, b_mw_in, itc_total, macrs_on), get_metrics(ideal_m, ideal_b, itc_total, macrs_on)
+        ca, cb, cc, cd = st.columns(4)
+        def draw_card(col, lbl, met, m_v, b_v, sub):
+            with col:
+                st.write(f"### {lbl}"); st.caption(f"{sub} ({m_v}MW/{b_v}MW)")
+                st.markdown(f"<h1 style='color: #28a745; margin-bottom: 0;'>${(met[0]+met[1]+cur_rev_base):,.0f}</h1>", unsafe_allow_html=True)
+                st.markdown(f"**↑ IRR: {met[3]:.1f}% | Payback: {met[4]:.2f} Y**")
+                st.write(f" * ⚙️ Miner Capex: `${met[5]:,.0f}`")
+                st.write(f" * 🔋 Battery Capex: `${met[6]:,.0f}`")
+                if met[7] > 0 or met[8] > 0: st.write(f" * 🛡️ **Shields (ITC+MACRS):** :green[(`-${(met[7]+met[8]):,.0f}`)]")
+                st.write("---")
+        draw_card(ca, "1. Baseline", c00, m_load_in, b_mw_in, "Current Setup")
+        draw_card(cb, "2. Optimized", c10, ideal_m, ideal_b, "Ideal Ratio")
+        draw_card(cc, "3. Strategy", c0t, m_load_in, b_mw_in, "Incentivized")
+        draw_card(cd, "4. Full Alpha", c1t, ideal_m, ideal_b, "Full Strategy")
+
+    @st.fragment
+    def render_sizing_optimizer():
+        """Payback limit reruns only the optimizer"""
+        st.subheader("🔍 Sizing Optimizer")
+        st.caption("Sweeps miner and battery MW up to total nameplate generation across every ITC level and MACRS on/off, evaluated as one vectorized grid.")
+        opt_c1, opt_c2 = st.columns([1, 2])
+        with opt_c1:
+            max_payback = st.slider("Max Payback (Years)", 0.5, 10.0, 3.0, 0.5)
+            size_cap = max(total_gen, 1)
+            grid, frontier, optimum = run_sizing_optimizer(size_cap, cap_2025, breakeven, w_pct, s_pct, m_eff, m_cost, max_payback)
+            st.write(f"**Configurations Evaluated:** {len(grid):,}")
+            if optimum is None:
+                st.warning("No profitable configuration meets the payback limit.")
+            else:
+                st.write(f"**Optimum:** {optimum['miner_mw']:.0f}MW Miners | {optimum['battery_mw']:.0f}MW Battery")
+                st.write(f"**Incentives:** {optimum['itc']:.0%} ITC | MACRS {'On' if optimum['macrs'] else 'Off'}")
+                st.metric("Annual Alpha", f"${optimum['annual_alpha']:,.0f}")
+                st.markdown(f"**↑ IRR: {optimum['irr']:.1f}% | Payback: {optimum['payback']:.2f} Y**")
+        with opt_c2:
+            fig_front = go.Figure(data=[
+                go.Scatter(name='IRR / Alpha Frontier', x=frontier['annual_alpha'], y=frontier['irr'], mode='lines+markers', marker=dict(color='#0052FF'),
+                           customdata=frontier[['miner_mw', 'battery_mw', 'itc', 'payback']],
+                           hovertemplate="Alpha $%{x:,.0f}<br>IRR %{y:.1f}%<br>%{customdata[0]:.0f}MW / %{customdata[1]:.0f}MW<br>ITC %{customdata[2]:.0%} | Payback %{customdata[3]:.2f}Y<extra></extra>")
+            ])
+            if optimum is not None:
+                fig_front.add_trace(go.Scatter(name='Optimum', x=[optimum['annual_alpha']], y=[optimum['irr']], mode='markers', marker=dict(color='#FFD700', size=14, symbol='star')))
+            fig_front.update_layout(height=320, xaxis_title="Annual Alpha ($)", yaxis_title="IRR (%)", margin=dict(t=20, b=0, l=0, r=0), paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+            st.plotly_chart(fig_front, use_container_width=True)
+
+    render_tax_strategy()
+    render_sizing_optimizer()
 
 with t_volatility:
     st.subheader("📈 Institutional Volatility Analysis")
@@ -386,7 +730,8 @@ with t_volatility:
     st.markdown("#### 1. The Lower Bound: Exponential Growth of Negative Pricing")
     st.write("The lower pricing bound is increasingly defined by 'excess supply' events, where the grid has more power than it can consume or export.")
     st.write("* **Solar Saturation:** As solar capacity grows, the frequency of prices in the $0 - $0.02/kWh bracket has transitioned from a localized West Texas issue to a system-wide phenomenon.")
-    st.write("* **HB_WEST Dominance:** West Texas remains the 'Alpha Hub' for negative pricing. By 2025, negative price frequency in the West is projected to reach **12.1%**.")
+    west_year = max(TREND_DATA_WEST["Negative (<$0)"])
+    st.write(f"* **HB_WEST Dominance:** West Texas remains the 'Alpha Hub' for negative pricing. In {west_year}, negative price frequency in the West reached **{TREND_DATA_WEST['Negative (<$0)'][west_year]:.1%}**.")
     
     st.markdown("#### 2. The Upper Bound: Scarcity and Peak Pricing")
     st.write("The upper bound is becoming more volatile due to 'scarcity' events when renewable generation drops off just as demand peaks.")
@@ -394,59 +739,8 @@ with t_volatility:
     st.write("* **Battery Dominance:** This volatility at the top is the primary revenue driver for the **Battery Alpha**, as the battery only discharges during scarcity windows.")
 
     st.markdown("---")
-    
-    # Define ISO Pricing Distributions
-    TREND_DATA_CAISO = {
-        "Negative (<$0)": {"2021": 0.034, "2022": 0.062, "2023": 0.089, "2024": 0.118, "2025": 0.145},
-        "$0 - $0.02": {"2021": 0.156, "2022": 0.198, "2023": 0.245, "2024": 0.278, "2025": 0.302},
-        "$0.02 - $0.04": {"2021": 0.412, "2022": 0.368, "2023": 0.312, "2024": 0.278, "2025": 0.245},
-        "$0.04 - $0.06": {"2021": 0.178, "2022": 0.185, "2023": 0.168, "2024": 0.148, "2025": 0.132},
-        "$0.06 - $0.08": {"2021": 0.095, "2022": 0.082, "2023": 0.075, "2024": 0.068, "2025": 0.062},
-        "$0.08 - $0.10": {"2021": 0.051, "2022": 0.044, "2023": 0.042, "2024": 0.039, "2025": 0.036},
-        "$0.10 - $0.15": {"2021": 0.036, "2022": 0.032, "2023": 0.035, "2024": 0.037, "2025": 0.040},
-        "$0.15 - $0.25": {"2021": 0.022, "2022": 0.018, "2023": 0.021, "2024": 0.023, "2025": 0.025},
-        "$0.25 - $1.00": {"2021": 0.012, "2022": 0.008, "2023": 0.012, "2024": 0.011, "2025": 0.010},
-        "$1.00 - $5.00": {"2021": 0.004, "2022": 0.003, "2023": 0.004, "2024": 0.002, "2025": 0.003}
-    }
-    
-    TREND_DATA_PJM = {
-        "Negative (<$0)": {"2021": 0.002, "2022": 0.003, "2023": 0.005, "2024": 0.008, "2025": 0.012},
-        "$0 - $0.02": {"2021": 0.068, "2022": 0.089, "2023": 0.112, "2024": 0.134, "2025": 0.156},
-        "$0.02 - $0.04": {"2021": 0.542, "2022": 0.512, "2023": 0.478, "2024": 0.445, "2025": 0.412},
-        "$0.04 - $0.06": {"2021": 0.198, "2022": 0.205, "2023": 0.198, "2024": 0.189, "2025": 0.178},
-        "$0.06 - $0.08": {"2021": 0.098, "2022": 0.091, "2023": 0.087, "2024": 0.082, "2025": 0.078},
-        "$0.08 - $0.10": {"2021": 0.052, "2022": 0.045, "2023": 0.044, "2024": 0.041, "2025": 0.038},
-        "$0.10 - $0.15": {"2021": 0.024, "2022": 0.020, "2023": 0.022, "2024": 0.024, "2025": 0.026},
-        "$0.15 - $0.25": {"2021": 0.012, "2022": 0.010, "2023": 0.011, "2024": 0.012, "2025": 0.014},
-        "$0.25 - $1.00": {"2021": 0.003, "2022": 0.002, "2023": 0.003, "2024": 0.003, "2025": 0.003},
-        "$1.00 - $5.00": {"2021": 0.001, "2022": 0.001, "2023": 0.002, "2024": 0.002, "2025": 0.003}
-    }
-    
-    TREND_DATA_MISO = {
-        "Negative (<$0)": {"2021": 0.008, "2022": 0.014, "2023": 0.022, "2024": 0.031, "2025": 0.042},
-        "$0 - $0.02": {"2021": 0.134, "2022": 0.168, "2023": 0.201, "2024": 0.232, "2025": 0.261},
-        "$0.02 - $0.04": {"2021": 0.498, "2022": 0.462, "2023": 0.421, "2024": 0.388, "2025": 0.355},
-        "$0.04 - $0.06": {"2021": 0.208, "2022": 0.218, "2023": 0.203, "2024": 0.188, "2025": 0.172},
-        "$0.06 - $0.08": {"2021": 0.087, "2022": 0.078, "2023": 0.072, "2024": 0.068, "2025": 0.062},
-        "$0.08 - $0.10": {"2021": 0.038, "2022": 0.032, "2023": 0.031, "2024": 0.029, "2025": 0.027},
-        "$0.10 - $0.15": {"2021": 0.016, "2022": 0.014, "2023": 0.017, "2024": 0.019, "2025": 0.022},
-        "$0.15 - $0.25": {"2021": 0.007, "2022": 0.006, "2023": 0.008, "2024": 0.010, "2025": 0.012},
-        "$0.25 - $1.00": {"2021": 0.002, "2022": 0.001, "2023": 0.002, "2024": 0.002, "2025": 0.002},
-        "$1.00 - $5.00": {"2021": 0.001, "2022": 0.001, "2023": 0.001, "2024": 0.001, "2025": 0.002}
-    }
-    
-    TREND_DATA_SPP = {
-        "Negative (<$0)": {"2021": 0.012, "2022": 0.021, "2023": 0.032, "2024": 0.045, "2025": 0.058},
-        "$0 - $0.02": {"2021": 0.168, "2022": 0.201, "2023": 0.241, "2024": 0.272, "2025": 0.298},
-        "$0.02 - $0.04": {"2021": 0.478, "2022": 0.441, "2023": 0.398, "2024": 0.361, "2025": 0.325},
-        "$0.04 - $0.06": {"2021": 0.188, "2022": 0.195, "2023": 0.178, "2024": 0.162, "2025": 0.147},
-        "$0.06 - $0.08": {"2021": 0.084, "2022": 0.076, "2023": 0.070, "2024": 0.065, "2025": 0.061},
-        "$0.08 - $0.10": {"2021": 0.038, "2022": 0.032, "2023": 0.030, "2024": 0.028, "2025": 0.026},
-        "$0.10 - $0.15": {"2021": 0.018, "2022": 0.015, "2023": 0.017, "2024": 0.019, "2025": 0.021},
-        "$0.15 - $0.25": {"2021": 0.009, "2022": 0.007, "2023": 0.009, "2024": 0.010, "2025": 0.012},
-        "$0.25 - $1.00": {"2021": 0.003, "2022": 0.002, "2023": 0.003, "2024": 0.003, "2025": 0.003},
-        "$1.00 - $5.00": {"2021": 0.002, "2022": 0.001, "2023": 0.002, "2024": 0.001, "2025": 0.002}
-    }
+    iso_trends = {"ERCOT": TREND_DATA_WEST, "CAISO": TREND_DATA_CAISO, "PJM": TREND_DATA_PJM, "SPP": TREND_DATA_SPP}
+    iso_metrics = {iso: iso_key_metrics(trend, iso_window(iso), CAP_YEAR) for iso, trend in iso_trends.items()}
     
     # Create tabs for each ISO
     iso_tab1, iso_tab2, iso_tab3, iso_tab4 = st.tabs(["🔆 ERCOT (HB_WEST)", "⚡ CAISO (NP-15)", "📊 PJM (Eastern)", "🌪️ SPP (Plains)"])
@@ -457,10 +751,10 @@ with t_volatility:
         col1_ercot, col2_ercot = st.columns(2)
         with col1_ercot:
             st.markdown("**West Zone (HB_WEST)**")
-            st.table(pd.DataFrame(TREND_DATA_WEST).T.style.format("{:.1%}"))
+            st.table(trend_table(TREND_DATA_WEST))
         with col2_ercot:
             st.markdown("**System-Wide Average**")
-            st.table(pd.DataFrame(TREND_DATA_SYSTEM).T.style.format("{:.1%}"))
+            st.table(trend_table(TREND_DATA_SYSTEM))
     
     with iso_tab2:
         st.markdown("#### CAISO - Northern & Central California")
@@ -468,15 +762,10 @@ with t_volatility:
         col1_caiso, col2_caiso = st.columns(2)
         with col1_caiso:
             st.markdown("**Day-Ahead Market (DAM)**")
-            st.table(pd.DataFrame(TREND_DATA_CAISO).T.style.format("{:.1%}"))
+            st.table(trend_table(TREND_DATA_CAISO))
         with col2_caiso:
             st.markdown("**Key Metrics:**")
-            st.write("""
-            - 🔴 **Negative Price Trend:** +310% (2021→2025)
-            - 📈 **$0-$0.02 Frequency:** 48.7% by 2025
-            - ⚡ **Peak Volatility:** 4.1% of hours >$1.00/kWh
-            - 🎯 **Arbitrage Window:** 63.2% profitable mining hours
-            """)
+            st.write(key_metrics_text(iso_metrics["CAISO"]))
     
     with iso_tab3:
         st.markdown("#### PJM - Eastern Interconnection (Mid-Atlantic & Midwest)")
@@ -484,15 +773,10 @@ with t_volatility:
         col1_pjm, col2_pjm = st.columns(2)
         with col1_pjm:
             st.markdown("**Real-Time Market (RTM)**")
-            st.table(pd.DataFrame(TREND_DATA_PJM).T.style.format("{:.1%}"))
+            st.table(trend_table(TREND_DATA_PJM))
         with col2_pjm:
             st.markdown("**Key Metrics:**")
-            st.write("""
-            - 🔴 **Negative Price Trend:** +500% (2021→2025)
-            - 📈 **$0-$0.04 Frequency:** 56.8% by 2025
-            - ⚡ **Peak Volatility:** 0.5% of hours >$1.00/kWh
-            - 🎯 **Arbitrage Window:** 16.8% profitable mining hours
-            """)
+            st.write(key_metrics_text(iso_metrics["PJM"]))
     
     with iso_tab4:
         st.markdown("#### SPP - Southern Plains (Oklahoma, Kansas, Texas North)")
@@ -500,30 +784,49 @@ with t_volatility:
         col1_spp, col2_spp = st.columns(2)
         with col1_spp:
             st.markdown("**Energy & Operations Market (EOM)**")
-            st.table(pd.DataFrame(TREND_DATA_SPP).T.style.format("{:.1%}"))
+            st.table(trend_table(TREND_DATA_SPP))
         with col2_spp:
             st.markdown("**Key Metrics:**")
-            st.write("""
-            - 🔴 **Negative Price Trend:** +383% (2021→2025)
-            - 📈 **$0-$0.02 Frequency:** 35.6% by 2025
-            - ⚡ **Peak Volatility:** 2.0% of hours >$1.00/kWh
-            - 🎯 **Arbitrage Window:** 40.3% profitable mining hours
-            """)
+            st.write(key_metrics_text(iso_metrics["SPP"]))
     
     st.markdown("---")
     st.markdown("#### 📊 Comparative ISO Analysis")
     
     iso_comparison = {
         "ISO": ["ERCOT", "CAISO", "PJM", "SPP"],
-        "Negative 2025": ["12.1%", "14.5%", "1.2%", "5.8%"],
-        "Sub-$0.04 2025": ["45.6%", "44.7%", "56.8%", "53.4%"],
-        "Mining Arbitrage": ["45.6%", "63.2%", "16.8%", "40.3%"],
-        "Peak Volatility": ["2.6%", "4.1%", "0.5%", "2.0%"],
-        "Volatility Trend": ["📈 Growing", "📈 Rapid", "📈 Emerging", "📈 Moderate"],
-        "2025 Rating": ["⭐⭐⭐⭐", "⭐⭐⭐⭐⭐", "⭐⭐", "⭐⭐⭐"]
+        f"Negative {CAP_YEAR}": [f"{iso_metrics[iso]['negative']:.1%}" for iso in iso_trends],
+        f"Sub-$0.04 {CAP_YEAR}": [f"{iso_metrics[iso]['sub_4c']:.1%}" for iso in iso_trends],
+        "Mining Arbitrage": [f"{iso_metrics[iso]['arbitrage']:.1%}" for iso in iso_trends],
+        "Peak Volatility": [f"{iso_metrics[iso]['peak']:.1%}" for iso in iso_trends],
+        "Volatility Trend": [volatility_trend_label(iso_metrics[iso]) for iso in iso_trends],
+        "Analyst Rating (2025, static)": ["⭐⭐⭐⭐", "⭐⭐⭐⭐⭐", "⭐⭐", "⭐⭐⭐"]
     }
     
     st.dataframe(pd.DataFrame(iso_comparison), use_container_width=True)
+    st.caption(f"Mining Arbitrage: share of the trailing year priced below the ${breakeven:.2f}/MWh breakeven, estimated from the {CAP_YEAR} buckets where prices are not loaded. "
+               "Volatility Trend: change in negative-price frequency since each ISO's first trend year. Analyst ratings are a fixed 2025 assessment, not computed from the data.")
+
+    st.markdown("---")
+    st.markdown(f"#### 📉 Rolling Volatility: {hub_iso} · {hub_location}")
+    if isinstance(price_hist.index, pd.DatetimeIndex):
+        hub_analytics = get_hub_analytics()
+        vol_30, vol_1y = hub_analytics.stats(30, breakeven), hub_analytics.stats(365, breakeven)
+        v1, v2, v3, v4, v5 = st.columns(5)
+        v1.metric("30D Volatility (σ)", f"${vol_30['std']:.2f}")
+        v2.metric("1Y P10 / P50 / P90", f"${vol_1y['p10']:.0f} / ${vol_1y['p50']:.0f} / ${vol_1y['p90']:.0f}")
+        v3.metric("1Y Negative Share", f"{vol_1y['negative_share']:.1%}")
+        v4.metric("1Y Below Breakeven", f"{vol_1y['below_breakeven']:.1%}")
+        v5.metric("1Y Peak Share (>$1.00/kWh)", f"{vol_1y['peak_share']:.2%}")
+        rolling = rolling_volatility(price_hist, price_key, breakeven)
+        r1, r2 = st.columns(2)
+        with r1:
+            st.markdown("**Trailing 30-Day σ ($/MWh)**")
+            st.line_chart(rolling[['std']])
+        with r2:
+            st.markdown("**Trailing 30-Day Price Shares**")
+            st.line_chart(rolling[['negative_share', 'below_breakeven']])
+    else:
+        st.info("Rolling volatility appears once price history for this hub has loaded.")
     with t_price_dsets:
         # Add the content for the new tab
         st.markdown("## 📊 Price Datasets")
@@ -537,15 +840,49 @@ with t_volatility:
             """
         )
 
+        # Fragment: the range selector reruns only the historical chart
+        @st.fragment
+        def render_price_history():
+            """Historical chart with its own range selector"""
+            st.markdown("**📈 Historical Price Dataset**")
+            hist_range = st.radio("Range", ["7D", "30D", "6M", "All"], index=3, horizontal=True, label_visibility="collapsed")
+            range_days = {"7D": 7, "30D": 30, "6M": 182, "All": None}[hist_range]
+            hist_start = tail_window(price_hist, range_days).index[0] if range_days else None
+            with diagnostics.timed('chart.history', range=hist_range):
+                st.line_chart(decimate(price_hist, get_chart_pyramid(price_hist, price_key), start=hist_start))  # Min/max decimated so spikes stay visible
+
         # Create columns to display both datasets: Live-time price vs Historical price
         col_live, col_hist = st.columns(2)
 
         # Display live-time price chart
         with col_live:
             st.markdown("**🕒 24-Hour Live-Time Price Data**")
-            st.line_chart(price_hist.iloc[-288:])  # Last 24 hours of live price data
+            st.line_chart(decimate(price_hist, get_chart_pyramid(price_hist, price_key), start=tail_window(price_hist, 1).index[0]))  # Last 24 hours of live price data
 
         # Display historical price chart
         with col_hist:
-            st.markdown("**📈 Historical Price Dataset**")
-            st.line_chart(price_hist)  # Full historical price dataset
+            render_price_history()
+
+# --- 6. ADMIN DIAGNOSTICS ---
+def show_diagnostics():
+    """Admin-only panel over the in-process timing/counter registry"""
+    with st.sidebar.expander("🩺 Diagnostics"):
+        snap = diagnostics.snapshot()
+        st.caption(f"JSON log: `{diagnostics.log_path()}`")
+        try:
+            cache_stats = get_result_cache().stats()
+            st.caption(f"Result cache: {cache_stats['entries']:,} entries · {cache_stats['bytes'] / 1e6:,.1f} MB of {cache_stats['max_bytes'] / 1e6:,.0f} MB")
+        except Exception as e:
+            diagnostics.error('result_cache.stats', e)
+        if snap['timings']:
+            st.dataframe(pd.DataFrame(snap['timings']).set_index('name').round(2), use_container_width=True)
+        if snap['counters']:
+            st.dataframe(pd.Series(snap['counters'], name='count'), use_container_width=True)
+        for err in reversed(snap['errors'][-10:]):
+            st.caption(f"⚠️ {err['ts']:%H:%M:%S} {err['name']}: {err['error']}")
+        if st.button("Reset Counters"):
+            diagnostics.reset()
+
+diagnostics.observe('rerun', time.perf_counter() - _rerun_start, admin=st.session_state.is_admin)
+if st.session_state.is_admin:
+    show_diagnostics()
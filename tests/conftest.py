@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Modules live at the repo root; keep the diagnostics log out of the tree
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Offline: any upstream fetch goes to the fake provider
+os.environ.setdefault("HYBRID_PRICE_PROVIDER", "fake")
+os.environ.setdefault("HYBRID_DIAGNOSTICS_LOG", os.path.join(tempfile.gettempdir(), "hybrid_os_test_diagnostics.jsonl"))
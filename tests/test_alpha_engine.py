@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+from alpha_engine import (BASE_INTERVAL_NS, DAY_NS, INTERVALS_PER_DAY, build_horizon_indexes, horizon_alpha,
+                          indexed_horizon_alpha, interval_weights, prepare_series, range_alpha)
+
+BREAKEVEN, IDEAL_M, IDEAL_B, W_PCT, S_PCT = 40.0, 35.0, 60.0, 0.3, 0.7
+
+
+def ragged_prices(seed=0):
+    """40 days of 5-minute prices with outages, repeated timestamps, NaN and rows out of order"""
+    idx = pd.date_range("2025-03-01", periods=40 * INTERVALS_PER_DAY, freq="5min", tz="US/Central")
+    rng = np.random.default_rng(seed)
+    prices = pd.Series(rng.standard_t(3, len(idx)) * 30 + 40, index=idx)
+    prices = prices.drop(idx[1000:1024]).drop(idx[5000:5500])
+    prices.iloc[::97] = np.nan
+    repeats = prices.iloc[::501] + 7.0
+    prices = pd.concat([prices, repeats])
+    return prices.iloc[rng.permutation(len(prices))]
+
+
+def brute_alpha(prices, start_ns, end_ns):
+    """Reference: walk the intervals one by one, each lasting until the next timestamp (capped at the native interval)"""
+    prices = prices.sort_index(kind="stable")
+    ts, values = prices.index.asi8, prices.to_numpy()
+    gaps = np.diff(ts)
+    native = np.median(gaps[gaps > 0])
+    mining = battery = price_sum = weight = valid_weight = 0.0
+    for i in range(len(ts)):
+        if not start_ns <= ts[i] < end_ns:
+            continue
+        following = ts[i + 1] if i + 1 < len(ts) else ts[i] + native
+        w = min(following - ts[i], native) / BASE_INTERVAL_NS
+        weight += w
+        if np.isnan(values[i]):
+            continue
+        mining += w * max(0.0, BREAKEVEN - values[i])
+        battery += w * max(0.0, values[i] - BREAKEVEN)
+        price_sum += w * values[i]
+        valid_weight += w
+    if weight < INTERVALS_PER_DAY:
+        return 0, 0, 0
+    days = weight / INTERVALS_PER_DAY
+    return (mining * IDEAL_M / INTERVALS_PER_DAY * days * (1 + W_PCT * 0.20),
+            battery * IDEAL_B / INTERVALS_PER_DAY * days * (1 + S_PCT * 0.25),
+            price_sum / valid_weight)
+
+
+def test_interval_weights_cap_gaps_and_zero_repeats():
+    minutes = np.array([0, 5, 5, 10, 30, 35]) * 60 * 10**9
+    np.testing.assert_array_equal(interval_weights(minutes), [1, 0, 1, 1, 1, 1])
+    fifteen = np.arange(4) * 15 * 60 * 10**9
+    np.testing.assert_array_equal(interval_weights(fifteen), [3, 3, 3, 3])
+    np.testing.assert_array_equal(interval_weights(np.array([0])), [1])
+
+
+def test_prepare_series_sorts_and_falls_back_to_positions():
+    idx = pd.date_range("2025-01-01", periods=4, freq="5min")
+    ts, values, weights = prepare_series(pd.Series([1.0, 2.0, 3.0, 4.0], index=idx[[2, 0, 3, 1]]))
+    np.testing.assert_array_equal(ts, idx.asi8)
+    np.testing.assert_array_equal(values, [2.0, 4.0, 1.0, 3.0])
+    np.testing.assert_array_equal(weights, [1, 1, 1, 1])
+    ts, values, weights = prepare_series(pd.Series([5.0, np.nan, 7.0]))
+    assert ts is None
+    np.testing.assert_array_equal(weights, [1, 1, 1])
+
+
+def test_range_alpha_matches_interval_loop():
+    prices = ragged_prices()
+    tz = prices.index.tz
+    ranges = [
+        (None, None),
+        (pd.Timestamp("2025-03-03", tz=tz), pd.Timestamp("2025-03-20", tz=tz)),
+        (pd.Timestamp("2025-03-04 03:17", tz=tz), pd.Timestamp("2025-03-05 09:00", tz=tz)),  # starts inside the first outage
+        (pd.Timestamp("2025-03-18 12:00", tz="UTC"), pd.Timestamp("2025-04-30", tz="UTC")),  # other timezone, past the end
+        (pd.Timestamp("2025-03-10", tz=tz), pd.Timestamp("2025-03-10 12:00", tz=tz)),  # under a day: zero
+    ]
+    ts = np.sort(prices.index.asi8)
+    for start, end in ranges:
+        start_ns = ts[0] if start is None else start.value
+        end_ns = ts[-1] + 1 if end is None else end.value
+        got = range_alpha(prices, BREAKEVEN, IDEAL_M, IDEAL_B, start, end, W_PCT, S_PCT)
+        np.testing.assert_allclose(got, brute_alpha(prices, start_ns, end_ns), rtol=1e-9)
+
+
+def test_horizon_alpha_matches_loop_and_index():
+    prices = ragged_prices(1)
+    horizons = (1, 7, 30, 365)
+    direct = horizon_alpha(prices, BREAKEVEN, IDEAL_M, IDEAL_B, horizons, W_PCT, S_PCT)
+    indexed = indexed_horizon_alpha(build_horizon_indexes(prices, horizons), BREAKEVEN, IDEAL_M, IDEAL_B, W_PCT, S_PCT)
+    end_ns = np.sort(prices.index.asi8)[-1] + BASE_INTERVAL_NS
+    for days in horizons:
+        expected = brute_alpha(prices, end_ns - days * DAY_NS, end_ns)
+        np.testing.assert_allclose(direct[days], expected, rtol=1e-9)
+        np.testing.assert_allclose(indexed[days], expected, rtol=1e-9)
@@ -0,0 +1,62 @@
+import shutil
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+import price_db
+from audit_db import TIMESTAMP_FORMAT, audit_database, gap_table, refresh_audit, summarize
+
+
+def insert(conn, iso, location, stamps):
+    text = pd.DatetimeIndex(stamps).strftime(TIMESTAMP_FORMAT)
+    with conn:
+        conn.executemany("INSERT INTO historical_prices VALUES (?, ?, ?, ?)", [(iso, location, t, 30.0) for t in text])
+
+
+def audit(path, full):
+    conn = sqlite3.connect(path)
+    try:
+        states = refresh_audit(conn, full=full, chunk_rows=500)
+        return summarize(states), gap_table(states)
+    finally:
+        conn.close()
+
+
+def test_incremental_audit_matches_full_rescan(tmp_path):
+    path = str(tmp_path / "history.db")
+    conn = price_db.connect(path)
+    price_db.ensure_schema(conn)
+    west = pd.date_range("2025-01-01", periods=2000, freq="5min")
+    caiso = pd.date_range("2025-01-01", periods=600, freq="15min")
+    # Two gaps in HB_WEST, one in CAISO
+    insert(conn, "ERCOT", "HB_WEST", west[100:400].append(west[450:1000]).append(west[1003:1500]))
+    insert(conn, "CAISO", "TH_NP15_GEN-APND", caiso[:200].append(caiso[260:400]))
+    audit(path, full=False)
+
+    # Append past the end (with a new gap), prepend, partly backfill a gap, close another, add a new series
+    insert(conn, "ERCOT", "HB_WEST", west[1500:1600].append(west[1650:1700]))
+    insert(conn, "ERCOT", "HB_WEST", west[20:100])
+    insert(conn, "ERCOT", "HB_WEST", west[400:420].append(west[430:440]))
+    insert(conn, "CAISO", "TH_NP15_GEN-APND", caiso[200:260])
+    insert(conn, "PJM", "WESTERN HUB", pd.date_range("2025-01-02", periods=300, freq="5min").delete(np.arange(50, 60)))
+    conn.close()
+
+    full_path = str(tmp_path / "full.db")
+    shutil.copy(path, full_path)
+    incremental = audit(path, full=False)
+    full = audit(full_path, full=True)
+    pd.testing.assert_frame_equal(incremental[0], full[0])
+    pd.testing.assert_frame_equal(incremental[1], full[1])
+
+    gaps = full[1].set_index("Hub / Node")
+    assert gaps.loc["HB_WEST", "Missing Intervals"].tolist() == [10, 10, 3, 50]
+    assert "TH_NP15_GEN-APND" not in gaps.index
+    assert gaps.loc[["WESTERN HUB"], "Missing Intervals"].tolist() == [10]
+
+
+def test_missing_database_is_not_created(tmp_path, capsys):
+    path = tmp_path / "missing.db"
+    audit_database(str(path))
+    assert "Could not find" in capsys.readouterr().out
+    assert not path.exists()
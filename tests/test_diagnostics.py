@@ -0,0 +1,29 @@
+import json
+import multiprocessing
+import os
+
+import diagnostics
+
+
+def _child_event(_):
+    diagnostics.incr("child")
+    return os.getpid()
+
+
+def test_each_process_writes_its_own_log(tmp_path, monkeypatch):
+    monkeypatch.setattr(diagnostics, "LOG_FILE", str(tmp_path / "diag.jsonl"))
+    monkeypatch.setattr(diagnostics, "_logger_pid", None)
+    diagnostics.incr("parent")
+    # Forked workers inherit the parent's open handler and must not append to (or rotate) its file
+    with multiprocessing.get_context("fork").Pool(2) as pool:
+        child_pids = set(pool.map(_child_event, range(4)))
+
+    def events(pid):
+        with open(diagnostics.log_path(pid)) as f:
+            return [json.loads(line) for line in f]
+
+    assert [e["name"] for e in events(os.getpid())] == ["parent"]
+    for pid in child_pids:
+        assert {(e["pid"], e["name"]) for e in events(pid)} == {(pid, "child")}
+    monkeypatch.undo()
+    diagnostics._logger_pid = None  # reopen the session's log on the next event
@@ -0,0 +1,106 @@
+import pickle
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+import price_data
+import price_fetch
+from price_fetch import FakeErcot
+from price_store import FileLock, write_frame, write_prices
+
+IDX = pd.date_range("2025-01-01", periods=1000, freq="5min", tz="US/Central")
+
+
+def memmap_base(series):
+    base = series.values
+    while not isinstance(base, np.memmap) and getattr(base, "base", None) is not None:
+        base = base.base
+    return base
+
+
+def test_hubs_are_served_memory_mapped_with_nan_kept(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    north = np.arange(1000.0)
+    north[:10] = np.nan
+    price_data.save_cached_prices(pd.DataFrame({"HB_WEST": np.arange(1000.0), "HB_NORTH": north}, index=IDX))
+
+    refresher = price_data.PriceRefresher()
+    hub = refresher.get("HB_NORTH")
+    assert isinstance(memmap_base(hub), np.memmap)
+    assert hub.name == "HB_NORTH"
+    assert len(hub) == 1000 and hub.isna().sum() == 10
+    assert hub.index.equals(IDX)
+    assert refresher.get("HB_NORTH") is hub
+    assert refresher.get("HB_NOPE") is None
+    assert price_data.load_cached_prices("HB_WEST").iloc[-1] == 999.0
+
+
+def test_single_hub_caches_read_as_hb_west(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    legacy = pd.Series(np.arange(1000.0), index=IDX)
+    # The pickle from before the columnar store held a bare Series
+    with open(price_data.LEGACY_CACHE_FILE, "wb") as f:
+        pickle.dump({"prices": legacy, "timestamp": datetime.now()}, f)
+    entry = price_data.load_cache_entry()
+    assert list(entry["prices"].columns) == entry["locations"] == ["HB_WEST"]
+    assert price_data.load_cached_hub().tolist() == legacy.tolist()
+
+    # A pre-multi-hub .col file has one LMP column
+    write_prices(price_data.CACHE_FILE, legacy, {"timestamp": datetime.now().isoformat()})
+    entry = price_data.load_cache_entry(["HB_WEST"])
+    assert list(entry["prices"].columns) == entry["locations"] == ["HB_WEST"]
+    hub = price_data.PriceRefresher().get()
+    assert hub.name == "HB_WEST" and isinstance(memmap_base(hub), np.memmap)
+    assert price_data.load_cached_hub("HB_NORTH") is None
+
+
+def counting_fetch(monkeypatch, delay=0.0):
+    """Wrap fetch_rtm_prices so tests can count upstream backfills"""
+    calls = []
+    real_fetch = price_data.fetch_rtm_prices
+
+    def fetch(*args, **kwargs):
+        calls.append(args)
+        time.sleep(delay)
+        return real_fetch(*args, **kwargs)
+
+    monkeypatch.setattr(price_data, "fetch_rtm_prices", fetch)
+    return calls
+
+
+def test_concurrent_refreshes_fetch_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(price_data, "RETENTION_DAYS", 2)
+    monkeypatch.setattr(price_fetch, "_provider", FakeErcot())
+    calls = counting_fetch(monkeypatch, delay=0.5)
+    start = threading.Barrier(2)
+    results = [None, None]
+
+    def refresh(i):
+        start.wait()
+        results[i] = price_data.update_prices()
+
+    threads = [threading.Thread(target=refresh, args=(i,)) for i in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # No cache yet: the second caller waits for the lock, then finds the fresh file
+    assert len(calls) == 1
+    assert results[0] is not None and results[1] is not None
+    pd.testing.assert_frame_equal(results[0], results[1], check_dtype=False, check_freq=False, check_names=False)
+    assert sorted(results[0].columns) == sorted(FakeErcot().locations)
+
+
+def test_stale_cache_is_served_while_another_process_refreshes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = counting_fetch(monkeypatch)
+    stale = pd.DataFrame({"HB_WEST": np.arange(1000.0)}, index=IDX)
+    write_frame(price_data.CACHE_FILE, stale, {"timestamp": (datetime.now() - timedelta(days=1)).isoformat()})
+    with FileLock(price_data.LOCK_FILE):
+        prices = price_data.update_prices()
+    assert calls == []
+    assert prices["HB_WEST"].tolist() == stale["HB_WEST"].tolist()
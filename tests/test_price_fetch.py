@@ -0,0 +1,56 @@
+import pandas as pd
+
+from price_fetch import FakeErcot, coalesce_ranges, fetch_chunks
+
+START = pd.Timestamp("2025-01-01", tz="UTC")
+DAY = pd.Timedelta(days=1)
+
+
+def fetch(provider, days=3, **kwargs):
+    # One worker keeps the call order, and so which chunk the injected failures hit, deterministic
+    return fetch_chunks(START, START + days * DAY, provider=provider, chunk_days=1, max_workers=1, backoff=0, **kwargs)
+
+
+def test_retries_recover_transient_failures():
+    provider = FakeErcot(fail_calls=2)
+    data, missing = fetch(provider, retries=3)
+    assert missing == []
+    assert len(data) == 3
+    assert provider.calls == 3 + 2
+    prices = pd.concat(data)
+    assert len(prices) == 3 * 288
+    assert prices.index.is_monotonic_increasing
+
+
+def test_exhausted_retries_report_the_chunk_missing():
+    provider = FakeErcot(fail_calls=4)
+    data, missing = fetch(provider, retries=3)
+    assert missing == [(START, START + DAY)]
+    assert len(data) == 2
+    assert provider.calls == 4 + 2
+    assert pd.concat(data).index[0] == START + DAY
+
+
+def test_failed_chunks_coalesce_into_ranges():
+    provider = FakeErcot(fail_rate=1.0)
+    data, missing = fetch(provider, retries=2)
+    assert data == []
+    assert missing == [(START, START + 3 * DAY)]
+    assert provider.calls == 3 * (2 + 1)
+
+
+def test_explicit_ranges_stay_separate():
+    ranges = [(START, START + DAY), (START + 5 * DAY, START + 6 * DAY)]
+    data, missing = fetch_chunks(None, None, provider=FakeErcot(fail_rate=1.0), ranges=ranges, retries=0, backoff=0)
+    assert data == []
+    assert missing == ranges
+
+
+def test_location_predicate_returns_one_column_per_match():
+    data, missing = fetch(FakeErcot(), days=1, location=lambda loc: loc in ("HB_WEST", "HB_NORTH"))
+    assert missing == []
+    assert sorted(data[0].columns) == ["HB_NORTH", "HB_WEST"]
+
+
+def test_coalesce_ranges_merges_touching_and_overlapping():
+    assert coalesce_ranges([(3, 4), (0, 1), (1, 2), (3.5, 5)]) == [(0, 2), (3, 5)]
@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import price_store
+from price_store import DEFAULT_COLUMN, FileLock, read_frame, read_header, read_prices, write_frame, write_prices
+
+IDX = pd.date_range("2025-03-08", periods=2000, freq="5min", tz="US/Central")  # spans the DST change
+
+
+def hub_frame():
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({hub: rng.normal(35, 20, len(IDX)) for hub in ("HB_WEST", "HB_NORTH", "LZ_HOUSTON")}, index=IDX)
+    frame.iloc[5:9, 1] = np.nan
+    return frame
+
+
+def test_round_trip_columns_and_ranges(tmp_path):
+    path = str(tmp_path / "prices.col")
+    frame = hub_frame()
+    write_frame(path, frame, {"timestamp": "2025-03-15T00:00:00"})
+
+    loaded, meta = read_frame(path)
+    assert meta == {"timestamp": "2025-03-15T00:00:00"}
+    assert list(loaded.columns) == list(frame.columns)
+    assert str(loaded.index.tz) == "US/Central" and loaded.index.equals(IDX)
+    pd.testing.assert_frame_equal(loaded, frame.astype(np.float32), check_freq=False)
+
+    start, end = IDX[100], IDX[1500]
+    sliced, _ = read_frame(path, ["LZ_HOUSTON", "HB_WEST"], start=start, end=end)
+    pd.testing.assert_frame_equal(sliced, frame.loc[start:end, ["LZ_HOUSTON", "HB_WEST"]].iloc[:-1].astype(np.float32), check_freq=False)
+    # Naive bounds are UTC
+    naive = read_prices(path, "HB_NORTH", start=start.tz_convert("UTC").tz_localize(None))[0]
+    assert naive.index[0] == start and len(naive) == len(IDX) - 100
+    assert np.isnan(read_prices(path, "HB_NORTH", end=IDX[10])[0].iloc[5:9]).all()
+
+
+def test_single_series_and_empty_frames(tmp_path):
+    path = str(tmp_path / "prices.col")
+    write_prices(path, pd.Series(np.arange(5.0), index=IDX[:5]))
+    assert list(read_header(path)["columns"]) == [DEFAULT_COLUMN]
+    assert read_prices(path)[0].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+    write_frame(path, hub_frame().iloc[:0])
+    assert read_frame(path)[0].shape == (0, 3)
+
+
+def test_publish_is_atomic(tmp_path, monkeypatch):
+    path = str(tmp_path / "prices.col")
+    frame = hub_frame()
+    write_frame(path, frame, {"version": 1})
+    published = []
+    real_replace = os.replace
+
+    def failing_replace(src, dst):
+        published.append((os.path.dirname(src), dst))
+        raise OSError("disk full")
+
+    monkeypatch.setattr(price_store.os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        write_frame(path, frame * 2, {"version": 2})
+    # The temp file sits next to the target (same filesystem) and is cleaned up on failure
+    assert published == [(str(tmp_path), path)]
+    assert os.listdir(tmp_path) == ["prices.col"]
+    loaded, meta = read_frame(path)
+    assert meta == {"version": 1}
+    pd.testing.assert_frame_equal(loaded, frame.astype(np.float32), check_freq=False)
+
+    monkeypatch.setattr(price_store.os, "replace", real_replace)
+    write_frame(path, frame * 2, {"version": 2})
+    assert read_frame(path)[1] == {"version": 2} and os.listdir(tmp_path) == ["prices.col"]
+
+
+def test_file_lock_non_blocking_and_timeout(tmp_path):
+    path = str(tmp_path / "prices.col.lock")
+    holder, waiter = FileLock(path), FileLock(path)
+    assert holder.acquire(blocking=False)
+    assert not waiter.acquire(blocking=False)
+    t0 = time.monotonic()
+    assert not waiter.acquire(timeout=0.3, poll=0.05)
+    assert time.monotonic() - t0 >= 0.3
+
+    threading.Timer(0.2, holder.release).start()
+    assert waiter.acquire(timeout=5, poll=0.05)
+    waiter.release()
+    with holder:
+        assert not waiter.acquire(blocking=False)
+    assert waiter.acquire(blocking=False)
+    waiter.release()
@@ -0,0 +1,77 @@
+import sqlite3
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+import result_cache
+from result_cache import ResultCache, dataset_version
+
+
+def stored_keys(cache):
+    conn = sqlite3.connect(cache.path)
+    try:
+        return {row[0] for row in conn.execute("SELECT key FROM results")}
+    finally:
+        conn.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = iter(range(0, 10_000, 100))
+    monkeypatch.setattr(result_cache, "time", SimpleNamespace(time=lambda: float(next(clock))))
+    cache = ResultCache(str(tmp_path / "results.db"), max_entries=4)
+    for i in range(4):
+        cache.put(("entry", i), i)
+    assert cache.get(("entry", 0)) == (True, 0)  # older than TOUCH_SECONDS, so this refreshes its recency
+    for i in range(4, 7):
+        cache.put(("entry", i), i)
+
+    assert stored_keys(cache) == {cache.key(("entry", i)) for i in (0, 4, 5, 6)}
+    assert cache.get(("entry", 1)) == (False, None)
+    stats = cache.stats()
+    assert stats["entries"] == 4
+    assert stats["bytes"] == sum(len(result_cache.pickle.dumps(i, protocol=result_cache.pickle.HIGHEST_PROTOCOL)) for i in (0, 4, 5, 6))
+
+
+def test_byte_limit_and_running_totals(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.db"), max_bytes=10_000)
+    for i in range(8):
+        cache.put(("blob", i), bytes(3_000))
+    cache.put(("blob", 7), bytes(1_000))  # replacing an entry adjusts the totals by the size change
+    conn = sqlite3.connect(cache.path)
+    count, size = conn.execute("SELECT COUNT(*), SUM(size) FROM results").fetchone()
+    conn.close()
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"]) == (count, size)
+    assert size <= 10_000 and cache.get(("blob", 7))[0] and cache.get(("blob", 6))[0]
+    cache.clear()
+    assert cache.stats()["entries"] == cache.stats()["bytes"] == 0
+
+
+def test_new_price_data_misses(tmp_path):
+    idx = pd.date_range("2025-01-01", periods=500, freq="5min", tz="UTC")
+    prices = pd.Series(np.linspace(10, 60, len(idx)), index=idx)
+    cache = ResultCache(str(tmp_path / "results.db"), code_version="abc")
+    cache.put((dataset_version(prices), "alpha", 40.0), "old")
+    assert cache.get((dataset_version(prices.copy()), "alpha", 40.0)) == (True, "old")
+
+    revised = prices.copy()
+    revised.iloc[200] += 1.0
+    appended = pd.concat([prices, pd.Series([30.0], index=[idx[-1] + pd.Timedelta(minutes=5)])])
+    for changed in (revised, appended):
+        assert cache.get((dataset_version(changed), "alpha", 40.0)) == (False, None)
+    # A deploy that changes the model starts a fresh key space
+    assert ResultCache(cache.path, code_version="def").get((dataset_version(prices), "alpha", 40.0)) == (False, None)
+
+
+def test_totals_are_counted_once_for_an_existing_table(tmp_path):
+    path = str(tmp_path / "results.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("CREATE TABLE results (key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL);")
+    with conn:
+        conn.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?)", [(f"k{i}", b"x" * 10, 10, i, i) for i in range(5)])
+    conn.close()
+    cache = ResultCache(path, max_entries=3)
+    assert cache.stats()["entries"] == 5
+    cache.put(("new",), 1)
+    assert stored_keys(cache) == {"k3", "k4", cache.key(("new",))}
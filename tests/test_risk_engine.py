@@ -0,0 +1,16 @@
+import numpy as np
+import pandas as pd
+
+from risk_engine import risk_profile
+
+IDX = pd.date_range("2025-01-01", periods=365 * 288, freq="5min", tz="UTC")
+
+
+def test_irr_agrees_across_horizons_on_a_stationary_series():
+    prices = pd.Series(np.random.default_rng(0).normal(60, 80, len(IDX)), index=IDX)
+    profile = risk_profile(prices, 111.11, 35.0, 75.0, 0.5, 0.5, net_capex=5e6, n_paths=500, workers=1)
+    p50 = profile[profile["percentile"] == "P50"].set_index("horizon_days")["irr"]
+    assert np.isclose(p50[182], p50[365], rtol=0.02)
+    # Horizon alpha is still the period's own figure
+    alpha = profile[profile["percentile"] == "P50"].set_index("horizon_days")["total_alpha"]
+    assert alpha[182] < alpha[365]
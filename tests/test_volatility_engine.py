@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from volatility_engine import PEAK_PRICE, RollingAnalytics, RollingWindow
+
+IDX = pd.date_range("2025-01-01", periods=6000, freq="5min", tz="UTC")
+PRICES = pd.Series(np.random.default_rng(0).standard_t(3, len(IDX)) * 40 + 35, index=IDX)
+
+
+def expected(values, breakeven):
+    return {
+        "intervals": len(values),
+        "mean": values.mean(),
+        "std": values.std(ddof=1),
+        "p10": np.quantile(values, 0.1),
+        "p50": np.quantile(values, 0.5),
+        "p90": np.quantile(values, 0.9),
+        "negative_share": (values < 0).mean(),
+        "peak_share": (values > PEAK_PRICE).mean(),
+        "below_breakeven": (values < breakeven).mean(),
+    }
+
+
+def assert_window(window, prices, days, breakeven=50.0):
+    tail = prices[prices.index > prices.index[-1] - pd.Timedelta(days=days)].to_numpy()
+    got, want = window.stats(breakeven), expected(tail, breakeven)
+    assert got["intervals"] == want["intervals"]
+    for key in want:
+        assert np.isclose(got[key], want[key], rtol=1e-9, atol=1e-9), key
+
+
+def test_window_matches_numpy_bulk_and_incremental():
+    ts, values = IDX.asi8, PRICES.to_numpy()
+    bulk = RollingWindow(7)
+    bulk.extend(ts, values)
+    assert_window(bulk, PRICES, 7)
+
+    # Small batches take the in-place insort/evict path, large ones the rebuild
+    stepped = RollingWindow(7)
+    start = 0
+    for size in (3000, 1, 7, 50, 400, 1542, 1000):
+        stepped.extend(ts[start:start + size], values[start:start + size])
+        start += size
+        assert_window(stepped, PRICES.iloc[:start], 7)
+
+
+def test_window_ignores_nan_and_repeated_intervals():
+    window = RollingWindow(1)
+    window.extend(IDX.asi8[:200], PRICES.to_numpy()[:200])
+    with_nan = PRICES.to_numpy()[200:300].copy()
+    with_nan[::10] = np.nan
+    window.extend(IDX.asi8[150:300], np.append(PRICES.to_numpy()[150:200], with_nan))
+    kept = pd.concat([PRICES.iloc[:200], PRICES.iloc[200:300][~np.isnan(with_nan)]])
+    assert_window(window, kept, 1)
+
+
+def test_sync_keeps_history_that_arrives_after_live_intervals():
+    history, live = PRICES.iloc[:5000], PRICES.iloc[4994:5006]
+    analytics = RollingAnalytics((1, 30))
+    # Cold start: placeholder history without timestamps anchors nothing
+    assert analytics.sync(pd.Series(np.ones(10)), live) == 0
+    analytics.sync(history, live)
+    assert_window(analytics.windows[30], PRICES.iloc[:5006], 30)
+
+
+def test_sync_waits_for_history_to_fill_live_outages():
+    analytics = RollingAnalytics((1,))
+    analytics.sync(PRICES.iloc[:5000], PRICES.iloc[5010:5020])
+    assert analytics.last_ts == IDX[4999].value
+    analytics.sync(PRICES.iloc[:5012], PRICES.iloc[5010:5020])
+    assert_window(analytics.windows[1], PRICES.iloc[:5020], 1)
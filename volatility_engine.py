@@ -0,0 +1,239 @@
+"""Rolling-window price analytics: volatility, quantiles and price-bracket shares.
+
+RollingWindow holds one trailing time window of prices as running sums (mean
+and standard deviation) plus a sorted copy of the window, so quantiles and the
+share of intervals below any price (zero, a breakeven, the $1,000/MWh peak
+line) are binary searches. New intervals are folded in and expired ones
+evicted as they arrive, so a live update costs a few list operations per
+interval instead of a rescan; a bulk load sorts the window once.
+RollingAnalytics keeps one window per horizon in step with a price history
+plus the live intervals that continue it.
+rolling_stats gives the same statistics at every interval of a history in one
+pass over pandas' online rolling kernels, for charts.
+
+Shares count intervals, so they match the bucket tables of a single hub.
+"""
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from alpha_engine import DAY_NS, HORIZON_DAYS
+from audit_db import GAP_TOLERANCE, infer_interval
+from result_cache import dataset_version
+
+# --- CONFIGURATION ---
+QUANTILES = (0.1, 0.5, 0.9)
+PEAK_PRICE = 1000.0
+# New intervals, as a share of the window, above which the sorted copy is rebuilt instead of updated in place
+REBUILD_FRACTION = 0.0625
+
+
+# --- INCREMENTAL WINDOW ---
+class RollingWindow:
+    """Trailing `days` of intervals, ending at the newest one, with O(1) moments and O(log n) ranks"""
+
+    def __init__(self, days):
+        self.days = days
+        self.span_ns = days * DAY_NS
+        self._ts = deque()
+        self._values = deque()
+        self._sorted = []
+        self._shift = 0.0
+        self._sum = 0.0
+        self._sumsq = 0.0
+
+    @property
+    def count(self):
+        return len(self._values)
+
+    @property
+    def last_ts(self):
+        return self._ts[-1] if self._ts else None
+
+    def _add(self, value):
+        d = value - self._shift
+        self._sum += d
+        self._sumsq += d * d
+
+    def _remove(self, value):
+        d = value - self._shift
+        self._sum -= d
+        self._sumsq -= d * d
+
+    def extend(self, ts_ns, values):
+        """Fold in intervals newer than the newest one held, then evict expired ones; returns the number added"""
+        ts_ns = np.asarray(ts_ns, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        keep = ~np.isnan(values)
+        if self._ts:
+            keep &= ts_ns > self._ts[-1]
+        ts_ns, values = ts_ns[keep], values[keep]
+        if len(values) == 0:
+            return 0
+        if len(ts_ns) > 1 and np.any(ts_ns[1:] <= ts_ns[:-1]):
+            order = np.argsort(ts_ns, kind="stable")
+            ts_ns, values = ts_ns[order], values[order]
+            unique = np.append(ts_ns[1:] != ts_ns[:-1], True)
+            ts_ns, values = ts_ns[unique], values[unique]
+        # Drop anything that would expire straight away
+        start = int(np.searchsorted(ts_ns, ts_ns[-1] - self.span_ns, side="right"))
+        ts_ns, values = ts_ns[start:], values[start:]
+
+        rebuild = len(values) > REBUILD_FRACTION * max(self.count, 1)
+        if not self._values:
+            self._shift = float(values[0])
+        self._ts.extend(ts_ns.tolist())
+        self._values.extend(values.tolist())
+        if rebuild:
+            self._evict(update_sorted=False)
+            self._sorted = sorted(self._values)
+            d = np.fromiter(self._values, dtype=np.float64, count=self.count) - self._shift
+            self._sum, self._sumsq = float(d.sum()), float((d * d).sum())
+        else:
+            for v in values.tolist():
+                insort(self._sorted, v)
+                self._add(v)
+            self._evict()
+        return len(values)
+
+    def _evict(self, update_sorted=True):
+        cutoff = self._ts[-1] - self.span_ns
+        while self._ts and self._ts[0] <= cutoff:
+            self._ts.popleft()
+            v = self._values.popleft()
+            if update_sorted:
+                del self._sorted[bisect_left(self._sorted, v)]
+                self._remove(v)
+
+    def share_below(self, price):
+        """Share of intervals priced strictly below `price`"""
+        return bisect_left(self._sorted, price) / self.count if self.count else float("nan")
+
+    def share_above(self, price):
+        """Share of intervals priced strictly above `price`"""
+        return 1.0 - bisect_right(self._sorted, price) / self.count if self.count else float("nan")
+
+    def quantile(self, q):
+        """Linearly interpolated quantile, as np.quantile"""
+        n = self.count
+        if n == 0:
+            return float("nan")
+        pos = q * (n - 1)
+        lo = int(pos)
+        hi = min(lo + 1, n - 1)
+        return self._sorted[lo] + (self._sorted[hi] - self._sorted[lo]) * (pos - lo)
+
+    def stats(self, breakeven_val=None):
+        """Window statistics as a dict; below_breakeven is NaN when no breakeven is given"""
+        n = self.count
+        if n == 0:
+            mean = std = float("nan")
+        else:
+            mean_d = self._sum / n
+            mean = self._shift + mean_d
+            std = float(np.sqrt(max(self._sumsq / n - mean_d * mean_d, 0.0) * n / (n - 1))) if n > 1 else 0.0
+        out = {
+            "intervals": n,
+            "mean": mean,
+            "std": std,
+            **{f"p{round(q * 100)}": self.quantile(q) for q in QUANTILES},
+            "negative_share": self.share_below(0.0),
+            "peak_share": self.share_above(PEAK_PRICE),
+            "below_breakeven": self.share_below(breakeven_val) if breakeven_val is not None else float("nan"),
+        }
+        return out
+
+
+class RollingAnalytics:
+    """One RollingWindow per horizon over the same price stream; safe to share between sessions"""
+
+    def __init__(self, horizons=HORIZON_DAYS):
+        self.horizons = tuple(horizons)
+        self.windows = {days: RollingWindow(days) for days in self.horizons}
+        self.history_version = None
+        self._interval_ns = None
+        self._lock = threading.Lock()
+
+    @property
+    def last_ts(self):
+        return max((w.last_ts for w in self.windows.values() if w.last_ts is not None), default=None)
+
+    def extend(self, prices):
+        """Fold in the part of a time-indexed Series newer than what is held; returns the number of new intervals"""
+        with self._lock:
+            return self._extend(prices)
+
+    def _extend(self, prices):
+        if not isinstance(prices, pd.Series) or not isinstance(prices.index, pd.DatetimeIndex) or len(prices) == 0:
+            return 0
+        ts = prices.index.as_unit("ns").asi8
+        values = prices.to_numpy(dtype=np.float64)
+        last = self.last_ts
+        if last is not None:
+            # Only the tail can be new when the index is sorted; unsorted input is filtered per window
+            if len(ts) > 1 and np.all(ts[1:] >= ts[:-1]):
+                i = int(np.searchsorted(ts, last, side="right"))
+                ts, values = ts[i:], values[i:]
+        return max(w.extend(ts, values) for w in self.windows.values())
+
+    def sync(self, history, live=None):
+        """Fold in a price history, then the live intervals that continue straight on from it; returns the number added.
+
+        The windows are rebuilt from the history whenever its dataset_version
+        changes, so history that arrives after live intervals, or fills a gap,
+        is never dropped as old. Live intervals are appended only while they
+        follow the newest held interval without a gap; after an outage they
+        wait for the history to catch up. A history without timestamps (the
+        placeholder) holds nothing.
+        """
+        version = dataset_version(history)
+        if version is None:
+            return 0
+        with self._lock:
+            added = 0
+            if version != self.history_version:
+                self.windows = {days: RollingWindow(days) for days in self.horizons}
+                self.history_version = version
+                self._interval_ns = infer_interval(np.sort(history.index.as_unit("ns").asi8))
+                added = self._extend(history)
+            if live is not None:
+                added += self._extend(self._continuation(live))
+            return added
+
+    def _continuation(self, live):
+        """The newer-than-held part of a live Series, cut at its first gap (including the one to the held data)"""
+        if self.last_ts is None or not isinstance(live, pd.Series) or not isinstance(live.index, pd.DatetimeIndex) or len(live) == 0:
+            return None
+        live = live.dropna().sort_index()
+        ts = live.index.as_unit("ns").asi8
+        start = int(np.searchsorted(ts, self.last_ts, side="right"))
+        steps = np.diff(np.append(self.last_ts, ts[start:]))
+        gaps = np.flatnonzero(steps > self._interval_ns * GAP_TOLERANCE)
+        end = start + (int(gaps[0]) if len(gaps) else len(steps))
+        return live.iloc[start:end]
+
+    def stats(self, days, breakeven_val=None):
+        with self._lock:
+            return self.windows[days].stats(breakeven_val)
+
+
+# --- FULL-HISTORY ROLLING ---
+def rolling_stats(prices, days, breakeven_val=None, quantiles=QUANTILES):
+    """Trailing-`days` statistics at every interval of a time-indexed Series, as a DataFrame.
+
+    Mean, std and the shares are O(n) running-window kernels; quantiles use
+    pandas' skiplist kernel, O(n log w).
+    """
+    prices = prices.dropna().sort_index()
+    roll = lambda s: s.rolling(f"{days}D")
+    out = pd.DataFrame({"mean": roll(prices).mean(), "std": roll(prices).std()})
+    for q in quantiles:
+        out[f"p{round(q * 100)}"] = roll(prices).quantile(q)
+    out["negative_share"] = roll((prices < 0).astype(float)).mean()
+    out["peak_share"] = roll((prices > PEAK_PRICE).astype(float)).mean()
+    if breakeven_val is not None:
+        out["below_breakeven"] = roll((prices < breakeven_val).astype(float)).mean()
+    return out